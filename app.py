@@ -1,25 +1,62 @@
+import importlib
+import os
 import sys
+import time
+_T_START = time.perf_counter()
+
+# figures are only rendered to PNG; keep pyplot off the Qt event loop
+os.environ.setdefault("MPLBACKEND", "Agg")
+
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton, QTableView,
             QVBoxLayout, QHBoxLayout, QFrame, QStackedWidget, QTextEdit, QDialog, QScrollArea, QCheckBox, QMessageBox, QSizePolicy, 
-            QAbstractItemView, QHeaderView
+            QAbstractItemView, QHeaderView, QFileDialog, QComboBox, QSpinBox, QGridLayout
 )
 from PyQt5.QtGui import QStandardItemModel, QStandardItem, QKeySequence
-from PyQt5.QtCore import Qt, QSortFilterProxyModel, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, QSortFilterProxyModel, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QPixmap, QFont
 from io import BytesIO
-from PyQt5.QtWebEngineWidgets import QWebEngineView
-
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT
-import matplotlib.pyplot as plt
-import inspect
-import py3Dmol
 
 ### modules ###
 #import protein_analysis   # practicemodule
-from backend import g1_protein
-from backend import g3_variant
-from backend import g1_structure
+# Only Qt and the stdlib-only tracing / cancel modules load at startup. The scientific
+# stack (pandas, matplotlib, Biopython, ...), the 3D viewer (QtWebEngine) and the
+# backend modules are imported on first use via lazy_import(), and warmed up
+# in the background once the welcome page is showing.
+from backend import cancel, tracing
+
+WARMUP_MODULES = [
+    "numpy", "pandas", "matplotlib.pyplot", "seaborn",
+    "backend.g1_protein", "backend.g3_variant", "backend.g1_structure",
+    "backend.network_metrics",
+]
+
+
+def lazy_import(name):
+    """Import a module on first use, timing it for the import report"""
+    module = sys.modules.get(name)
+    if module is None:
+        with tracing.span(f"import {name}", "import"):
+            module = importlib.import_module(name)
+    return module
+
+
+def print_import_report(first_paint_ms):
+    rows = [r for r in tracing.records() if r["cat"] == "import"]
+    print("\n=== STARTUP / IMPORT REPORT ===")
+    print(f"Welcome page shown after {first_paint_ms:.1f} ms")
+    for r in sorted(rows, key=lambda r: r["start"]):
+        print(f"  {r['dur'] * 1000:8.1f} ms  {r['name']}")
+
+
+class WarmupThread(QThread):
+    """Imports the heavy modules in the background after the first paint"""
+    def run(self):
+        for name in WARMUP_MODULES:
+            try:
+                lazy_import(name)
+            except Exception as e:
+                print(f"[WARN] warm-up import of {name} failed: {e}")
 
 
 
@@ -30,6 +67,7 @@ class WelcomePage(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent  #cce7ff
+        self._fetcher = None
         self.setStyleSheet("""
             QWidget {
                 background: qlineargradient(
@@ -145,19 +183,25 @@ class WelcomePage(QWidget):
             self.show_error_message("Please enter a protein ID.")
             return
 
-        # disable input and show busy cursor while fetching
-        self.input.setEnabled(False)
+        # a new ID supersedes a fetch still in flight
+        if self._fetcher is not None:
+            self._fetcher.cancel()
+
+        # busy cursor while fetching (restored as each fetch thread ends)
         QApplication.setOverrideCursor(Qt.WaitCursor)
 
         # run fetch in background
         self._fetcher = ProteinFetcher(protein_code)
         self._fetcher.result.connect(self._on_protein_ready)
         self._fetcher.error.connect(self._on_protein_error)
+        self._fetcher.finished.connect(QApplication.restoreOverrideCursor)
         self._fetcher.start()
 
     def _on_protein_ready(self, summary_text):
-        QApplication.restoreOverrideCursor()
-        self.input.setEnabled(True)
+        fetcher = self.sender()
+        if fetcher is not self._fetcher or fetcher.cancelled:
+            return
+        self._fetcher = None
 
         if summary_text is None:
             self.show_error_message(
@@ -165,13 +209,14 @@ class WelcomePage(QWidget):
             )
             return
 
-        self.parent.protein_code = self.input.text().strip()
+        self.parent.protein_code = fetcher.protein_id
         self.parent.page2.update_summary(summary_text)
         self.parent.stack.setCurrentIndex(1)
 
     def _on_protein_error(self, message):
-        QApplication.restoreOverrideCursor()
-        self.input.setEnabled(True)
+        if self.sender() is not self._fetcher:
+            return
+        self._fetcher = None
         self.show_error_message(f"Unexpected error: {message}")
 
     def show_error_message(self, message):
@@ -186,16 +231,23 @@ class WelcomePage(QWidget):
 #helping functions placed here
 #---------------------------------------------
 def fig_to_pixmap(fig):
-    buf = BytesIO()
-    try:
-        fig.tight_layout()
-    except Exception:
-        pass
-    # Save without bbox_inches
-    fig.savefig(buf, format="png", dpi=150)
-    buf.seek(0)
+    with tracing.span("pixmap conversion", "render") as sp:
+        buf = BytesIO()
+        try:
+            fig.tight_layout()
+        except Exception:
+            pass
+        # Save without bbox_inches
+        fig.savefig(buf, format="png", dpi=150)
+        buf.seek(0)
+        pixmap = QPixmap()
+        pixmap.loadFromData(buf.getvalue(), "PNG")
+        sp["args"]["bytes"] = buf.getbuffer().nbytes
+    return pixmap
+
+def png_to_pixmap(png):
     pixmap = QPixmap()
-    pixmap.loadFromData(buf.getvalue(), "PNG")
+    pixmap.loadFromData(png, "PNG")
     return pixmap
 
 def create_card(text):
@@ -285,20 +337,116 @@ def create_filter_row(df, proxy):
 
     return filter_widget
 
-class ProteinFetcher(QThread):
+class PerformancePanel(QWidget):
+    """Collapsible per-stage timing table fed by backend.tracing"""
+    def __init__(self):
+        super().__init__()
+        self.toggle_btn = QPushButton("▸ Performance")
+        self.toggle_btn.setCheckable(True)
+        self.toggle_btn.setStyleSheet("""
+            QPushButton { text-align: left; border: none; color: #2b6ea3; font-size: 12px; padding: 4px; }
+        """)
+        self.toggle_btn.toggled.connect(self.set_expanded)
+
+        self.table_box = QTextEdit()
+        self.table_box.setReadOnly(True)
+        self.table_box.setFont(QFont("Courier New", 9))
+        self.table_box.setFixedHeight(180)
+
+        clear_btn = QPushButton("Clear")
+        export_btn = QPushButton("Export Chrome trace…")
+        clear_btn.clicked.connect(lambda: (tracing.clear(), self.refresh()))
+        export_btn.clicked.connect(self.export_trace)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        buttons.addWidget(clear_btn)
+        buttons.addWidget(export_btn)
+
+        self.body = QWidget()
+        body_layout = QVBoxLayout(self.body)
+        body_layout.setContentsMargins(0, 0, 0, 0)
+        body_layout.addWidget(self.table_box)
+        body_layout.addLayout(buttons)
+        self.body.setVisible(False)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.toggle_btn, alignment=Qt.AlignLeft)
+        layout.addWidget(self.body)
+
+        # refresh only while expanded
+        self.timer = QTimer(self)
+        self.timer.setInterval(1000)
+        self.timer.timeout.connect(self.refresh)
+
+    def set_expanded(self, expanded):
+        self.toggle_btn.setText(("▾" if expanded else "▸") + " Performance")
+        self.body.setVisible(expanded)
+        if expanded:
+            self.refresh()
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def refresh(self):
+        self.table_box.setPlainText(tracing.summary_text())
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export trace", "provarnet_trace.json", "JSON (*.json)")
+        if path:
+            tracing.export_chrome_trace(path)
+
+
+class Worker(QThread):
+    """Runs fn(*args) off the GUI thread under its own cancel token.
+    cancel() stops it at the next check point (HTTP chunk, DataFrame
+    build, render); a cancelled worker emits neither result nor error."""
     result = pyqtSignal(object)
     error = pyqtSignal(str)
 
-    def __init__(self, protein_id):
+    _live = set()   # running workers, kept alive until finished even if cancelled
+
+    def __init__(self, fn, *args):
         super().__init__()
-        self.protein_id = protein_id
+        self.fn = fn
+        self.args = args
+        self.token = cancel.CancelToken()
+        self.finished.connect(lambda: Worker._live.discard(self))
+
+    def start(self):
+        Worker._live.add(self)
+        super().start()
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
 
     def run(self):
-        try:
-            summary = g1_protein.protein_summary(self.protein_id)
-            self.result.emit(summary)
-        except Exception as e:
-            self.error.emit(str(e))
+        with cancel.scope(self.token):
+            try:
+                value = self.fn(*self.args)
+            except cancel.Cancelled:
+                return
+            except Exception as e:
+                if not self.cancelled:
+                    self.error.emit(str(e))
+                return
+        if not self.cancelled:
+            self.result.emit(value)
+
+
+class ProteinFetcher(Worker):
+    def __init__(self, protein_id):
+        super().__init__(self._summary, protein_id)
+        self.protein_id = protein_id
+
+    @staticmethod
+    def _summary(protein_id):
+        return lazy_import("backend.g1_protein").protein_summary(protein_id)
 
 
 # -----------------------------------------------------------
@@ -309,6 +457,7 @@ class MenuPage(QWidget):
     def __init__(self, parent):
         super().__init__()
         self.parent = parent
+        self._tasks = {}   # running Worker -> (result handler, error message)
         # use the same subtle gradient background as WelcomePage
         self.setStyleSheet("""
             QWidget {
@@ -418,52 +567,81 @@ class MenuPage(QWidget):
         self.setLayout(layout)
     #------- Functions-----------
     def update_summary(self, text):
+        # a new protein: whatever was running for the previous one is stale
+        self.cancel_tasks()
         self.summary_box.setText(text)
-    
+
+    def run_task(self, fn, on_result, error_message, *args):
+        """fn(*args) in a Worker; on_result(value) back on the GUI thread unless
+        the task was cancelled (Back, new protein) in the meantime"""
+        worker = Worker(fn, *args)
+        self._tasks[worker] = (on_result, error_message)
+        worker.result.connect(self._on_task_result)
+        worker.error.connect(self._on_task_error)
+        worker.finished.connect(self._on_task_finished)
+        QApplication.setOverrideCursor(Qt.WaitCursor)
+        worker.start()
+        return worker
+
+    def cancel_tasks(self):
+        for worker in list(self._tasks):
+            worker.cancel()
+
+    def _on_task_result(self, value):
+        worker = self.sender()
+        on_result, _ = self._tasks.get(worker, (None, None))
+        if on_result is not None and not worker.cancelled:
+            on_result(value)
+
+    def _on_task_error(self, message):
+        worker = self.sender()
+        _, error_message = self._tasks.get(worker, (None, None))
+        if error_message is not None and not worker.cancelled:
+            QMessageBox.warning(self, "Error", f"{error_message}\n{message}")
+
+    def _on_task_finished(self):
+        self._tasks.pop(self.sender(), None)
+        QApplication.restoreOverrideCursor()
+
     def open_structure_dialog(self):
-        pdb_data, summary_text = g1_protein.get_alphafold_pdb(self.parent.protein_code)
+        g1_protein = lazy_import("backend.g1_protein")
+        protein_code = self.parent.protein_code
+        self.run_task(g1_protein.get_alphafold_pdb, lambda result: self._show_structure_dialog(result, protein_code),
+                      "Could not load AlphaFold structure.", protein_code)
 
-        if pdb_data:
-            dialog = AlphaDialog(pdb_data, summary_text, protein_code=self.parent.protein_code)
-            dialog.exec_()
-        else:
+    def _show_structure_dialog(self, result, protein_code):
+        if not result or not result[0]:
             QMessageBox.warning(self, "Error", "Could not load AlphaFold structure.")
+            return
+        pdb_data, summary_text = result
+        dialog = AlphaDialog(pdb_data, summary_text, protein_code=protein_code)
+        dialog.exec_()
 
     def open_ppi_dialog(self):
-        fig, explain = g1_protein.ppi_network(self.parent.protein_code)
-
-        if fig is None:
-            QMessageBox.warning(self, "Error", "Could not create PPI network.")
+        g1_protein = lazy_import("backend.g1_protein")
+        protein_code = self.parent.protein_code
+        self.run_task(g1_protein.ppi_network, lambda result: self._show_ppi_dialog(result, protein_code),
+                      "Could not create PPI network.", protein_code)
+
+    def _show_ppi_dialog(self, result, protein_code):
+        if not isinstance(result, tuple) or result[0] is None:
+            message = result if isinstance(result, str) else "Could not create PPI network."
+            QMessageBox.warning(self, "Error", message)
             return
-        dialog = PPIDialog("Protein–Protein Interaction Network", explain, fig)
+        fig, explain = result
+        dialog = PPIDialog("Protein–Protein Interaction Network", explain, fig,
+                           protein_code=protein_code)
         dialog.exec_()
 
     def open_variant_dialog(self):
-        fig, summary_text, explain_text = g3_variant.Variant_analysis(self.parent.protein_code)
-
-        if fig is None:
-            QMessageBox.warning(self, "Error", "Could not perform variant analysis.")
-            return
-
-        dialog = VariantDialog(fig, summary_text, explain_text, self.parent.protein_code)
-        dialog.exec_()
+        # the dialogs open at once and load their content in the background
+        VariantDialog(self.parent.protein_code).exec_()
 
     def open_disease_dialog(self):
-        try:
-            df_table, summary, text2, fig2 = g3_variant.disease_associated_variants(self.parent.protein_code)
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Could not get disease-associated variants:\n{e}")
-            return
-
-        if df_table is None or df_table.empty:
-            QMessageBox.information(self, "No Data", "No disease-associated variants found for this protein.")
-            return
-        
-        dlg = DiseaseVariantDialog(df_table, summary, text2, fig2, parent=None)
-        dlg.exec_()
-
+        DiseaseVariantDialog(self.parent.protein_code).exec_()
 
     def go_back(self):
+        self.cancel_tasks()
         self.parent.stack.setCurrentIndex(0)
 
 
@@ -472,7 +650,7 @@ class MenuPage(QWidget):
 # DIALOGUE 1: ALPHA FOLD STRUCTURE
 # -----------------------------------------------------------
 
-def AlphaDialog(pdb_data, summary_text, protein_code=None, title="AlphaFold Structure"):
+def AlphaDialog(pdb_data, summary_text, protein_code, title="AlphaFold Structure"):
 
     dialog = QDialog()
     dialog.setWindowTitle(title)
@@ -486,35 +664,103 @@ def AlphaDialog(pdb_data, summary_text, protein_code=None, title="AlphaFold Stru
     summary_box.setStyleSheet("background-color: #e7f2ff; font-size: 14px; padding: 8px;")
     layout.addWidget(summary_box)
 
-    # interactive 3D structure
-    view = py3Dmol.view(width=800, height=600)
-    view.addModel(pdb_data, 'pdb')
-    view.setStyle({'cartoon': {'color':'spectrum'}})
-    view.zoomTo()
-    html = view._make_html()
-
-    webview = QWebEngineView()
-    webview.setHtml(html)
-    layout.addWidget(webview)
+    # interactive 3D structure: one persistent, pre-warmed view shared by all dialogs
+    try:
+        view = lazy_import("viewer").shared_view()
+    except ImportError as e:
+        layout.addWidget(QLabel(f"3D viewer unavailable: {e}"))
+    else:
+        view.show_structure(f"AF-{protein_code}", pdb_data, "pdb")
+
+        # level of detail: automatic by size, or forced by the user
+        detail_box = QComboBox()
+        detail_levels = [("Auto (by size)", "auto"), ("Full cartoon", "full"),
+                         ("CA trace", "trace"), ("Coarse (CA spheres)", "coarse")]
+        for label, level in detail_levels:
+            detail_box.addItem(label, level)
+        detail_box.currentIndexChanged.connect(lambda i: view.set_detail(detail_levels[i][1]))
+        detail_row = QHBoxLayout()
+        detail_row.addWidget(QLabel("Detail:"))
+        detail_row.addWidget(detail_box)
+        detail_row.addWidget(QLabel("Click a residue to show full detail around it."))
+        detail_row.addStretch()
+        layout.addLayout(detail_row)
+
+        # variants on the structure: per-residue arrays computed once per dialog
+        color_box = QComboBox()
+        color_modes = [("Residue number", None), ("Variant density", "density"),
+                       ("Max PolyPhen score", "polyphen"), ("Disease-associated variants", "disease")]
+        for label, mode in color_modes:
+            color_box.addItem(label, mode)
+        color_legend = QLabel("")
+        cache = {"worker": None}
+
+        def load_profiles(pdb_data, protein_code):
+            # off the GUI thread: may download and parse the whole EBI variation entry
+            viewer = lazy_import("viewer")
+            resi = viewer.model_residues(pdb_data)
+            index = viewer.residue_index(resi, resi)
+            return index, lazy_import("backend.g3_variant").structure_variant_profiles(protein_code, len(index) - 1)
+
+        def profiles_loaded(result):
+            cache["index"], cache["profiles"] = result
+            apply_colors(color_box.currentIndex())
+
+        def profiles_failed(message):
+            color_legend.setText("")
+            QMessageBox.warning(dialog, "Error", f"Could not load variants:\n{message}")
+            color_box.setCurrentIndex(0)
+
+        def apply_colors(i):
+            mode = color_modes[i][1]
+            if mode is None:
+                view.color_residues([])
+                color_legend.setText("")
+                return
+            np = lazy_import("numpy")
+            values = cache["profiles"][mode].astype(float)
+            if mode != "polyphen":
+                values[values == 0] = np.nan
+            batches = lazy_import("viewer").color_batches(values, cache["index"])
+            view.color_residues(batches)
+            shown = values[~np.isnan(values)]
+            color_legend.setText(f"grey = none, yellow → dark red = {shown.min():g} … {shown.max():g}"
+                                 if len(shown) else "No variants on modelled residues.")
+
+        def color_by(i):
+            if color_modes[i][1] is None or "profiles" in cache:
+                apply_colors(i)
+                return
+            # first variant colouring: computed once in the background, applied when done
+            color_legend.setText("Loading variants…")
+            if cache["worker"] is None:
+                lazy_import("backend.g3_variant")
+                worker = cache["worker"] = Worker(load_profiles, pdb_data, protein_code)
+                worker.result.connect(profiles_loaded)
+                worker.error.connect(profiles_failed)
+                worker.finished.connect(lambda: cache.update(worker=None))
+                worker.start()
+
+        dialog.finished.connect(lambda _: cache["worker"] and cache["worker"].cancel())
+        color_box.currentIndexChanged.connect(color_by)
+        color_row = QHBoxLayout()
+        color_row.addWidget(QLabel("Color by:"))
+        color_row.addWidget(color_box)
+        color_row.addWidget(color_legend)
+        color_row.addStretch()
+        layout.addLayout(color_row)
+
+        view.attach(layout)
+        dialog.finished.connect(lambda _: view.detach(layout))
     #
     def open_comp_dialog():
         try:
-            uniprot_id = protein_code
-            fig, summary, text = g1_structure.structural_comparison(uniprot_id)
+            dlg = ComparisonDialog(protein_code)
         except Exception as e:
             QMessageBox.warning(dialog, "Error", f"Could not perform structural comparison:\n{e}")
             return
-
-        # Handle cases where experimental or AF info is missing
-        if fig is None:
-            msg = summary if isinstance(summary, str) else "No structural data available for this protein."
-            QMessageBox.information(dialog, "No Structure", msg)
-            return
-        dlg = ComparisonDialog(fig, summary, text, uniprot_id)
         dlg.exec_()
 
-        # Show summary (or open another dialog, etc.)
-        #QMessageBox.information(dialog, "Structural Comparison", summary)
     comp_btn = QPushButton("STRUCTURE COMPARISON")
     #comp_btn.setFixedHeight(36)
     comp_btn.setMinimumSize(220, 55)
@@ -531,71 +777,234 @@ def AlphaDialog(pdb_data, summary_text, protein_code=None, title="AlphaFold Stru
     return dialog
 
 # -----------------------------------------------------------
-# DIALOG Additional: Structure Comparison
+# DIALOG BASE: PROGRESSIVE LOADING
 # -----------------------------------------------------------
-def ComparisonDialog(fig, summary_text, text, uniprot_id, title="Variant Analysis"):
-    dialog = QDialog()
-    dialog.setWindowTitle(title)
-    dialog.setMinimumSize(900, 800)
-
-    layout = QVBoxLayout()
-
-    summary_box = QTextEdit()
-    summary_box.setReadOnly(True)
-    summary_box.setText(f"{summary_text}\n{text}")
-    summary_box.setStyleSheet("background-color: #e7f2ff; font-size: 14px; padding: 8px;")
-    layout.addWidget(summary_box)
-
-
-    pixmap = fig_to_pixmap(fig)
-    image_label = QLabel()
-    image_label.setAlignment(Qt.AlignCenter)
-    init_w, init_h = 800, 600
-    scaled_pix = pixmap.scaled(init_w, init_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-    image_label.setPixmap(scaled_pix)
-    image_label.setFixedSize(scaled_pix.size())
-
-    image_scroll = QScrollArea()
-    image_scroll.setWidgetResizable(False)
-    image_scroll.setWidget(image_label)
-
-    zoom_in = QPushButton("+")
-    zoom_out = QPushButton("-")
-    zoom_in.setFixedSize(36, 28)
-    zoom_out.setFixedSize(36, 28)
-
-    zoom_container = QHBoxLayout()
-    zoom_container.addStretch()
-    zoom_container.addWidget(zoom_out)
-    zoom_container.addWidget(zoom_in)
-    zoom_container.addStretch()
+class ProgressiveDialog(QDialog):
+    """Opens at once with a placeholder per panel. load() computes the data
+    in a Worker; show_data() then fills in the summary and the panels are
+    drawn and rasterized in Workers, each appearing as soon as it is done.
+    Closing the dialog cancels whatever is still running."""
+    PANEL_SIZE = (520, 330)
+    RENDER_THREADS = 2
+
+    def __init__(self, title, panels, columns=2, wide=(), parent=None):
+        super().__init__(parent)
+        # pixmaps, tables and pending workers go with the dialog when it closes
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setWindowTitle(title)
+        self.resize(1150, 950)
+        self.setMinimumSize(900, 800)
+        self.panels = panels
+        self.wide = set(wide)
+        self._workers = set()
+        self._render_queue = []
+        self._rendering = 0
+        self._pixmaps = {}
+        self._widgets = {}
+        self._zoom = 1.0
+        self.finished.connect(lambda _: self.cancel_workers())
+
+        main_layout = QVBoxLayout(self)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        main_layout.addWidget(scroll)
+        content = QWidget()
+        self.content_layout = QVBoxLayout(content)
+        self.content_layout.setContentsMargins(10, 10, 10, 10)
+        self.content_layout.setSpacing(12)
+        scroll.setWidget(content)
 
-    scale = {'factor': 1.0}
+        self.summary_box = QTextEdit()
+        self.summary_box.setReadOnly(True)
+        self.summary_box.setText("Loading…")
+        self.summary_box.setStyleSheet("background-color: #e7f2ff; font-size: 14px; padding: 8px;")
+        self.content_layout.addWidget(self.summary_box)
 
-    def do_zoom(factor):
-        scale['factor'] *= factor
-        w = max(100, int(init_w * scale['factor']))
-        h = max(100, int(init_h * scale['factor']))
+        zoom_in = QPushButton("+")
+        zoom_out = QPushButton("-")
+        zoom_in.setFixedSize(36, 28)
+        zoom_out.setFixedSize(36, 28)
+        zoom_in.clicked.connect(lambda: self.do_zoom(1.25))
+        zoom_out.clicked.connect(lambda: self.do_zoom(0.8))
+        zoom_container = QHBoxLayout()
+        zoom_container.addStretch()
+        zoom_container.addWidget(zoom_out)
+        zoom_container.addWidget(zoom_in)
+        zoom_container.addStretch()
+        self.content_layout.addLayout(zoom_container)
+
+        self.grid = grid = QGridLayout()
+        self.panel_labels = {}
+        row = col = 0
+        for key, panel_title in panels.items():
+            label = QLabel(f"{panel_title}\n\nrendering…")
+            label.setAlignment(Qt.AlignCenter)
+            label.setWordWrap(True)
+            label.setStyleSheet("color: #7a8694; border: 1px dashed #c5d3e2; border-radius: 6px;")
+            self.panel_labels[key] = label
+            if key in self.wide:
+                if col:
+                    row, col = row + 1, 0
+                grid.addWidget(label, row, 0, 1, columns)
+                row += 1
+            else:
+                grid.addWidget(label, row, col)
+                col += 1
+                if col == columns:
+                    row, col = row + 1, 0
+            self._resize_panel(key)
+        self.content_layout.addLayout(grid)
+
+    def run(self, fn, on_result, on_error, *args):
+        """fn(*args) in a Worker owned by this dialog"""
+        worker = Worker(fn, *args)
+        self._workers.add(worker)
+        # a result queued just before the dialog closed is dropped
+        worker.result.connect(lambda value: worker.cancelled or on_result(value))
+        worker.error.connect(on_error)
+        worker.finished.connect(lambda: self._workers.discard(worker))
+        worker.start()
+        return worker
+
+    def queue_render(self, fn, on_result, on_error, *args):
+        """Like run(), but at most RENDER_THREADS at a time: drawing holds the
+        GIL, so more threads would only delay the first panel"""
+        self._render_queue.append((fn, on_result, on_error, args))
+        self._next_render()
+
+    def _next_render(self):
+        while self._render_queue and self._rendering < self.RENDER_THREADS:
+            fn, on_result, on_error, args = self._render_queue.pop(0)
+            worker = self.run(fn, on_result, on_error, *args)
+            worker.finished.connect(self._render_done)
+            self._rendering += 1
+
+    def _render_done(self):
+        self._rendering -= 1
+        self._next_render()
+
+    def cancel_workers(self):
+        self._render_queue.clear()
+        for worker in list(self._workers):
+            worker.cancel()
+
+    def load(self, fn, *args):
+        self.run(fn, self.show_data, self.show_error, *args)
+
+    def show_data(self, result):
+        """Show what the load function returned; subclasses fill in the summary
+        and panels, the base class shows nothing"""
+
+    def show_error(self, message):
+        self.summary_box.setText(f"Could not load the analysis:\n{message}")
+        self.panels_unavailable()
+
+    def panels_unavailable(self):
+        for key, label in self.panel_labels.items():
+            if key not in self._pixmaps and key not in self._widgets:
+                label.setText(f"{self.panels[key]}\n\nnot available")
+
+    def render_panels(self, draw, data, keys=None):
+        """Each panel is drawn in a Worker and shows up as soon as its PNG is ready"""
+        figures = lazy_import("backend.figures")
+        for key in keys or self.panels:
+            figsize = (16, 5) if key in self.wide else (8, 5)
+            self.queue_render(figures.panel_png,
+                     lambda png, key=key: self._show_panel(key, png),
+                     lambda message, key=key: self.panel_labels[key].setText(
+                         f"{self.panels[key]}\n\ncould not be drawn: {message}"),
+                     draw, key, data, figsize)
+
+    def show_widget(self, key, widget):
+        """Put a live widget (e.g. an interactive canvas) in place of a panel's placeholder"""
+        label = self.panel_labels[key]
+        self.grid.replaceWidget(label, widget)
+        label.hide()
+        self._widgets[key] = widget
+        self._resize_panel(key)
+
+    def _show_panel(self, key, png):
+        self._pixmaps[key] = png_to_pixmap(png)
+        self.panel_labels[key].setStyleSheet("")
+        self._resize_panel(key)
+
+    def _resize_panel(self, key):
+        w, h = self.PANEL_SIZE
+        if key in self.wide:
+            w *= 2
+        w, h = max(100, int(w * self._zoom)), max(80, int(h * self._zoom))
+        widget = self._widgets.get(key)
+        if widget is not None:
+            widget.setFixedSize(w, h + widget.layout().itemAt(0).widget().sizeHint().height())
+            return
+        label = self.panel_labels[key]
+        pixmap = self._pixmaps.get(key)
+        if pixmap is None:
+            label.setFixedSize(w, h)
+            return
         img = pixmap.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        image_label.setPixmap(img)
-        image_label.setFixedSize(img.size())
+        label.setPixmap(img)
+        label.setFixedSize(img.size())
 
-    zoom_in.clicked.connect(lambda: do_zoom(1.25))
-    zoom_out.clicked.connect(lambda: do_zoom(0.8))
-
-    layout.addLayout(zoom_container)
-    layout.addWidget(image_scroll)
+    def do_zoom(self, factor):
+        self._zoom = max(0.2, min(6.0, self._zoom * factor))
+        for key in self.panels:
+            self._resize_panel(key)
 
+# -----------------------------------------------------------
+# DIALOG Additional: Structure Comparison
+# -----------------------------------------------------------
+class ComparisonDialog(ProgressiveDialog):
+    # drawn on a live canvas: zooming in with the toolbar re-renders the
+    # visible window at full resolution
+    INTERACTIVE = "diffmap"
+
+    def __init__(self, uniprot_id, title="Structure Comparison"):
+        g1_structure = lazy_import("backend.g1_structure")
+        super().__init__(title, g1_structure.COMPARISON_PANELS)
+        self.load(g1_structure.structure_comparison_data, uniprot_id)
+
+    def show_data(self, result):
+        data, summary, text = result
+        self.summary_box.setText(f"{summary}\n{text}" if text else summary)
+        # experimental or AlphaFold structure missing: the summary says why
+        if data is None:
+            self.panels_unavailable()
+            return
+        g1_structure = lazy_import("backend.g1_structure")
+        self.render_panels(g1_structure.draw_comparison_panel, data,
+                           [key for key in self.panels if key != self.INTERACTIVE])
+        # the overview is computed in the background, the canvas built here
+        key = self.INTERACTIVE
+        self.queue_render(data["diff_map"].render, lambda overview: self._show_canvas(data, overview),
+                          lambda message: self.panel_labels[key].setText(
+                              f"{self.panels[key]}\n\ncould not be drawn: {message}"))
+
+    def _show_canvas(self, data, overview):
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg, NavigationToolbar2QT
+        from matplotlib.figure import Figure
+
+        g1_structure = lazy_import("backend.g1_structure")
+        fig = Figure(figsize=(8, 5))
+        canvas = FigureCanvasQTAgg(fig)
+        g1_structure.draw_comparison_panel(self.INTERACTIVE, dict(data, diff_overview=overview), fig.add_subplot())
+        fig.tight_layout()
 
-    dialog.setLayout(layout)
-    return dialog
+        holder = QWidget()
+        box = QVBoxLayout(holder)
+        box.setContentsMargins(0, 0, 0, 0)
+        box.addWidget(NavigationToolbar2QT(canvas, holder))
+        box.addWidget(canvas)
+        self.show_widget(self.INTERACTIVE, holder)
+        self.finished.connect(lambda _: lazy_import("backend.figures").release(fig))
 
 # -----------------------------------------------------------
 # DIALOG 2: PROTEIN-PROTEIN INTERACTION NETWORK
 # -----------------------------------------------------------
 class PPIDialog(QDialog):
-    def __init__(self, title, text_html, fig, parent=None):
+    def __init__(self, title, text_html, fig, protein_code=None, parent=None):
         super().__init__(parent)
+        self.setAttribute(Qt.WA_DeleteOnClose)
         self.setWindowTitle(title)
         self.resize(900, 800)
 
@@ -611,8 +1020,10 @@ class PPIDialog(QDialog):
         text_box.setReadOnly(True)
         text_box.setHtml(text_html)
 
-        # Simple whole-image zoom controls (treat figure as single image)
+        # Simple whole-image zoom controls (treat figure as single image);
+        # the pixmap is all the dialog keeps of the figure
         pixmap = fig_to_pixmap(fig)
+        lazy_import("backend.figures").release(fig)
         image_label = QLabel()
         image_label.setAlignment(Qt.AlignCenter)
 
@@ -651,197 +1062,243 @@ class PPIDialog(QDialog):
         content_layout.addWidget(text_box)
         content_layout.addLayout(zoom_container)
         content_layout.addWidget(image_label)
+        if protein_code:
+            self._add_partner_table(content_layout, protein_code)
         content_widget.setLayout(content_layout)
         scroll.setWidget(content_widget)
 
         layout.addWidget(scroll)
         self.setLayout(layout)
 
+    def _add_partner_table(self, layout, protein_code):
+        """Ranked partners (PageRank, betweenness, community) for a chosen
+        neighbourhood size; recomputed in the background when the controls
+        change, the previous computation being cancelled"""
+        network_metrics = lazy_import("backend.network_metrics")
+
+        hops_spin = QSpinBox()
+        hops_spin.setRange(1, 3)
+        hops_spin.setValue(1)
+        score_spin = QSpinBox()
+        score_spin.setRange(150, 999)
+        score_spin.setSingleStep(50)
+        score_spin.setValue(400)
+        self._summary_label = QLabel()
+        self._summary_label.setWordWrap(True)
+        self._table_holder = QVBoxLayout()
+        self._metrics_worker = None
+
+        def show_table():
+            if self._metrics_worker is not None:
+                self._metrics_worker.cancel()
+            self._summary_label.setText("Computing network metrics…")
+            self._metrics_worker = Worker(network_metrics.partner_table, protein_code,
+                                          hops_spin.value(), score_spin.value())
+            self._metrics_worker.result.connect(self._show_partner_table)
+            self._metrics_worker.error.connect(self._show_metrics_error)
+            self._metrics_worker.start()
+
+        redraw = QTimer(self)
+        redraw.setSingleShot(True)
+        redraw.setInterval(300)
+        redraw.timeout.connect(show_table)
+        hops_spin.valueChanged.connect(lambda _: redraw.start())
+        score_spin.valueChanged.connect(lambda _: redraw.start())
+        # closing the dialog abandons a computation still running
+        self.finished.connect(lambda _: self._metrics_worker and self._metrics_worker.cancel())
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Ranked partners — hops:"))
+        controls.addWidget(hops_spin)
+        controls.addWidget(QLabel("min. score (0-1000):"))
+        controls.addWidget(score_spin)
+        controls.addStretch()
+        layout.addLayout(controls)
+        layout.addWidget(self._summary_label)
+        layout.addLayout(self._table_holder)
+        show_table()
+
+    def _show_partner_table(self, result):
+        if self.sender() is not self._metrics_worker:
+            return
+        table, summary = result
+        while self._table_holder.count():
+            old = self._table_holder.takeAt(0).widget()
+            if old is not None:
+                old.deleteLater()
+        view, _ = dataframe_to_table(table)
+        view.setMinimumHeight(300)
+        self._table_holder.addWidget(view)
+        self._summary_label.setText(
+            f"{summary['nodes']} proteins, {summary['edges']} links (density {summary['density']:.4f}); "
+            f"{summary['communities']} communities, modularity {summary['modularity']:.2f}"
+            + ("; betweenness estimated from sampled sources" if summary["betweenness_sampled"] else "")
+        )
+
+    def _show_metrics_error(self, message):
+        if self.sender() is self._metrics_worker:
+            self._summary_label.setText(f"Network metrics unavailable: {message}")
+
 # -----------------------------------------------------------
 # Dialogue Disease-associated Variants
 # -----------------------------------------------------------
-def DiseaseVariantDialog(df_table, summary_text, text2, fig2, parent=None):
-    dlg = QDialog(parent)
-    dlg.setWindowTitle("Disease-associated Variants")
-
-    dlg.resize(1100, 950)
-    dlg.setMinimumSize(900, 800)
-
-    main_layout = QVBoxLayout(dlg)
-
-    scroll = QScrollArea()
-    scroll.setWidgetResizable(True)
-    main_layout.addWidget(scroll)
-
-    content = QWidget()
-    layout = QVBoxLayout(content)
-    layout.setContentsMargins(10, 10, 10, 10)
-    layout.setSpacing(12)
-    scroll.setWidget(content)
-
-    # Summary
-    summary_box = QTextEdit()
-    summary_box.setReadOnly(True)
-    summary_box.setText(text2)
-    summary_box.setStyleSheet("background-color: #e7f2ff; font-size: 14px; padding: 8px;")
-    layout.addWidget(summary_box)
-
-    # Figure
-    pixmap = fig_to_pixmap(fig2)
-
-    image_label = QLabel()
-    image_label.setAlignment(Qt.AlignCenter)
-    image_label.setMinimumHeight(480)
-
-    # --- ZOOM SETUP ---
-    init_w, init_h = 1050, 800  # base display size
-    scale = {"factor": 1.0}
-
-    def render_image():
-        w = max(100, int(init_w * scale["factor"]))
-        h = max(100, int(init_h * scale["factor"]))
-        img = pixmap.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        image_label.setPixmap(img)
-        image_label.adjustSize()  # allows scroll area to pan when zoomed
-
-    render_image()
-
-    # put image_label inside a scroll area so zoomed image can be panned
-    image_scroll = QScrollArea()
-    image_scroll.setWidgetResizable(False)
-    image_scroll.setWidget(image_label)
-
-    zoom_in = QPushButton("+")
-    zoom_out = QPushButton("-")
-    zoom_in.setFixedSize(36, 28)
-    zoom_out.setFixedSize(36, 28)
-
-    zoom_container = QHBoxLayout()
-    zoom_container.addStretch()
-    zoom_container.addWidget(zoom_out)
-    zoom_container.addWidget(zoom_in)
-    zoom_container.addStretch()
-
-    def do_zoom(factor):
-        scale["factor"] = max(0.2, min(6.0, scale["factor"] * factor))
-        render_image()
-
-    zoom_in.clicked.connect(lambda: do_zoom(1.25))
-    zoom_out.clicked.connect(lambda: do_zoom(0.8))
-
-    layout.addLayout(zoom_container)
-    layout.addWidget(image_scroll)
-
-    # Table + filters
-    table, proxy = dataframe_to_table(df_table)
-    filter_row = create_filter_row(df_table, proxy)
-
-    table.setAlternatingRowColors(True)
-    table.verticalHeader().setVisible(False)
-    table.horizontalHeader().setStretchLastSection(True)
-    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
-    table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectItems)
-    table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
-
-    table.setStyleSheet("""
-        QTableView {
-            gridline-color: #e0e0e0;
-            background-color: white;
-            alternate-background-color: #f7f9fc;
-            selection-background-color: #cce4ff;
-            font-size: 10.5pt;
-        }
-        QHeaderView::section {
-            background-color: #f0f2f5;
-            padding: 6px;
-            font-weight: bold;
-        }
-    """)
-
-    table.setMinimumHeight(300)
+class DiseaseVariantDialog(ProgressiveDialog):
+    def __init__(self, uniprot_id, parent=None):
+        g3_variant = lazy_import("backend.g3_variant")
+        super().__init__("Disease-associated Variants", g3_variant.DISEASE_PANELS, wide=("A",), parent=parent)
+        self.uniprot_id = uniprot_id
+        self.load(g3_variant.disease_variant_data, uniprot_id)
+
+    def show_data(self, data):
+        g3_variant = lazy_import("backend.g3_variant")
+        df_table = data["table"]
+        if df_table.empty:
+            self.summary_box.setText("No disease-associated variants found for this protein.")
+            self.panels_unavailable()
+            return
+        self.summary_box.setText(data["text"])
+        self.render_panels(g3_variant.draw_disease_panel, data)
+        # hotspots, domain enrichment and structure coverage need more downloads
+        self.run(g3_variant.disease_context_text,
+                 lambda text: self.summary_box.setText(data["text"] + text),
+                 lambda message: self.summary_box.append(f"\n(Domain / structure context unavailable: {message})"),
+                 self.uniprot_id, data)
+        self._add_table(df_table)
+
+    def _add_table(self, df_table):
+        # Table + filters
+        table, proxy = dataframe_to_table(df_table)
+        filter_row = create_filter_row(df_table, proxy)
+
+        table.setAlternatingRowColors(True)
+        table.verticalHeader().setVisible(False)
+        table.horizontalHeader().setStretchLastSection(True)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectItems)
+        table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+
+        table.setStyleSheet("""
+            QTableView {
+                gridline-color: #e0e0e0;
+                background-color: white;
+                alternate-background-color: #f7f9fc;
+                selection-background-color: #cce4ff;
+                font-size: 10.5pt;
+            }
+            QHeaderView::section {
+                background-color: #f0f2f5;
+                padding: 6px;
+                font-weight: bold;
+            }
+        """)
 
-    layout.addWidget(filter_row)
-    layout.addWidget(table)
+        table.setMinimumHeight(300)
 
-    return dlg
+        self.content_layout.addWidget(filter_row)
+        self.content_layout.addWidget(table)
 
 
 # -----------------------------------------------------------
 # DIALOG 3: Variant Analysis
 # -----------------------------------------------------------
-def VariantDialog(fig, summary_text, explain_text, uniprot_id, title="Variant Analysis"):
-    dialog = QDialog()
-    dialog.setWindowTitle(title)
-    dialog.setMinimumSize(900, 800)
-
-    layout = QVBoxLayout()
-
-    summary_box = QTextEdit()
-    summary_box.setReadOnly(True)
-    summary_box.setText(summary_text)
-    summary_box.setStyleSheet("background-color: #e7f2ff; font-size: 14px; padding: 8px;")
-    layout.addWidget(summary_box)
-
-    # Simple whole-image zoom controls (treat figure as single image)
-    pixmap = fig_to_pixmap(fig)
-    image_label = QLabel()
-    image_label.setAlignment(Qt.AlignCenter)
-    init_w, init_h = 800, 600
-    scaled_pix = pixmap.scaled(init_w, init_h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-    image_label.setPixmap(scaled_pix)
-    image_label.setFixedSize(scaled_pix.size())
-
-    # put image_label inside a scroll area so zoomed image can be panned
-    image_scroll = QScrollArea()
-    image_scroll.setWidgetResizable(False)
-    image_scroll.setWidget(image_label)
-
-    zoom_in = QPushButton("+")
-    zoom_out = QPushButton("-")
-    zoom_in.setFixedSize(36, 28)
-    zoom_out.setFixedSize(36, 28)
-
-    zoom_container = QHBoxLayout()
-    zoom_container.addStretch()
-    zoom_container.addWidget(zoom_out)
-    zoom_container.addWidget(zoom_in)
-    zoom_container.addStretch()
-
-    scale = {'factor': 1.0}
-
-    def do_zoom(factor):
-        scale['factor'] *= factor
-        w = max(100, int(init_w * scale['factor']))
-        h = max(100, int(init_h * scale['factor']))
-        img = pixmap.scaled(w, h, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        image_label.setPixmap(img)
-        image_label.setFixedSize(img.size())
-
-    zoom_in.clicked.connect(lambda: do_zoom(1.25))
-    zoom_out.clicked.connect(lambda: do_zoom(0.8))
-
-    layout.addLayout(zoom_container)
-    layout.addWidget(image_scroll)
-
-    explain_box = QTextEdit()
-    explain_box.setReadOnly(True)
-    explain_box.setText(explain_text)
-    explain_box.setStyleSheet("background-color: #e7f2ff; font-size: 14px; padding: 8px;")
-    layout.addWidget(explain_box)
-
-    # Button to open disease-associated variants table
-    #disease_btn = QPushButton("Disease-associated Variants")
-    #disease_btn.setFixedHeight(36)
-    #disease_btn.setStyleSheet("""
-     #   QPushButton { background-color: #2d89ef; color: white; border-radius: 8px; padding: 6px 12px; }
-      #  QPushButton:hover { background-color: #1c6fd6; }
-    #""")
-    #disease_btn.clicked.connect(open_disease_dialog)
-    # place disease button below image
-    #layout.addWidget(disease_btn, alignment=Qt.AlignCenter)
+class VariantDialog(ProgressiveDialog):
+    def __init__(self, uniprot_id, title="Variant Analysis"):
+        g3_variant = lazy_import("backend.g3_variant")
+        super().__init__(title, g3_variant.VARIANT_PANELS)
+        self.uniprot_id = uniprot_id
+
+        explain_box = QTextEdit()
+        explain_box.setReadOnly(True)
+        explain_box.setText(g3_variant.VARIANT_EXPLAIN)
+        explain_box.setStyleSheet("background-color: #e7f2ff; font-size: 14px; padding: 8px;")
+        self.content_layout.addWidget(explain_box)
+
+        self.load(self.load_data, uniprot_id)
+
+    @staticmethod
+    def load_data(uniprot_id):
+        """The variant tables plus the hotspot counts and substitution scores,
+        all computed in the load worker"""
+        g3_variant = lazy_import("backend.g3_variant")
+        data = dict(g3_variant.variant_analysis_data(uniprot_id))
+        data["position_counts"] = g3_variant.position_counts(uniprot_id)
+        data["substitution_scores"] = g3_variant.substitution_scores(uniprot_id)
+        return data
+
+    def show_data(self, data):
+        g3_variant = lazy_import("backend.g3_variant")
+        self.summary_box.setText(g3_variant.variant_summary_text(data))
+        self.render_panels(g3_variant.draw_variant_panel, data)
+        self._add_hotspots(g3_variant, data["position_counts"])
+        self._add_substitutions(g3_variant, data["substitution_scores"])
+
+    def _add_hotspots(self, g3_variant, counts):
+        # Hotspots: redrawn from precomputed per-residue counts when the bin size changes
+        bin_spin = QSpinBox()
+        bin_spin.setRange(1, 500)
+        bin_spin.setValue(20)
+        window_spin = QSpinBox()
+        window_spin.setRange(3, 201)
+        window_spin.setValue(15)
+        hotspot_label = QLabel()
+        hotspot_label.setAlignment(Qt.AlignCenter)
+
+        self._hotspot_worker = None
+
+        def draw_hotspots():
+            # a newer bin size / window supersedes a redraw still running
+            if self._hotspot_worker is not None:
+                self._hotspot_worker.cancel()
+            self._hotspot_worker = self.run(self.figure_png, show_hotspots, lambda message: None,
+                                            g3_variant.hotspot_figure, counts, bin_spin.value(), window_spin.value())
+
+        def show_hotspots(result):
+            hotspot_label.setPixmap(png_to_pixmap(result[0]).scaled(900, 300, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+
+        redraw = QTimer(self)
+        redraw.setSingleShot(True)
+        redraw.setInterval(150)
+        redraw.timeout.connect(draw_hotspots)
+        bin_spin.valueChanged.connect(lambda _: redraw.start())
+        window_spin.valueChanged.connect(lambda _: redraw.start())
+
+        hotspot_row = QHBoxLayout()
+        hotspot_row.addWidget(QLabel("Hotspots — bin size (aa):"))
+        hotspot_row.addWidget(bin_spin)
+        hotspot_row.addWidget(QLabel("window (aa):"))
+        hotspot_row.addWidget(window_spin)
+        hotspot_row.addStretch()
+        self.content_layout.addLayout(hotspot_row)
+        self.content_layout.addWidget(hotspot_label)
+        draw_hotspots()
+
+    def _add_substitutions(self, g3_variant, scores):
+        # Substitution scores (BLOSUM62, Grantham, hydrophobicity, charge)
+        subst_title = QLabel("Substitution scores — rendering…")
+        subst_label = QLabel()
+        subst_label.setAlignment(Qt.AlignCenter)
+        self.content_layout.addWidget(subst_title)
+        self.content_layout.addWidget(subst_label)
+
+        def show(result):
+            png, subst_summary = result
+            subst_title.setText(f"Substitution scores — {subst_summary}")
+            subst_label.setPixmap(png_to_pixmap(png).scaled(900, 260, Qt.KeepAspectRatio, Qt.SmoothTransformation))
+
+        self.queue_render(self.figure_png, show,
+                          lambda message: subst_title.setText(f"Substitution scores unavailable: {message}"),
+                          g3_variant.substitution_figure, scores)
+
+    @staticmethod
+    def figure_png(make, *args):
+        """(PNG bytes, extra) for a figure function returning (fig, extra)"""
+        figures = lazy_import("backend.figures")
+        fig, extra = make(*args)
+        try:
+            return figures.to_png(fig), extra
+        finally:
+            figures.release(fig)
 
-    dialog.setLayout(layout)
-    return dialog
 # -----------------------------------------------------------
 # PAGE 3: RESULT PAGE
 # -----------------------------------------------------------
@@ -920,13 +1377,46 @@ class MainApp(QWidget):
         self.stack.addWidget(self.page2)
         self.stack.addWidget(self.result_page)
 
+        self.perf_panel = PerformancePanel()
+
         layout = QVBoxLayout()
         layout.addWidget(self.stack)
+        layout.addWidget(self.perf_panel)
         self.setLayout(layout)
 
 
+def _on_first_paint(app, import_report):
+    first_paint_ms = (time.perf_counter() - _T_START) * 1000
+    if "--no-warmup" in sys.argv:
+        if import_report:
+            print_import_report(first_paint_ms)
+        return
+
+    def warmup_done():
+        # QtWebEngine has to be created on the GUI thread; start Chromium
+        # now so the first structure dialog does not pay for it
+        try:
+            lazy_import("viewer").shared_view()
+        except ImportError as e:
+            print(f"[WARN] QtWebEngine unavailable: {e}")
+        if import_report:
+            print_import_report(first_paint_ms)
+
+    app._warmup = WarmupThread()
+    app._warmup.finished.connect(warmup_done)
+    app._warmup.start()
+
+
 if __name__ == "__main__":
+    # lets QtWebEngineWidgets be imported after the QApplication exists
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    try:
+        # the provarnet:// scheme (viewer page, bundled 3Dmol.js) must be registered first
+        lazy_import("viewer").register_scheme()
+    except ImportError as e:
+        print(f"[WARN] QtWebEngine unavailable: {e}")
     app = QApplication(sys.argv)
     window = MainApp()
     window.show()
+    QTimer.singleShot(0, lambda: _on_first_paint(app, "--import-report" in sys.argv))
     sys.exit(app.exec_())
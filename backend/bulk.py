@@ -0,0 +1,156 @@
+"""
+Multi-accession fetchers for batch runs.
+
+Each service is asked for many proteins per request, chunked to its
+limits, and the answer is split back into the exact per-protein responses
+the single-protein functions request, stored in the net response cache.
+After prefetch(ids), protein_summary / fetch_uniprot_fasta /
+fetch_variant_data / ppi_network for those ids need no further round
+trips:
+
+    bulk.prefetch(["P04637", "P38398", ...])   # a few requests per hundred proteins
+"""
+import json
+from urllib.parse import quote
+
+from backend import net
+
+UNIPROT_CHUNK = 500      # /uniprotkb/accessions page size limit
+VARIATION_CHUNK = 100    # EBI Proteins API maximum page size
+STRING_CHUNK = 100       # identifiers per GET, keeps the URL short
+STRING_SPECIES = 9606
+STRING_PARTNERS = 10
+
+
+def accession(identifier):
+    """The form of an accession used in every per-protein URL (and so cache key)"""
+    return identifier.strip().upper()
+
+
+def uniprot_entry_url(uniprot_id):
+    return net.url("uniprot", f"/uniprotkb/{accession(uniprot_id)}.json")
+
+
+def uniprot_fasta_url(uniprot_id):
+    return net.url("uniprot", f"/uniprotkb/{accession(uniprot_id)}.fasta")
+
+
+def variation_url(uniprot_id):
+    return net.url("ebi", f"/proteins/api/variation/{accession(uniprot_id)}?format=json")
+
+
+def _chunks(ids, size):
+    ids = list(dict.fromkeys(accession(i) for i in ids if i and i.strip()))
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def fetch_uniprot_entries(ids, chunk=UNIPROT_CHUNK):
+    """UniProt JSON entries by accession; cached as /uniprotkb/<id>.json"""
+    entries = {}
+    for part in _chunks(ids, chunk):
+        url = net.url("uniprot", f"/uniprotkb/accessions?accessions={','.join(part)}&format=json&size={len(part)}")
+        r = net.get(url, timeout=120, cache=False)
+        r.raise_for_status()
+        for entry in net.parse_json(r).get("results", []):
+            acc = entry.get("primaryAccession")
+            if acc:
+                entries[acc] = entry
+                net.cache_put(uniprot_entry_url(acc), json.dumps(entry))
+    return entries
+
+
+def fetch_uniprot_fasta(ids, chunk=UNIPROT_CHUNK):
+    """FASTA records by accession; cached as /uniprotkb/<id>.fasta"""
+    records = {}
+    for part in _chunks(ids, chunk):
+        url = net.url("uniprot", f"/uniprotkb/accessions?accessions={','.join(part)}&format=fasta&size={len(part)}")
+        r = net.get(url, timeout=120, cache=False)
+        r.raise_for_status()
+        for block in r.text.split("\n>"):
+            block = block.strip()
+            if not block:
+                continue
+            block = block if block.startswith(">") else ">" + block
+            header = block.split("\n", 1)[0]
+            fields = header[1:].split("|")
+            acc = fields[1] if len(fields) > 2 else fields[0].split()[0]
+            records[acc] = block + "\n"
+            net.cache_put(uniprot_fasta_url(acc), records[acc], content_type="text/plain")
+    return records
+
+
+def fetch_variation(ids, chunk=VARIATION_CHUNK):
+    """EBI Proteins API variation documents; cached as /proteins/api/variation/<id>?format=json"""
+    docs = {}
+    for part in _chunks(ids, chunk):
+        url = net.url("ebi", f"/proteins/api/variation?accession={','.join(part)}&size={len(part)}&format=json")
+        r = net.get(url, timeout=120, cache=False)
+        if r.status_code == 404:
+            continue
+        r.raise_for_status()
+        for doc in net.parse_json(r):
+            acc = doc.get("accession")
+            if acc:
+                docs[acc] = doc
+                net.cache_put(variation_url(acc), json.dumps(doc))
+    return docs
+
+
+def _string_identifiers(part):
+    return quote("\r".join(part), safe="")
+
+
+def fetch_string_partners(ids, chunk=STRING_CHUNK, limit=STRING_PARTNERS, species=STRING_SPECIES):
+    """STRING interaction partners per accession; cached as the single-identifier
+    /api/json/interaction_partners request that ppi_network makes"""
+    partners = {}
+    for part in _chunks(ids, chunk):
+        # accession -> STRING id, then all partners in one request
+        r = net.get(net.url("string", f"/api/json/get_string_ids?identifiers={_string_identifiers(part)}"
+                                      f"&species={species}&limit=1"), timeout=120, cache=False)
+        r.raise_for_status()
+        by_string_id = {}
+        for row in net.parse_json(r):
+            query = str(row.get("queryItem", "")).upper()
+            if query in part and row.get("stringId"):
+                by_string_id[row["stringId"]] = query
+        if not by_string_id:
+            continue
+
+        r = net.get(net.url("string", f"/api/json/interaction_partners?identifiers="
+                                      f"{_string_identifiers(list(by_string_id))}&species={species}&limit={limit}"),
+                    timeout=120, cache=False)
+        r.raise_for_status()
+        rows = {acc: [] for acc in by_string_id.values()}
+        for row in net.parse_json(r):
+            acc = by_string_id.get(row.get("stringId_A"))
+            if acc is not None:
+                rows[acc].append(row)
+        for acc, acc_rows in rows.items():
+            partners[acc] = acc_rows
+            net.cache_put(string_partners_url(acc, limit, species), json.dumps(acc_rows))
+    return partners
+
+
+def string_partners_url(identifier, limit=STRING_PARTNERS, species=STRING_SPECIES):
+    return net.url("string", f"/api/json/interaction_partners?identifiers={accession(identifier)}"
+                             f"&species={species}&limit={limit}")
+
+
+def prefetch(ids, services=("uniprot", "fasta", "variation", "string")):
+    """Warm the response cache for many proteins; returns {service: proteins found}"""
+    fetchers = {
+        "uniprot": fetch_uniprot_entries,
+        "fasta": fetch_uniprot_fasta,
+        "variation": fetch_variation,
+        "string": fetch_string_partners,
+    }
+    found = {}
+    for service in services:
+        try:
+            found[service] = len(fetchers[service](ids))
+        except Exception as e:
+            print(f"[INFO] Bulk {service} fetch failed, single requests will be used: {e}")
+            found[service] = 0
+    return found
@@ -0,0 +1,89 @@
+"""
+Cooperative cancellation for background work.
+
+A CancelToken is made active for a block with scope(); code running in
+that thread calls check() at convenient points (between HTTP chunks,
+while building DataFrames, before rendering) and stops with Cancelled
+once the token is cancelled from another thread:
+
+    token = CancelToken()
+    with cancel.scope(token):          # in the worker thread
+        g3_variant.Variant_analysis("P04637")
+    token.cancel()                     # from the GUI thread
+
+Cancelled derives from BaseException, like KeyboardInterrupt, so the
+backend's "except Exception" fallbacks let it through. Callbacks
+registered with on_cancel() run at cancel time, e.g. to close a
+streaming response and release its connection.
+"""
+import contextlib
+import threading
+
+_local = threading.local()
+
+
+class Cancelled(BaseException):
+    """The work was superseded or its dialog closed"""
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def on_cancel(self, callback):
+        """Call callback() when cancelled (at once if already); returns a remover"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+def current():
+    """The token active in this thread, or None"""
+    return getattr(_local, "token", None)
+
+
+@contextlib.contextmanager
+def scope(token):
+    previous = current()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def check():
+    """Raise Cancelled if this thread's work has been cancelled"""
+    token = current()
+    if token is not None:
+        token.check()
@@ -0,0 +1,62 @@
+"""
+Stand-alone matplotlib figures for panels rendered off the GUI thread.
+
+Figures are made with the object-oriented API (matplotlib.figure.Figure
+with its own Agg canvas), not pyplot, so several can be drawn at once in
+worker threads and nothing is left in pyplot's figure registry:
+
+    png = panel_png(g3_variant.draw_variant_panel, "A", data)
+
+Such a figure is freed as soon as nothing refers to it; release() drops
+its artists at once, for callers that hold on to the figure object.
+"""
+from io import BytesIO
+
+from backend import cancel, tracing
+
+
+def new_figure(figsize=(8, 5)):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def panel_figure(draw, key, data, figsize=(8, 5)):
+    """One panel, draw(key, data, ax), on a figure of its own"""
+    cancel.check()
+    with tracing.span("matplotlib render", "render", panel=key):
+        fig = new_figure(figsize)
+        draw(key, data, fig.add_subplot())
+        try:
+            fig.tight_layout()
+        except Exception:
+            pass
+    return fig
+
+
+def to_png(fig, dpi=150):
+    """PNG bytes of a figure"""
+    cancel.check()
+    with tracing.span("PNG rasterize", "render") as sp:
+        buf = BytesIO()
+        fig.savefig(buf, format="png", dpi=dpi)
+        sp["args"]["bytes"] = buf.getbuffer().nbytes
+    return buf.getvalue()
+
+
+def release(fig):
+    """Free a figure's axes and artists now rather than at the next garbage collection"""
+    if fig is not None:
+        fig.clear()
+
+
+def panel_png(draw, key, data, figsize=(8, 5), dpi=150):
+    """PNG bytes of one panel; safe to call from a worker thread"""
+    fig = panel_figure(draw, key, data, figsize)
+    try:
+        return to_png(fig, dpi)
+    finally:
+        release(fig)
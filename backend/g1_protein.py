@@ -1,17 +1,42 @@
-import requests
-from collections import Counter
-import networkx as nx
-import matplotlib.pyplot as plt 
+from backend import bulk, cancel, figures, net, seq_features, string_index, tracing
+
+def fetch_domains(protein_id):
+    """InterPro entries with their locations on the protein:
+    [{"accession", "name", "type", "start", "end"}, ...], one per location"""
+    domains = []
+    next_url = net.url("ebi", f"/interpro/api/entry/interpro/protein/uniprot/{protein_id}/")
+    while next_url:
+        r = net.get(next_url, timeout=30)
+        if r.status_code == 204 or r.status_code == 404:
+            break
+        r.raise_for_status()
+        data = net.parse_json(r)
+        for item in data.get("results", []):
+            meta = item["metadata"]
+            for prot in item.get("proteins", []):
+                for loc in prot.get("entry_protein_locations") or []:
+                    frags = loc.get("fragments") or []
+                    if not frags:
+                        continue
+                    domains.append({
+                        "accession": meta["accession"],
+                        "name": meta.get("name"),
+                        "type": meta.get("type"),
+                        "start": min(int(f["start"]) for f in frags),
+                        "end": max(int(f["end"]) for f in frags),
+                    })
+        next_url = data.get("next")
+    return domains
 
 def protein_summary(protein_id:str):
     try:
         uniprot_id = protein_id
 
         # UniProt REST API URL (JSON format)
-        url = f"https://rest.uniprot.org/uniprotkb/{uniprot_id}.json"
+        url = bulk.uniprot_entry_url(uniprot_id)
 
-        response = requests.get(url)
-        data = response.json()
+        response = net.get(url)
+        data = net.parse_json(response)
         
         protein_name = data["proteinDescription"]["recommendedName"]["fullName"]["value"]
         sequence = data["sequence"]["value"]
@@ -19,19 +44,15 @@ def protein_summary(protein_id:str):
             return None
         
 
-        counts = Counter(sequence)
+        props = seq_features.sequence_features(sequence)
+        counts = {aa: round(props[aa] * len(sequence)) for aa in seq_features.AMINO_ACIDS if props[aa] > 0}
 
-        most_common = counts.most_common(1)[0]
-        least_common = counts.most_common()[-1] 
+        most_common = max(counts.items(), key=lambda item: item[1])
+        least_common = min(counts.items(), key=lambda item: item[1])
 
         # domains
-        url_domain = f"https://www.ebi.ac.uk/interpro/api/entry/interpro/protein/uniprot/{protein_id}/"
-        response = requests.get(url_domain).json()
-        domain = []
-        for item in response["results"]:
-            meta = item["metadata"]
-            domain.append((meta["accession"],meta.get("name")))
-        domain_text = "\n".join([f"{a} - {n}" for (a, n) in domain])
+        domains = sorted(fetch_domains(protein_id), key=lambda d: (d["start"], d["end"]))
+        domain_text = "\n".join([f"{d['accession']} - {d['name']} ({d['start']}-{d['end']})" for d in domains])
         
         result = (
             f"Protein Code: {protein_id}\n"
@@ -40,6 +61,11 @@ def protein_summary(protein_id:str):
             f"Amino Acid Sequence: {sequence})\n"
             f"Most Frequent Amino Acid: {most_common[0]} ({most_common[1]} times)\n"
             f"Least Frequent Amino Acid: {least_common[0]} ({least_common[1]} times)\n"
+            f"Molecular Weight: {props['molecular_weight'] / 1000:.1f} kDa\n"
+            f"Isoelectric Point (pI): {props['isoelectric_point']:.2f}\n"
+            f"GRAVY: {props['gravy']:.3f}\n"
+            f"Instability Index: {props['instability_index']:.1f} "
+            f"({'unstable' if props['instability_index'] > 40 else 'stable'})\n"
             f"Domains:\n{domain_text}"
         )
         return result
@@ -52,15 +78,15 @@ def get_alphafold_pdb(protein_id):
     """
     Returns PDB string from AlphaFold
     """
-    url = f"https://alphafold.ebi.ac.uk/api/prediction/{protein_id}"
-    response = requests.get(url)
+    url = net.url("alphafold", f"/api/prediction/{protein_id}")
+    response = net.get(url)
     if response.status_code != 200:
         return None
-    model = response.json()[0]
+    model = net.parse_json(response)[0]
     pdb_url = model.get("pdbUrl")
     if not pdb_url:
         return None
-    pdb_data = requests.get(pdb_url).text
+    pdb_data = net.get(pdb_url).text
 
     alpha = (
         f"=== ALPHAFOLD STRUCTURE INFORMATION ===\n"
@@ -76,19 +102,33 @@ def get_alphafold_pdb(protein_id):
 
 
 ## ------------- Function 3 ----------------------------------
+def string_partners(uniprot_id):
+    """STRING interaction_partners records for a protein (None on an API error);
+    from the local index when PROVARNET_STRING_INDEX is set"""
+    index = string_index.default_index()
+    if index is not None:
+        try:
+            return index.partners(uniprot_id, limit=bulk.STRING_PARTNERS, species=bulk.STRING_SPECIES)
+        except KeyError:
+            return []
+
+    # direct partners only (the drawing links each one to the query protein);
+    # same request that bulk.fetch_string_partners fills the cache with
+    response = net.get(bulk.string_partners_url(uniprot_id))
+    if response.status_code != 200:
+        return None
+    return net.parse_json(response)
+
 def ppi_network(protein_id):
         
     uniprot_id = protein_id
 
-    url = f"https://string-db.org/api/json/network?identifiers={uniprot_id}&species=9606"
-
-    response = requests.get(url)
+    data = string_partners(uniprot_id)
     int_list = []
 
-    if response.status_code != 200:
+    if data is None:
         return KeyError
     else:
-        data = response.json()
    
         if len(data) == 0:
             return ("No interactions found for this protein.")
@@ -99,6 +139,15 @@ def ppi_network(protein_id):
                 score = interaction.get("score", "N/A")
                 int_list.append((partner, score))
 
+    cancel.check()
+
+    with tracing.span("matplotlib render", "render", panel="ppi_network"):
+        return _draw_ppi_network(protein_id, int_list)
+
+def _draw_ppi_network(protein_id, int_list):
+    # plotting stack is only needed here; keep protein_summary light to import
+    import networkx as nx
+
     G = nx.Graph()
     G.add_node(protein_id)
 
@@ -106,7 +155,8 @@ def ppi_network(protein_id):
         G.add_node(partner)
         G.add_edge(protein_id, partner, weight=score)
 
-    fig, ax = plt.subplots(figsize=(6, 5))
+    fig = figures.new_figure((6, 5))
+    ax = fig.add_subplot()
     fig.set_facecolor("#e7f2ff") 
     ax.set_facecolor("#e7f2ff")
 
@@ -1,12 +1,14 @@
 from Bio.PDB import MMCIFParser, PDBParser, PPBuilder, Superimposer
+from Bio.PDB.Polypeptide import three_to_index, index_to_one
 from Bio.PDB.vectors import calc_dihedral
 from Bio import SeqIO, pairwise2
 from Bio.Align import substitution_matrices
-import requests
 import io
+import json
 import numpy as np
-import matplotlib.pyplot as plt
 from requests.exceptions import HTTPError, RequestException
+from backend import bulk, cancel, figures, net, tracing
+from backend.lru import LRUCache
 
 # ---------- INPUT ----------
 #pdb_id     = "4PED"        # experimental structure
@@ -17,24 +19,27 @@ high_cut = 2.0
 
 ppb = PPBuilder()
 
-def pick_longest_structure(uniprot_id: str):
-    
+def fetch_best_structures(uniprot_id: str):
+    """PDBe best_structures entries for a UniProt accession ([] if none)"""
     uniprot_id = uniprot_id.strip().upper()
-    url = f"https://www.ebi.ac.uk/pdbe/api/mappings/best_structures/{uniprot_id}"
-    r = requests.get(url, timeout=30)
-    
+    url = net.url("ebi", f"/pdbe/api/mappings/best_structures/{uniprot_id}")
+    r = net.get(url, timeout=30)
+
     # PDBe uses 404 to mean "no data for this UniProt"
     if r.status_code == 404:
-        return None, None, None, None, None
-    
+        return []
+
     r.raise_for_status()
-    data = r.json()
+    return net.parse_json(r).get(uniprot_id, [])
 
-    candidates = data.get(uniprot_id, [])
-    if not candidates:
-        return None, None, None, None, None
+def structure_coverage(uniprot_id: str):
+    """(unp_start, unp_end) ranges covered by any experimental structure"""
+    return [(int(c["unp_start"]), int(c["unp_end"])) for c in fetch_best_structures(uniprot_id)
+            if c.get("unp_start") is not None and c.get("unp_end") is not None]
+
+def pick_longest_structure(uniprot_id: str):
 
-    candidates = data.get(uniprot_id, [])
+    candidates = fetch_best_structures(uniprot_id)
     if not candidates:
         return None, None, None, None, None  # no experimental structure found
 
@@ -63,10 +68,10 @@ def pick_longest_structure(uniprot_id: str):
 
 def fetch_pdb_mmcif(pdb_id):
     """Fetch experimental structure as mmCIF from RCSB"""
-    url = f"https://files.rcsb.org/download/{pdb_id.lower()}.cif"
+    url = net.url("rcsb", f"/download/{pdb_id.lower()}.cif")
     print(f"[INFO] Fetching PDB {pdb_id} from: {url}")
     try:
-        r = requests.get(url, timeout=30)
+        r = net.get(url, timeout=30)
         r.raise_for_status()
         return io.StringIO(r.text)
     except HTTPError as e:
@@ -75,19 +80,19 @@ def fetch_pdb_mmcif(pdb_id):
 
 def fetch_alphafold_pdb(uniprot_id):
     """Fetch AlphaFold PDB using the API to find the latest file URL"""
-    api_url = f"https://alphafold.ebi.ac.uk/api/prediction/{uniprot_id}"
+    api_url = net.url("alphafold", f"/api/prediction/{uniprot_id}")
     print(f"[INFO] Querying AlphaFold API for: {uniprot_id}")
     try:
-        r = requests.get(api_url, timeout=30)
+        r = net.get(api_url, timeout=30)
         r.raise_for_status()
-        data = r.json()
+        data = net.parse_json(r)
         if not data:
             raise ValueError(f"No AlphaFold entry found for {uniprot_id}")
         
         pdb_url = data[0]['pdbUrl']
         print(f"[INFO] Downloading PDB from: {pdb_url}")
         
-        pdb_r = requests.get(pdb_url, timeout=60)
+        pdb_r = net.get(pdb_url, timeout=60)
         pdb_r.raise_for_status()
         return io.StringIO(pdb_r.text)
     except (HTTPError, KeyError, IndexError, ValueError) as e:
@@ -96,9 +101,16 @@ def fetch_alphafold_pdb(uniprot_id):
 
 def fetch_uniprot_fasta(uniprot_id):
     """Fetch UniProt reference sequence"""
-    url = f"https://rest.uniprot.org/uniprotkb/{uniprot_id}.fasta"
+    # protein_summary usually has the entry already; no second download then
+    hit = net.cached(bulk.uniprot_entry_url(uniprot_id))
+    if hit is not None and hit[0] == 200:
+        try:
+            return json.loads(hit[1])["sequence"]["value"]
+        except (ValueError, KeyError):
+            pass
+    url = bulk.uniprot_fasta_url(uniprot_id)
     try:
-        r = requests.get(url, timeout=30)
+        r = net.get(url, timeout=30)
         r.raise_for_status()
         handle = io.StringIO(r.text)
         record = SeqIO.read(handle, "fasta")
@@ -107,16 +119,139 @@ def fetch_uniprot_fasta(uniprot_id):
         print(f"[ERROR] UniProt {uniprot_id} not found: {e}")
         raise
 
+# ---------- RESIDUE MAPPING ----------
+# Identity check and PDB residue -> UniProt position map, cached per (entry, chain)
+# so the alignment runs once per structure (for the last RESIDUE_MAP_CACHE chains).
+# Each map is {"res_ids": [residue.id, ...], "unp": int32 array, "source": str}
+RESIDUE_MAP_CACHE = 128
+_residue_maps = LRUCache(RESIDUE_MAP_CACHE)
+
+def clear_caches():
+    """Drop the cached identity checks and residue maps"""
+    _residue_maps.clear()
+
+def set_cache_size(entries):
+    """Keep identity checks and residue maps for this many chains"""
+    _residue_maps.resize(entries)
+
+def fetch_sifts_segments(pdb_id, uniprot_id, chain_id):
+    """Fetch the PDBe SIFTS UniProt segments for one chain of an entry"""
+    url = net.url("ebi", f"/pdbe/api/mappings/uniprot/{pdb_id.lower()}")
+    try:
+        r = net.get(url, timeout=30)
+        if r.status_code == 404:
+            return []
+        r.raise_for_status()
+        entry = net.parse_json(r).get(pdb_id.lower(), {})
+    except (RequestException, ValueError) as e:
+        print(f"[ERROR] SIFTS mapping for {pdb_id} failed: {e}")
+        return []
+    mappings = entry.get("UniProt", {}).get(bulk.accession(uniprot_id), {}).get("mappings", [])
+    return [m for m in mappings if m.get("chain_id") == chain_id]
+
+def _one_letter(res):
+    try:
+        return index_to_one(three_to_index(res.get_resname()))
+    except (KeyError, ValueError):
+        return "X"
+
+def sifts_residue_map(chain, segments, ref_seq):
+    """Map author residue numbers to UniProt positions using SIFTS segments.
+    Returns None when the segments are unusable or disagree with the reference sequence."""
+    residues = [r for r in chain if r.id[0] == " " and r.id[2] == " "]
+    if not residues or not segments:
+        return None
+    nums = np.array([r.id[1] for r in residues])
+    unp = np.full(len(residues), -1, dtype=np.int32)
+    for seg in segments:
+        s = seg.get("start", {}).get("author_residue_number")
+        e = seg.get("end", {}).get("author_residue_number")
+        if s is None or e is None:
+            return None
+        mask = (nums >= s) & (nums <= e)
+        unp[mask] = int(seg["unp_start"]) + (nums[mask] - s)
+
+    # reject the mapping if the residue identities do not line up with UniProt
+    mapped = np.nonzero((unp > 0) & (unp <= len(ref_seq)))[0]
+    if len(mapped) == 0:
+        return None
+    agree = sum(_one_letter(residues[i]) == ref_seq[unp[i] - 1] for i in mapped)
+    if agree / len(mapped) < 0.9:
+        return None
+    return {"res_ids": [r.id for r in residues], "unp": unp, "source": "sifts"}
+
+def alignment_residue_map(residues, seq_a, seq_b):
+    """Map structure residues to UniProt positions from a structure-vs-reference alignment"""
+    a = np.frombuffer(seq_a.encode(), dtype=np.uint8)
+    b = np.frombuffer(seq_b.encode(), dtype=np.uint8)
+    gap_a = a == ord("-")
+    gap_b = b == ord("-")
+    struct_idx = np.cumsum(~gap_a) - 1
+    ref_idx = np.cumsum(~gap_b) - 1
+    both = ~gap_a & ~gap_b
+
+    unp = np.full(len(residues), -1, dtype=np.int32)
+    unp[struct_idx[both]] = ref_idx[both] + 1
+    return {"res_ids": [r.id for r in residues], "unp": unp, "source": "alignment"}
+
+def chain_verification(entry_key, chain, ref_seq, segments=None):
+    """verify_protein_identity() of a chain, its residue map taken from SIFTS
+    when available; cached per (entry, chain, reference sequence)"""
+    key = (entry_key, chain.id, ref_seq)
+    result = _residue_maps.get(key)
+    if result is None:
+        result = verify_protein_identity(chain, ref_seq)
+        rmap = sifts_residue_map(chain, segments, ref_seq) if segments else None
+        if rmap is not None:
+            result["residue_map"] = rmap
+        _residue_maps[key] = result
+    return dict(result)
+
+def ca_atoms_by_position(chain, residue_map, length):
+    """Object array of CA atoms indexed by UniProt position (None where absent)"""
+    atoms = np.full(length + 1, None, dtype=object)
+    for rid, pos in zip(residue_map["res_ids"], residue_map["unp"]):
+        if 0 < pos <= length and rid in chain and "CA" in chain[rid]:
+            atoms[pos] = chain[rid]["CA"]
+    return atoms
+
+def common_positions(your_atoms, af_atoms, start, end):
+    """UniProt positions in [start, end] where both structures have a CA atom"""
+    pos = np.arange(len(your_atoms))
+    present = np.fromiter((a is not None and b is not None for a, b in zip(your_atoms, af_atoms)),
+                          dtype=bool, count=len(your_atoms))
+    return pos[present & (pos >= start) & (pos <= end)]
+
+def ca_coords(atoms):
+    return np.array([a.coord for a in atoms], dtype=float).reshape(-1, 3)
+
+def position_coords(atoms):
+    """CA coordinates indexed by UniProt position (NaN where absent), from ca_atoms_by_position()"""
+    xyz = np.full((len(atoms), 3), np.nan)
+    present = np.fromiter((a is not None for a in atoms), dtype=bool, count=len(atoms))
+    if present.any():
+        xyz[present] = ca_coords(atoms[present])
+    return xyz
+
+def structure_coords(your_chain, af_chain, your_map, af_map, length=0):
+    """position_coords() of both structures, over the positions either map reaches"""
+    length = int(max(your_map["unp"].max(), af_map["unp"].max(), length, 0))
+    return (position_coords(ca_atoms_by_position(your_chain, your_map, length)),
+            position_coords(ca_atoms_by_position(af_chain, af_map, length)))
+
 # Structure Comparison Helper Functions
-def get_ca_range(chain, start, end):
-    ca_atoms = []
-    for res in chain:
-        n = res.id[1]
-        if start <= n <= end and "CA" in res:
-            ca_atoms.append(res["CA"])
-    return ca_atoms
-
-def per_residue_rmsd_range(your_chain, af_chain, start, end):
+def per_residue_rmsd_range(your_chain, af_chain, start, end, your_map=None, af_map=None, coords=None):
+    """(UniProt positions, CA deviation) in [start, end]; coords=structure_coords(...)
+    skips rebuilding the position arrays"""
+    if coords is None and your_map is not None and af_map is not None:
+        coords = structure_coords(your_chain, af_chain, your_map, af_map, end)
+    if coords is not None:
+        your_xyz, af_xyz = coords
+        pos = np.arange(len(your_xyz))
+        common = pos[~np.isnan(your_xyz[:, 0]) & ~np.isnan(af_xyz[:, 0]) & (pos >= start) & (pos <= end)]
+        diff = your_xyz[common] - af_xyz[common]
+        return common.tolist(), np.sqrt((diff * diff).sum(axis=1)).tolist()
+
     your_res = {r.id[1]: r for r in your_chain.get_residues() if "CA" in r}
     af_res   = {r.id[1]: r for r in af_chain.get_residues() if "CA" in r}
     
@@ -130,10 +265,13 @@ def per_residue_rmsd_range(your_chain, af_chain, start, end):
         res_nums.append(n)
     return res_nums, rmsd_vals
 
-def segment_rmsd(your_chain, af_chain, seg_dict):
+def segment_rmsd(your_chain, af_chain, seg_dict, your_map=None, af_map=None, coords=None):
+    if coords is None and your_map is not None and af_map is not None:
+        # one set of position arrays for all segments
+        coords = structure_coords(your_chain, af_chain, your_map, af_map, max(e for _, e in seg_dict.values()))
     seg_stats = {}
     for name, (s, e) in seg_dict.items():
-        res_nums_seg, rmsd_vals = per_residue_rmsd_range(your_chain, af_chain, s, e)
+        res_nums_seg, rmsd_vals = per_residue_rmsd_range(your_chain, af_chain, s, e, coords=coords)
         if len(rmsd_vals) == 0: continue
         seg_stats[name] = {
             "mean": float(np.mean(rmsd_vals)),
@@ -151,8 +289,120 @@ def ca_distance_matrix(ca_atoms):
             mat[i, j] = mat[j, i] = np.sqrt(d*d)
     return mat
 
+# ---------- MULTI-RESOLUTION DISTANCE DIFFERENCE ----------
+# |D_your - D_af| is computed in row strips and block-aggregated on the fly,
+# so memory stays bounded by max_cells no matter how long the chain is.
+DIFF_MAP_SIZE = 600          # display resolution (pixels per side)
+DIFF_MAX_CELLS = 1_000_000   # distances held in memory at once
+
+def _pair_distances(a, b):
+    """Euclidean distances between two coordinate blocks (rows of a vs rows of b)"""
+    sq = (a * a).sum(axis=1)[:, None] + (b * b).sum(axis=1)[None, :] - 2.0 * (a @ b.T)
+    return np.sqrt(np.clip(sq, 0.0, None))
+
+def distance_difference_tile(your_xyz, af_xyz, rows, cols):
+    """Full-resolution |D_your - D_af| for residue index ranges rows=(i0, i1), cols=(j0, j1)"""
+    (i0, i1), (j0, j1) = rows, cols
+    d_your = _pair_distances(your_xyz[i0:i1], your_xyz[j0:j1])
+    d_af = _pair_distances(af_xyz[i0:i1], af_xyz[j0:j1])
+    return np.abs(d_your - d_af).astype(np.float32)
+
+def block_distance_difference(your_xyz, af_xyz, rows=None, cols=None,
+                              out_size=DIFF_MAP_SIZE, agg="mean", max_cells=DIFF_MAX_CELLS):
+    """Block-aggregated (mean or max) distance-difference map of at most out_size x out_size.
+    Returns (map, step) where step is the number of residues per output pixel."""
+    n = len(your_xyz)
+    i0, i1 = rows or (0, n)
+    j0, j1 = cols or (0, n)
+    step = max(1, int(np.ceil(max(i1 - i0, j1 - j0) / out_size)))
+    n_rows = int(np.ceil((i1 - i0) / step))
+    n_cols = int(np.ceil((j1 - j0) / step))
+    out = np.zeros((n_rows, n_cols), dtype=np.float32)
+    reduce = np.nanmax if agg == "max" else np.nanmean
+
+    # whole output rows per strip, sized so a strip stays under max_cells
+    strip = step * max(1, max_cells // max(1, (j1 - j0) * step))
+    for r0 in range(i0, i1, strip):
+        r1 = min(i1, r0 + strip)
+        tile = distance_difference_tile(your_xyz, af_xyz, (r0, r1), (j0, j1))
+        # pad the ragged edge with NaN so the tile reshapes into step x step blocks
+        pad_r = -tile.shape[0] % step
+        pad_c = -tile.shape[1] % step
+        if pad_r or pad_c:
+            tile = np.pad(tile, ((0, pad_r), (0, pad_c)), constant_values=np.nan)
+        blocks = tile.reshape(tile.shape[0] // step, step, tile.shape[1] // step, step)
+        out_r0 = (r0 - i0) // step
+        out[out_r0:out_r0 + blocks.shape[0]] = reduce(blocks, axis=(1, 3))
+    return out, step
+
+class DistanceDifferenceMap:
+    """Multi-resolution distance-difference view: an overview at display resolution,
+    refined to full-resolution tiles when an attached axis is zoomed in."""
+
+    def __init__(self, your_xyz, af_xyz, positions, out_size=DIFF_MAP_SIZE, agg="mean"):
+        self.your_xyz = np.asarray(your_xyz, dtype=float)
+        self.af_xyz = np.asarray(af_xyz, dtype=float)
+        self.positions = np.asarray(positions)
+        self.out_size = out_size
+        self.agg = agg
+
+    def _index_range(self, lo, hi):
+        """Indices of the positions within [lo, hi], or None when there are none"""
+        n = len(self.positions)
+        i0 = min(n, max(0, int(np.searchsorted(self.positions, min(lo, hi), side="left"))))
+        i1 = min(n, max(0, int(np.searchsorted(self.positions, max(lo, hi), side="right"))))
+        return (i0, i1) if i1 > i0 else None
+
+    def render(self, xlim=None, ylim=None):
+        """Map for the visible window (UniProt positions); full resolution once it fits"""
+        if len(self.positions) == 0:
+            return np.zeros((1, 1), dtype=np.float32), (0, 1, 1, 0)
+        p = self.positions
+        cols = self._index_range(*xlim) if xlim else (0, len(p))
+        rows = self._index_range(*ylim) if ylim else (0, len(p))
+        if cols is None or rows is None:
+            # view panned off the mapped residues: a blank window
+            x0, x1 = xlim or (p[0] - 0.5, p[-1] + 0.5)
+            y0, y1 = ylim or (p[-1] + 0.5, p[0] - 0.5)
+            return np.full((1, 1), np.nan, dtype=np.float32), (x0, x1, y0, y1)
+        img, _ = block_distance_difference(self.your_xyz, self.af_xyz, rows, cols,
+                                           out_size=self.out_size, agg=self.agg)
+        extent = (p[cols[0]] - 0.5, p[cols[1] - 1] + 0.5, p[rows[1] - 1] + 0.5, p[rows[0]] - 0.5)
+        return img, extent
+
+    def attach(self, ax, overview=None, **imshow_kw):
+        """Draw on ax and re-render the visible window whenever the view limits change
+        (zoom / pan on an interactive canvas); overview is render() done beforehand"""
+        img, extent = overview or self.render()
+        im = ax.imshow(img, extent=extent, interpolation="nearest", **imshow_kw)
+        busy = {"on": False}
+
+        def on_limits(axis):
+            # set_extent moves the limits itself; ignore those nested callbacks
+            if busy["on"]:
+                return
+            busy["on"] = True
+            try:
+                xlim, ylim = axis.get_xlim(), axis.get_ylim()
+                new, ext = self.render(xlim, ylim)
+                im.set_data(new)
+                im.set_extent(ext)
+                # keep the user's zoom window instead of snapping to the new extent
+                axis.set_xlim(xlim)
+                axis.set_ylim(ylim)
+            finally:
+                busy["on"] = False
+
+        ax.callbacks.connect("xlim_changed", on_limits)
+        ax.callbacks.connect("ylim_changed", on_limits)
+        return im
+
 
 # 2. PROTEIN IDENTITY VERIFICATION
+def get_peptide_residues(chain):
+    """Residues of all peptide fragments, in the order their sequence is joined"""
+    return [res for pp in ppb.build_peptides(chain) for res in pp]
+
 def get_full_sequence(chain):
     """Joins all peptide fragments to get the full sequence present in the structure"""
     peptides = ppb.build_peptides(chain)
@@ -160,18 +410,21 @@ def get_full_sequence(chain):
 
 def verify_protein_identity(struct_chain, ref_seq):
     """Calculates sequence identity between the structure and reference sequence"""
+    residues = get_peptide_residues(struct_chain)
     struct_seq = get_full_sequence(struct_chain)
     
     # Perform alignment
     matrix = substitution_matrices.load("BLOSUM62")
-    alignments = pairwise2.align.globalds(struct_seq, ref_seq, matrix, -10, -0.5)
+    with tracing.span("alignment", "analysis", struct_len=len(struct_seq), ref_len=len(ref_seq)):
+        alignments = pairwise2.align.globalds(struct_seq, ref_seq, matrix, -10, -0.5)
     
     if not alignments:
         return {
             "struct_length": len(struct_seq),
             "ref_length": len(ref_seq),
             "identity": 0.0,
-            "is_same_protein": False
+            "is_same_protein": False,
+            "residue_map": None
         }
     
     best_aln = alignments[0]
@@ -182,7 +435,9 @@ def verify_protein_identity(struct_chain, ref_seq):
         "struct_length": len(struct_seq),
         "ref_length": len(ref_seq),
         "identity": identity,
-        "is_same_protein": identity > 90.0
+        "is_same_protein": identity > 90.0,
+        # keep the alignment: it maps every structure residue onto UniProt
+        "residue_map": alignment_residue_map(residues, best_aln.seqA, best_aln.seqB)
     }
 
 def run_full_verification(pdb_id, uniprot_id, chain_id="A"):
@@ -194,8 +449,9 @@ def run_full_verification(pdb_id, uniprot_id, chain_id="A"):
     cif_parser = MMCIFParser(QUIET=True)
     pdb_parser = PDBParser(QUIET=True)
 
-    your_struct = cif_parser.get_structure("your", cif_handle)
-    af_struct   = pdb_parser.get_structure("af",   af_handle)
+    with tracing.span("structure parse", "parse"):
+        your_struct = cif_parser.get_structure("your", cif_handle)
+        af_struct   = pdb_parser.get_structure("af",   af_handle)
 
     # Correctly identify chains
     your_model = list(your_struct.get_models())[0]
@@ -209,9 +465,11 @@ def run_full_verification(pdb_id, uniprot_id, chain_id="A"):
         af_chain = list(af_model.get_chains())[0]
 
     # Verify against UniProt
+    # with residue -> UniProt maps (SIFTS for the experimental entry, alignment as fallback)
     ref_seq = fetch_uniprot_fasta(uniprot_id)
-    your_result = verify_protein_identity(your_chain, ref_seq)
-    af_result   = verify_protein_identity(af_chain,   ref_seq)
+    segments = fetch_sifts_segments(pdb_id, uniprot_id, chain_id)
+    your_result = chain_verification(pdb_id.upper(), your_chain, ref_seq, segments)
+    af_result   = chain_verification(f"AF-{uniprot_id}", af_chain, ref_seq)
 
     summary = f"""
     PROTEIN IDENTITY VERIFICATION
@@ -236,8 +494,9 @@ def run_full_verification(pdb_id, uniprot_id, chain_id="A"):
 
 
 # ---
-def structural_comparison(uniprot_id):
-    
+def structure_comparison_data(uniprot_id):
+    """(panel data or None, verification summary, RMSD text) for the
+    experimental vs AlphaFold comparison"""
     pdb_id, chain_id, start_res, end_res, meta = pick_longest_structure(uniprot_id)
 
     if pdb_id is None:
@@ -257,57 +516,74 @@ def structural_comparison(uniprot_id):
     # Run verification
     summary, your_res_info, af_res_info, your_chain, af_chain = run_full_verification(pdb_id, uniprot_id, chain_id)
 
-    # 1. Structural Superimposition
-    your_ca = get_ca_range(your_chain, start_res, end_res)
-    af_ca   = get_ca_range(af_chain,   start_res, end_res)
-    
-    your_ca_dict = {a.get_parent().id[1]: a for a in your_ca}
-    af_ca_dict   = {a.get_parent().id[1]: a for a in af_ca}
-    common_ids = sorted(set(your_ca_dict.keys()) & set(af_ca_dict.keys()))
-    
-    fixed_ca = [af_ca_dict[i] for i in common_ids]
-    moving_ca = [your_ca_dict[i] for i in common_ids]
+    your_map = your_res_info["residue_map"]
+    af_map   = af_res_info["residue_map"]
+    if your_map is None or af_map is None:
+        return None, summary, "Could not map structure residues onto the UniProt sequence."
+
+    # 1. Structural Superimposition (residues matched by UniProt position)
+    length = your_res_info["ref_length"]
+    your_ca = ca_atoms_by_position(your_chain, your_map, length)
+    af_ca   = ca_atoms_by_position(af_chain,   af_map,   length)
+    common_ids = common_positions(your_ca, af_ca, start_res, end_res)
 
-    sup = Superimposer()
-    sup.set_atoms(fixed_ca, moving_ca)
-    sup.apply(your_chain.get_atoms())
+    fixed_ca = list(af_ca[common_ids])
+    moving_ca = list(your_ca[common_ids])
+
+    with tracing.span("superposition", "analysis", atoms=len(fixed_ca)):
+        sup = Superimposer()
+        sup.set_atoms(fixed_ca, moving_ca)
+        sup.apply(your_chain.get_atoms())
 
     # 2. Analysis
-    res_nums, rmsd_per_res = per_residue_rmsd_range(your_chain, af_chain, start_res, end_res)
+    # superposed CA coordinates by UniProt position, shared by every range below
+    coords = (position_coords(your_ca), position_coords(af_ca))
+    res_nums, rmsd_per_res = per_residue_rmsd_range(your_chain, af_chain, start_res, end_res, coords=coords)
     
-    your_ca_common = [your_ca_dict[i] for i in common_ids]
-    af_ca_common   = [af_ca_dict[i] for i in common_ids]
-    your_mat = ca_distance_matrix(your_ca_common)
-    af_mat   = ca_distance_matrix(af_ca_common)
+    diff_map = DistanceDifferenceMap(ca_coords(moving_ca), ca_coords(fixed_ca), common_ids)
 
-    # 3. Plotting
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-    
-    # RMSD Plot
-    axes[0,0].plot(res_nums, rmsd_per_res, color='red', lw=1)
-    axes[0,0].axhline(high_cut, ls='--', color='orange')
-    axes[0,0].set_title("Per-Residue RMSD")
-    axes[0,0].set_ylabel("Å")
-
-    # RMSD Histogram
-    axes[0,1].hist(rmsd_per_res, bins=25, color='skyblue', edgecolor='black')
-    axes[0,1].set_title("RMSD Distribution")
-
-    # Distance Matrix Difference
-    im = axes[1,0].imshow(np.abs(your_mat - af_mat), cmap='viridis')
-    axes[1,0].set_title("Distance Matrix Difference")
-    plt.colorbar(im, ax=axes[1,0])
-
-    # Segment Bar Chart
     segments = {"N-Term": (1, 150), "Core": (151, 400), "C-Term": (401, 544)}
-    stats = segment_rmsd(your_chain, af_chain, segments)
-    axes[1,1].bar(stats.keys(), [s['mean'] for s in stats.values()], color='green')
-    axes[1,1].set_title("Mean RMSD by Segment")
-
-    plt.tight_layout()
+    stats = segment_rmsd(your_chain, af_chain, segments, coords=coords)
 
     text = f"Global RMSD (on {len(common_ids)} Cα atoms): {sup.rms:.3f} Å"
-    
+    data = {"res_nums": res_nums, "rmsd_per_res": rmsd_per_res, "diff_map": diff_map, "segments": stats}
+    return data, summary, text
+
+COMPARISON_PANELS = {
+    "rmsd": "Per-Residue RMSD",
+    "hist": "RMSD Distribution",
+    "diffmap": "Distance Matrix Difference",
+    "segments": "Mean RMSD by Segment",
+}
+
+def draw_comparison_panel(panel, data, ax):
+    """Draw one of COMPARISON_PANELS onto ax"""
+    if panel == "rmsd":
+        ax.plot(data["res_nums"], data["rmsd_per_res"], color='red', lw=1)
+        ax.axhline(high_cut, ls='--', color='orange')
+        ax.set_ylabel("Å")
+    elif panel == "hist":
+        ax.hist(data["rmsd_per_res"], bins=25, color='skyblue', edgecolor='black')
+    elif panel == "diffmap":
+        im = data["diff_map"].attach(ax, overview=data.get("diff_overview"), cmap='viridis')
+        ax.figure.colorbar(im, ax=ax)
+    elif panel == "segments":
+        stats = data["segments"]
+        ax.bar(stats.keys(), [s['mean'] for s in stats.values()], color='green')
+    ax.set_title(COMPARISON_PANELS[panel])
+
+def structural_comparison(uniprot_id):
+    data, summary, text = structure_comparison_data(uniprot_id)
+    if data is None:
+        return None, summary, text
+
+    cancel.check()
+    with tracing.span("matplotlib render", "render", panel="structural_comparison"):
+        fig = figures.new_figure((14, 10))
+        for panel, ax in zip(COMPARISON_PANELS, fig.subplots(2, 2).flat):
+            draw_comparison_panel(panel, data, ax)
+        fig.tight_layout()
+
     return fig, summary, text
 
 #fig, summary, text = structural_comparison("Q96D53")
@@ -1,41 +1,49 @@
 # COQ8B Protein Analysis Project
 # Tasks 3 & 4: Genetic Variants Mapping and Data Visualization
-import os
-import pandas as pd
-import numpy as np
-import requests
-import matplotlib.pyplot as plt
-import seaborn as sns
-import networkx as nx
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from Bio import SeqIO
-from Bio.SeqUtils.ProtParam import ProteinAnalysis
+import textwrap
 import warnings
 warnings.filterwarnings('ignore')
 
-import requests
-import textwrap
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+import numpy as np
 import pandas as pd
+import matplotlib
 import seaborn as sns
 
+from backend import bulk, cancel, figures, g1_structure, hotspot, interval_index, net, substitution, tracing, warehouse
+from backend.lru import LRUCache
+
+# the plot theme is global matplotlib state: set once here, not from the
+# data and draw functions that run on worker threads
+sns.set_theme(style="whitegrid", context="paper", font_scale=1.1)
+
+PROTEIN_CACHE = 64    # proteins whose hotspot counts / substitution scores are kept
+
+_position_counts = LRUCache(2 * PROTEIN_CACHE)    # ('all' and 'disease' per protein)
+_substitution_scores = LRUCache(PROTEIN_CACHE)
+
+def clear_caches():
+    """Drop the cached hotspot counts and substitution scores"""
+    _position_counts.clear()
+    _substitution_scores.clear()
+
+def set_cache_size(proteins):
+    """Keep hotspot counts and substitution scores for this many proteins"""
+    _position_counts.resize(2 * proteins)
+    _substitution_scores.resize(proteins)
+
 def fetch_variant_data(uniprot_id):
     uniprot_id = uniprot_id.strip().upper()
-    url = f'https://www.ebi.ac.uk/proteins/api/variation/{uniprot_id}?format=json'
+    url = bulk.variation_url(uniprot_id)
     # This is the API link from Uniprot
     #print('Requesting', url)
     # Fetch the JSON
-    r = requests.get(url, timeout=30)
+    r = net.get(url, timeout=30)
     # if 404 or not found, raise a clear error
     if r.status_code == 404:
         raise ValueError(f"No data found for UniProt ID {uniprot_id} (404)")
     r.raise_for_status()
     try:
-        data = r.json()
+        data = net.parse_json(r)
     except ValueError:
         raise ValueError(f"Invalid JSON response for UniProt ID {uniprot_id}")
     variants = data.get('features')
@@ -44,9 +52,40 @@ def fetch_variant_data(uniprot_id):
     return variants
 
 def variant_dataframe(uniprot_id):
+    df_variants, pred_df, _ = variant_tables(uniprot_id)
+    return df_variants, pred_df
+
+def variant_tables(uniprot_id):
+    """(variants, predictions, variant-disease links) for a protein"""
     variants = fetch_variant_data(uniprot_id)
+    with tracing.span("DataFrame build", "pandas", features=len(variants)):
+        tables = build_variant_tables(variants)
+    wh = warehouse.default_warehouse()
+    if wh is not None:
+        with tracing.span("warehouse write", "io"):
+            wh.store_protein(uniprot_id, *tables)
+    return tables
+
+def build_variant_frames(variants):
+    df_variants, pred_df, _ = build_variant_tables(variants)
+    return df_variants, pred_df
+
+def _location_text(location):
+    if isinstance(location, list):
+        return "; ".join(str(x) for x in location) or None
+    return location
+
+def build_variant_tables(variants):
+    """Parse the EBI features once into flat columns: PolyPhen / SIFT score
+    and label, DiseaseList ("; "-joined names) and genomicLocation as text.
+    The nested predictions / association lists are not kept; disease names
+    go into a long variant-disease link table (one row per pair)."""
     parsed_variants = []
-    for var in variants:
+    prediction_records = []
+    disease_links = []
+    for i, var in enumerate(variants):
+        if i % 2048 == 0:
+            cancel.check()
         if var.get('type') == 'VARIANT':
             xrefs = var.get('xrefs') or var.get('xref') or []
             first_id = None
@@ -59,60 +98,76 @@ def variant_dataframe(uniprot_id):
                 if external_link is None and 'url' in x:
                     external_link = x['url']
 
+            row = len(parsed_variants)
+            position = var.get('begin')
+            genomic_location = _location_text(var.get('genomicLocation'))
+
+            scores = {}
+            for p in var.get('predictions') or []:
+                algo = p.get('predAlgorithmNameType')
+                if algo in ('PolyPhen', 'SIFT') and algo not in scores:
+                    scores[algo] = (p.get('score'), p.get('predictionValType'))
+                prediction_records.append({
+                    'variant_id': first_id,
+                    'position': position,
+                    'type': var.get('type'),
+                    'alt_seq': var.get('alternativeSequence'),
+                    'end': var.get('end'),
+                    'genomicLocation': genomic_location,
+                    'consequence': var.get('consequenceType'),
+                    'mutatedType': var.get('mutatedType'),
+                    'wild_type': var.get('wildType'),
+                    'algorithm': algo,
+                    'prediction': p.get('predictionValType'),
+                    'score': p.get('score'),
+                    'source': ",".join(p.get('sources', []))
+                })
+
+            association = var.get('association') or []
+            names = []
+            for item in association if isinstance(association, list) else []:
+                if isinstance(item, dict) and item.get('disease') is True and item.get('name'):
+                    names.append(item['name'])
+                    disease_links.append({'row': row, 'variant_id': first_id,
+                                          'begin': position, 'disease': item['name']})
+
+            polyphen = scores.get('PolyPhen', (None, None))
+            sift = scores.get('SIFT', (None, None))
             parsed_variants.append({
                 'variant_id': first_id,
-                'external_url': external_link,  
+                'external_url': external_link,
                 'type': var.get('type'),
                 'alt_seq': var.get('alternativeSequence'),
-                'begin': var.get('begin'),
+                'begin': position,
                 'end': var.get('end'),
-                'genomicLocation': var.get('genomicLocation'),
+                'genomicLocation': genomic_location,
                 'consequence': var.get('consequenceType'),
                 'mutatedType': var.get('mutatedType'),
-                'predictions': var.get('predictions'),
                 'wild_type': var.get('wildType'),
-                'association' : var.get('association'),
+                'has_association': bool(association),
+                'DiseaseList': "; ".join(names) if names else None,
+                'PolyPhen_score': polyphen[0],
+                'PolyPhen_prediction': polyphen[1],
+                'SIFT_score': sift[0],
+                'SIFT_prediction': sift[1],
                 'Clinical Significance': var.get('clinicalSignificance'),
             })
     # Convert to DataFrame
-    df_variants = pd.DataFrame(parsed_variants)
+    df_variants = pd.DataFrame(parsed_variants, columns=[
+        'variant_id', 'external_url', 'type', 'alt_seq', 'begin', 'end', 'genomicLocation',
+        'consequence', 'mutatedType', 'wild_type', 'has_association', 'DiseaseList',
+        'PolyPhen_score', 'PolyPhen_prediction', 'SIFT_score', 'SIFT_prediction',
+        'Clinical Significance'])
+    for col in ('PolyPhen_score', 'SIFT_score'):
+        df_variants[col] = pd.to_numeric(df_variants[col], errors='coerce')
+    with tracing.span("substitution scores", "numpy", variants=len(df_variants)):
+        substitution.add_substitution_scores(df_variants)
+    df_links = pd.DataFrame(disease_links, columns=['row', 'variant_id', 'begin', 'disease'])
+    df_links['begin'] = pd.to_numeric(df_links['begin'], errors='coerce')
     # Predicted Dataframe
-    prediction_records = []
-    for v in variants:
-        if v.get('type') == 'VARIANT':
-            position = v.get("begin")
-            type = v.get('type')
-            alt_seq = v.get('alternativeSequence')
-            end = v.get('end')
-            genomicLocation = v.get('genomicLocation')
-            consequence= v.get('consequenceType')
-            mutatedType= v.get('mutatedType')
-            wild_type = v.get('wildType')
-            xrefs = v.get('xref',[])
-            first_id = None
-            xrefs = v.get('xrefs', [])
-            for x in xrefs:
-                if 'id' in x:
-                    first_id = x['id']
-                break
-            for p in v.get('predictions', []):
-                prediction_records.append({
-                    'variant_id': first_id,
-                    'position': position,
-                    'type': type,
-                    'alt_seq': alt_seq,
-                    'end': end,
-                    'genomicLocation': genomicLocation,
-                    'consequence': consequence,
-                    'mutatedType': mutatedType,
-                    'wild_type': wild_type,
-                    'algorithm': p.get('predAlgorithmNameType'),
-                    'prediction': p.get('predictionValType'),
-                    'score': p.get('score'),
-                    'source': ",".join(p.get('sources', []))
-                })
-
-    pred_df = pd.DataFrame(prediction_records)
+    pred_df = pd.DataFrame(prediction_records, columns=[
+        'variant_id', 'position', 'type', 'alt_seq', 'end', 'genomicLocation', 'consequence',
+        'mutatedType', 'wild_type', 'algorithm', 'prediction', 'score', 'source'])
     # clean up preditions
     impact_map = {
         "deleterious": "Deleterious",
@@ -137,184 +192,176 @@ def variant_dataframe(uniprot_id):
         else:
             return "Other"
 
-    pred_df["impact_class"] = pred_df["prediction"].apply(map_prediction)
-    pred_df["Map_pred"] = (
-        pred_df["prediction"]
-        .str.lower()
-        .map(lambda x: next((impact_map[k] for k in impact_map if k in x), "Other"))
+    # a handful of distinct labels: classify each once, then map
+    labels = pred_df["prediction"].unique()
+    pred_df["impact_class"] = pred_df["prediction"].map({x: map_prediction(x) for x in labels})
+    pred_df["Map_pred"] = pred_df["prediction"].map(
+        {x: next((impact_map[k] for k in impact_map if k in x.lower()), "Other") for x in labels}
     )
 
     pred_df["position"] = pd.to_numeric(pred_df["position"], errors="coerce")
     pred_df['score'] = pd.to_numeric(pred_df['score'], errors='coerce')
 
-    return df_variants, pred_df
+    return df_variants, pred_df, df_links
 
-############# PLOTTING FUNCTION #######################
+def variant_residue_profiles(df_variants, pred_df, length=None):
+    """Per-position arrays indexed by UniProt position (index 0 unused):
+    'density' (variants per residue), 'polyphen' (max PolyPhen score, NaN
+    where none) and 'disease' (disease-associated variants per residue)"""
+    pos = pd.to_numeric(df_variants['begin'], errors='coerce').to_numpy(dtype=float)
+    ok = ~np.isnan(pos)
+    pos_ok = pos[ok].astype(np.int64)
+    size = int(max(length or 0, pos_ok.max(initial=0))) + 1
 
-def Variant_analysis(uniprot_id):
+    density = np.bincount(pos_ok, minlength=size)
+    sick = df_variants['DiseaseList'].notna().to_numpy()
+    disease = np.bincount(pos[ok & sick].astype(np.int64), minlength=size)
+
+    polyphen = np.full(size, np.nan)
+    if not pred_df.empty:
+        pp = pred_df[pred_df['algorithm'] == 'PolyPhen']
+        p = pp['position'].to_numpy(dtype=float)
+        sc = pp['score'].to_numpy(dtype=float)
+        keep = ~(np.isnan(p) | np.isnan(sc)) & (p < size)
+        np.fmax.at(polyphen, p[keep].astype(np.int64), sc[keep])
+
+    return {'density': density, 'polyphen': polyphen, 'disease': disease}
+
+def structure_variant_profiles(uniprot_id, length=None):
     df_variants, pred_df = variant_dataframe(uniprot_id)
-    polyphen_df = pred_df[pred_df['algorithm'].astype(str).str.contains('polyphen', case=False, na=False)].copy()
-    polyphen_df['score'] = pd.to_numeric(polyphen_df['score'], errors='coerce')
+    with tracing.span("residue profiles", "numpy", variants=len(df_variants)):
+        return variant_residue_profiles(df_variants, pred_df, length)
 
-    sns.set_theme(style="whitegrid", context="paper", font_scale=1.1)
-    fig = plt.figure(figsize=(16, 10))
-    fig
-    # A
-    plt.subplot(2, 3, 1)
-    plt.hist(polyphen_df['position'].dropna(), bins=30, alpha=0.7, color='skyblue', edgecolor='black')
-    plt.xlabel("Amino acid position")
-    plt.ylabel("Number of variants")
-    plt.title("A. Variant distribution along protein sequence")
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    # B — show source (SIFT vs PolyPhen) by color/marker
-    plt.subplot(2, 3, 2)
-
-    BIN_SIZE = 20
-
-    pred_df1 = pred_df.copy()
-    pred_df1["pos_bin"] = (pred_df1["position"] // BIN_SIZE) * BIN_SIZE
-
-    agg_df = (
-        pred_df1
-        .groupby(["pos_bin", "Map_pred", "algorithm"])
-        .size()
-        .reset_index(name="count")
-    )
+############# PLOTTING FUNCTION #######################
 
-    impact_order = [
-        "Probably Damaging",
-        "Possibly Damaging",
-        "Benign",
-        "Deleterious",
-        "Tolerated"
-    ]
-
-    y_map = {label: i for i, label in enumerate(impact_order)}
-    agg_df["y"] = agg_df["Map_pred"].map(y_map)
-
-    ax = plt.subplot(2, 3, 2)
-
-    color_map = {"SIFT": "tab:blue", "PolyPhen": "tab:orange"}
-    marker_map = {"SIFT": "o", "PolyPhen": "o"}
-
-    for algo in agg_df["algorithm"].unique():
-        sub = agg_df[agg_df["algorithm"] == algo]
-
-        ax.scatter(
-            sub["pos_bin"],
-            sub["y"],
-            s=sub["count"] * 8, 
-            alpha=0.7,
-            facecolors=color_map[algo],
-            edgecolors="black",
-            linewidths=0.3,
-            marker=marker_map[algo],
-            label=algo,
-        )
-    ax.set_yticks(range(len(impact_order)))
-    ax.set_yticklabels(impact_order)
-    ax.set_xlabel("Protein position (binned, 20 aa)")
-    ax.set_title("B. Predicted functional effects across protein")
-    ax.legend(title="Source", frameon=False, loc=0, bbox_to_anchor=(1, 1), borderaxespad=0.)
+def position_counts(uniprot_id, kind="all"):
+    """Cached PositionCounts of a protein's variants ('all' or 'disease'),
+    filled by variant_analysis_data / disease_variant_data"""
+    key = (uniprot_id.strip().upper(), kind)
+    counts = _position_counts.get(key)
+    if counts is None:
+        df_variants, _ = variant_dataframe(uniprot_id)
+        positions = pd.to_numeric(df_variants['begin'], errors='coerce')
+        if kind == "disease":
+            positions = positions[df_variants['DiseaseList'].notna()]
+        counts = _position_counts[key] = hotspot.PositionCounts(positions)
+    return counts
+
+def hotspot_figure(counts, bin_size=20, window=15, title="Variant hotspots"):
+    """Binned counts, sliding-window density and significant hotspots;
+    cheap to redraw for another bin size since counts are precomputed"""
+    starts, binned = counts.binned(bin_size)
+    pos, dens = counts.window(window)
+    calls = counts.hotspots(window)
+
+    fig = figures.new_figure((12, 4))
+    ax = fig.add_subplot()
+    ax.bar(starts, binned.sum(axis=0), width=bin_size, align="edge",
+           color="#6baed6", edgecolor="black", linewidth=0.3, label=f"Variants per {bin_size} aa")
+    ax2 = ax.twinx()
+    ax2.plot(pos, dens, color="tab:red", linewidth=1, label=f"{window}-aa sliding window")
+    for row in calls.itertuples():
+        ax.axvspan(row.start, row.end + 1, color="gold", alpha=0.3)
+    ax.set_xlim(0, counts.length + 1)
+    ax.set_xlabel("Amino acid position")
+    ax.set_ylabel("Variants per bin")
+    ax2.set_ylabel("Variants per window")
+    ax.set_title(f"{title} ({len(calls)} significant region{'s' if len(calls) != 1 else ''}, shaded)")
     ax.grid(True, alpha=0.3)
-    # C
-    plt.subplot(2, 3, 3)
-
-    consequence_order = ['missense', 'frameshift', 'stop gained', '-', 'inframe deletion', 'insertion', 'stop lost']
-    consequence_counts = df_variants['consequence'].value_counts()
-    consequence_counts = consequence_counts.reindex(consequence_order, fill_value=0)
-    counts = consequence_counts.copy()
-    threshold = 0.03 * counts.sum()
-    small = counts[counts < threshold].sum()
-    counts = counts[counts >= threshold]
-    counts['Other'] = small
-
-
-    wedges, texts, autotexts = plt.pie(
-        counts.values,
-        labels=None,             
-        autopct='%1.1f%%',        
-        startangle=40,
-        colors=plt.cm.tab20.colors
-    )
-    plt.legend(wedges, consequence_counts.index, title="Variant Consequences", bbox_to_anchor=(1.05, 0.5), loc="center left")
-    plt.title('C. Distribution of Variant Consequences')
-    plt.tight_layout()
-    # D -- Plot PolyPhen scores only
-    plt.subplot(2, 3, 4)
-
-    # select PolyPhen predictions (case-insensitive)
-    polyphen = polyphen_df[['position', 'score']].dropna()
-
-    if polyphen.empty:
-        plt.text(0.5, 0.5, 'No PolyPhen predictions available', ha='center', va='center')
-        plt.xlabel('Amino acid position')
-        plt.ylabel('PolyPhen score')
-    else:
-        vmin = polyphen['score'].min()
-        vmax = polyphen['score'].max()
-        sc = plt.scatter(
-            polyphen['position'],
-            polyphen['score'],
-            c=polyphen['score'],
-            cmap='GnBu',
-            vmin=vmin,
-            vmax=vmax,
-            s=30,
-            alpha=0.85
-        )
-        mappable = plt.cm.ScalarMappable(norm=plt.Normalize(vmin=vmin, vmax=vmax), cmap='GnBu')
-        mappable.set_array(polyphen['score'].values)
-        ax = plt.gca()
-        fig = plt.gcf()
-        fig.colorbar(mappable, ax=ax, label=None)
-        plt.xlabel('Amino acid position')
-        plt.ylabel('PolyPhen score')
-        plt.title('D. PolyPhen prediction scores across protein sequence')
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-    # E
-    plt.subplot(2, 3, 5)
-
-    high_impact = polyphen_df[polyphen_df["impact_class"] == "High impact"]
-    low_impact = polyphen_df[polyphen_df["impact_class"] == "Low / neutral"]
-
-    plt.hist(
-        [high_impact["position"], low_impact["position"]],
-        color=["salmon", "darkblue"],
-        bins=20,
-        label=["High impact", "Low / neutral"],
-        alpha=0.8
-    )
-
-    plt.xlabel("Amino acid position")
-    plt.ylabel("Number of variants")
-    plt.title("E. Positional enrichment of variant impact")
-    plt.legend()
-    plt.grid(True, alpha=0.3)
-    plt.tight_layout()
-    # F
-    plt.subplot(2, 3, 6)
-
-    sns.countplot(
-        data=pred_df,
-        x="impact_class",
-        hue="algorithm",
-        order=["High impact", "Moderate impact", "Low / neutral", "Uncertain"],
-        palette="Paired"
-    )
+    fig.tight_layout()
+    return fig, calls
+
+def substitution_scores(uniprot_id):
+    """Cached per-variant substitution scores with PolyPhen score and disease flag"""
+    key = uniprot_id.strip().upper()
+    scores = _substitution_scores.get(key)
+    if scores is None:
+        df_variants, _ = variant_dataframe(uniprot_id)
+        scores = _substitution_scores[key] = _score_table(df_variants)
+    return scores
+
+def _score_table(df_variants):
+    table = df_variants[substitution.SCORE_COLUMNS + ['PolyPhen_score']].copy()
+    table['disease'] = df_variants['DiseaseList'].notna()
+    return table
+
+def substitution_figure(scores):
+    """Panel of BLOSUM62 / Grantham / hydrophobicity / charge changes,
+    disease-associated variants against the rest"""
+    scored = scores.dropna(subset=['Grantham'])
+    sick, rest = scored[scored['disease']], scored[~scored['disease']]
+
+    fig = figures.new_figure((16, 4))
+    axes = fig.subplots(1, 4)
+    ax = axes[0]
+    ax.hist([rest['Grantham'], sick['Grantham']], bins=np.arange(0, 230, 10), stacked=True,
+            color=["#9ecae1", "salmon"], label=["Other", "Disease-associated"])
+    ax.set_xlabel("Grantham distance")
+    ax.set_ylabel("Number of variants")
+    ax.set_title("A. Grantham distance")
+    ax.legend(frameon=False)
+
+    ax = axes[1]
+    values = np.arange(-4, 4)
+    ax.bar(values - 0.2, [(rest['BLOSUM62'] == v).sum() for v in values], width=0.4, color="#9ecae1", label="Other")
+    ax.bar(values + 0.2, [(sick['BLOSUM62'] == v).sum() for v in values], width=0.4, color="salmon", label="Disease-associated")
+    ax.set_xlabel("BLOSUM62 score")
+    ax.set_title("B. BLOSUM62")
+
+    ax = axes[2]
+    ax.hist([rest['hydrophobicity_change'], sick['hydrophobicity_change']], bins=np.arange(-9.5, 10, 1), stacked=True,
+            color=["#9ecae1", "salmon"])
+    ax.set_xlabel("Δ hydrophobicity (Kyte-Doolittle)")
+    ax.set_title("C. Hydrophobicity change")
+
+    ax = axes[3]
+    has_pp = scored.dropna(subset=['PolyPhen_score'])
+    sc = ax.scatter(has_pp['Grantham'], has_pp['PolyPhen_score'], c=has_pp['charge_change'],
+                    cmap="coolwarm", vmin=-2, vmax=2, s=8, alpha=0.6)
+    fig.colorbar(sc, ax=ax, label="Δ charge")
+    ax.set_xlabel("Grantham distance")
+    ax.set_ylabel("PolyPhen score")
+    ax.set_title("D. Grantham vs PolyPhen")
+    for ax in axes:
+        ax.grid(True, alpha=0.3)
+    fig.tight_layout()
+
+    summary = (f"Scored substitutions: {len(scored)} — mean Grantham {sick['Grantham'].mean():.0f} "
+               f"(disease-associated) vs {rest['Grantham'].mean():.0f} (other); "
+               f"charge-changing: {(scored['charge_change'] != 0).mean() * 100:.1f}%")
+    return fig, summary
+
+VARIANT_PANELS = {
+    "A": "Variant distribution along protein sequence",
+    "B": "Predicted functional effects across protein",
+    "C": "Distribution of Variant Consequences",
+    "D": "PolyPhen prediction scores across protein sequence",
+    "E": "Positional enrichment of variant impact",
+    "F": "Predicted impact by algorithm",
+}
+
+VARIANT_EXPLAIN = """
+    Plot A shows the distribution of variants along the protein. Variants cluster, with high-impact variants concentrated at positions critical for function.
+    Plot B visualizes predicted functional effects by source (SIFT vs PolyPhen). Larger points indicate more variants in that bin.
+    Plot C summarizes the types of variant consequences observed, with missense mutations being most common.
+    Plot D displays PolyPhen prediction scores across the protein sequence, with higher scores indicating more likely damaging effects.
+    Plot E highlights positional enrichment of high vs low impact variants, showing clustering of high-impact variants at key regions.
+    Plot F compares predicted impact classes by algorithm, revealing differences in sensitivity between predictors.
+    """
 
-    plt.xlabel("Impact class")
-    plt.ylabel("Number of variants")
-    plt.title("F. Predicted impact by algorithm")
-    plt.xticks(rotation=30, ha="right")
-    plt.legend(title="Predictor")
-    plt.grid(True, alpha=0.3)
+def variant_analysis_data(uniprot_id):
+    """Tables and aggregates behind the variant analysis panels"""
+    df_variants, pred_df = variant_dataframe(uniprot_id)
+    key = uniprot_id.strip().upper()
+    _position_counts[(key, "all")] = hotspot.PositionCounts(pd.to_numeric(df_variants['begin'], errors='coerce'))
+    _substitution_scores[key] = _score_table(df_variants)
+    polyphen_df = pred_df[pred_df['algorithm'].astype(str).str.contains('polyphen', case=False, na=False)].copy()
+    polyphen_df['score'] = pd.to_numeric(polyphen_df['score'], errors='coerce')
+    return {"df_variants": df_variants, "pred_df": pred_df, "polyphen_df": polyphen_df}
 
-    plt.tight_layout()
-    #plt.show()
-    summary_text = f"""
+def variant_summary_text(data):
+    df_variants, polyphen_df = data["df_variants"], data["polyphen_df"]
+    return f"""
     \n📈 VARIANT ANALYSIS SUMMARY
     Total variants: {df_variants['variant_id'].nunique()}
     Protein position range: {polyphen_df['position'].min()}–{polyphen_df['position'].max()}
@@ -323,76 +370,190 @@ def Variant_analysis(uniprot_id):
     \nPercent predicted high impact: {100 * len(polyphen_df[polyphen_df['impact_class'] == 'High impact']) / len(polyphen_df):.2f}%
     Top deleterious variants:
     {polyphen_df.sort_values(by='score', ascending=False).head(5)[['variant_id', 'position', 'score', 'prediction']].to_string(index=False)}
-    \nVariants with disease association: {df_variants[df_variants['association'].notna()]['variant_id'].nunique()}
+    \nVariants with disease association: {df_variants[df_variants['has_association']]['variant_id'].nunique()}
 
     """
-    explain = """
-    Plot A shows the distribution of variants along the protein. Variants cluster, with high-impact variants concentrated at positions critical for function.
-    Plot B visualizes predicted functional effects by source (SIFT vs PolyPhen). Larger points indicate more variants in that bin.
-    Plot C summarizes the types of variant consequences observed, with missense mutations being most common.
-    Plot D displays PolyPhen prediction scores across the protein sequence, with higher scores indicating more likely damaging effects.
-    Plot E highlights positional enrichment of high vs low impact variants, showing clustering of high-impact variants at key regions.
-    Plot F compares predicted impact classes by algorithm, revealing differences in sensitivity between predictors.
-    """
-    return fig, summary_text, explain
 
-#fig, summary = Variant_analysis("P61073")
+def draw_variant_panel(panel, data, ax):
+    """Draw one of VARIANT_PANELS onto ax"""
+    df_variants, pred_df, polyphen_df = data["df_variants"], data["pred_df"], data["polyphen_df"]
+    title = f"{panel}. {VARIANT_PANELS[panel]}"
+
+    if panel == "A":
+        ax.hist(polyphen_df['position'].dropna(), bins=30, alpha=0.7, color='skyblue', edgecolor='black')
+        ax.set_xlabel("Amino acid position")
+        ax.set_ylabel("Number of variants")
+        ax.set_title(title)
+        ax.grid(True, alpha=0.3)
+
+    elif panel == "B":
+        # show source (SIFT vs PolyPhen) by color/marker
+        BIN_SIZE = 20
+
+        impact_order = [
+            "Probably Damaging",
+            "Possibly Damaging",
+            "Benign",
+            "Deleterious",
+            "Tolerated"
+        ]
 
-def disease_associated_variants(uniprot_id):
-    df_variants, pred_df = variant_dataframe(uniprot_id)
-        # dISEASE ASSOCIATIONS EXTRACTION
-    def extract_diseases(association):
-        if not association:
-            return None
-
-        names = []
-        if isinstance(association, list):
-            for item in association:
-                if isinstance(item, dict) and item.get('disease') is True:
-                    if item.get('name'):
-                        names.append(item['name'])
-
-        return "; ".join(names) if names else None
-
-    def extract_polyphen(predictions):
-        if not predictions or not isinstance(predictions, list):
-            return None, None
-
-        for pred in predictions:
-            if pred.get('predAlgorithmNameType') == 'PolyPhen':
-                score = pred.get('score')
-                label = pred.get('predictionValType')
-                return score, label
-
-        return None, None
-
-    df_variants[['PolyPhen_score', 'PolyPhen_prediction']] = (
-        df_variants['predictions']
-        .apply(lambda x: pd.Series(extract_polyphen(x)))
-    )
-    df_variants['DiseaseList'] = df_variants['association'].apply(extract_diseases)
+        # one bincount over (prediction, algorithm) groups instead of a 3-key groupby
+        codes, combos = pd.MultiIndex.from_arrays([pred_df["Map_pred"], pred_df["algorithm"]]).factorize()
+        grouped = hotspot.PositionCounts(pred_df["position"], groups=codes, n_groups=len(combos))
+        bin_starts, binned = grouped.binned(BIN_SIZE)
+
+        y_map = {label: i for i, label in enumerate(impact_order)}
+        agg = {}
+        for g, (pred, algo) in enumerate(combos):
+            if pred not in y_map:
+                continue
+            nz = np.flatnonzero(binned[g])
+            xs, ys, cs = agg.setdefault(algo, ([], [], []))
+            xs.append(bin_starts[nz])
+            ys.append(np.full(len(nz), y_map[pred]))
+            cs.append(binned[g, nz])
+
+        color_map = {"SIFT": "tab:blue", "PolyPhen": "tab:orange"}
+        marker_map = {"SIFT": "o", "PolyPhen": "o"}
+
+        for algo, (xs, ys, cs) in agg.items():
+            ax.scatter(
+                np.concatenate(xs),
+                np.concatenate(ys),
+                s=np.concatenate(cs) * 8,
+                alpha=0.7,
+                facecolors=color_map[algo],
+                edgecolors="black",
+                linewidths=0.3,
+                marker=marker_map[algo],
+                label=algo,
+            )
+        ax.set_yticks(range(len(impact_order)))
+        ax.set_yticklabels(impact_order)
+        ax.set_xlabel("Protein position (binned, 20 aa)")
+        ax.set_title(title)
+        ax.legend(title="Source", frameon=False, loc=0, bbox_to_anchor=(1, 1), borderaxespad=0.)
+        ax.grid(True, alpha=0.3)
+
+    elif panel == "C":
+        consequence_order = ['missense', 'frameshift', 'stop gained', '-', 'inframe deletion', 'insertion', 'stop lost']
+        consequence_counts = df_variants['consequence'].value_counts()
+        consequence_counts = consequence_counts.reindex(consequence_order, fill_value=0)
+        counts = consequence_counts.copy()
+        threshold = 0.03 * counts.sum()
+        small = counts[counts < threshold].sum()
+        counts = counts[counts >= threshold]
+        counts['Other'] = small
+
+        wedges, texts, autotexts = ax.pie(
+            counts.values,
+            labels=None,             
+            autopct='%1.1f%%',        
+            startangle=40,
+            colors=matplotlib.colormaps["tab20"].colors
+        )
+        ax.legend(wedges, consequence_counts.index, title="Variant Consequences", bbox_to_anchor=(1.05, 0.5), loc="center left")
+        ax.set_title(title)
 
-    df_disease_exploded = df_variants.explode('DiseaseList')
-    df_disease_exploded['DiseaseList'] = df_disease_exploded['DiseaseList'].fillna('Not specified')
+    elif panel == "D":
+        # PolyPhen scores only
+        polyphen = polyphen_df[['position', 'score']].dropna()
 
-    disease_counts = df_disease_exploded['DiseaseList'].value_counts()
+        if polyphen.empty:
+            ax.text(0.5, 0.5, 'No PolyPhen predictions available', ha='center', va='center')
+            ax.set_xlabel('Amino acid position')
+            ax.set_ylabel('PolyPhen score')
+        else:
+            vmin = polyphen['score'].min()
+            vmax = polyphen['score'].max()
+            ax.scatter(
+                polyphen['position'],
+                polyphen['score'],
+                c=polyphen['score'],
+                cmap='GnBu',
+                vmin=vmin,
+                vmax=vmax,
+                s=30,
+                alpha=0.85
+            )
+            mappable = matplotlib.cm.ScalarMappable(norm=matplotlib.colors.Normalize(vmin=vmin, vmax=vmax), cmap='GnBu')
+            mappable.set_array(polyphen['score'].values)
+            ax.figure.colorbar(mappable, ax=ax, label=None)
+            ax.set_xlabel('Amino acid position')
+            ax.set_ylabel('PolyPhen score')
+            ax.set_title(title)
+            ax.grid(True, alpha=0.3)
+
+    elif panel == "E":
+        high_impact = polyphen_df[polyphen_df["impact_class"] == "High impact"]
+        low_impact = polyphen_df[polyphen_df["impact_class"] == "Low / neutral"]
+
+        ax.hist(
+            [high_impact["position"], low_impact["position"]],
+            color=["salmon", "darkblue"],
+            bins=20,
+            label=["High impact", "Low / neutral"],
+            alpha=0.8
+        )
+
+        ax.set_xlabel("Amino acid position")
+        ax.set_ylabel("Number of variants")
+        ax.set_title(title)
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+    elif panel == "F":
+        sns.countplot(
+            data=pred_df,
+            x="impact_class",
+            hue="algorithm",
+            order=["High impact", "Moderate impact", "Low / neutral", "Uncertain"],
+            palette="Paired",
+            ax=ax
+        )
+
+        ax.set_xlabel("Impact class")
+        ax.set_ylabel("Number of variants")
+        ax.set_title(title)
+        ax.tick_params(axis="x", labelrotation=30)
+        for label in ax.get_xticklabels():
+            label.set_ha("right")
+        ax.legend(title="Predictor")
+        ax.grid(True, alpha=0.3)
+
+def Variant_analysis(uniprot_id):
+    data = variant_analysis_data(uniprot_id)
+
+    cancel.check()
 
-    total_variants = len(df_variants)
+    with tracing.span("matplotlib render", "render", panel="Variant_analysis"):
+        fig = figures.new_figure((16, 10))
+        for i, panel in enumerate(VARIANT_PANELS, 1):
+            draw_variant_panel(panel, data, fig.add_subplot(2, 3, i))
+        fig.tight_layout()
+        #plt.show()
+    return fig, variant_summary_text(data), VARIANT_EXPLAIN
 
-    summary = "Disease Distribution:\n"
-    for disease, count in disease_counts.items():
-        summary += f" • {disease}: {count} ({count/total_variants*100:.1f}%)\n"
+#fig, summary = Variant_analysis("P61073")
+
+DISEASE_PANELS = {
+    "A": "Distribution of Disease-Associated Variants Along Protein Sequence",
+    "B": "Variant Filtering and Prioritization Summary",
+    "C": "Most Frequent Diseases Associated with\nDamaging Variants",
+}
+
+def disease_variant_data(uniprot_id):
+    """Disease table, counts and the summary text that needs no further
+    downloads; disease_context_text() adds hotspots, domains and coverage"""
+    df_variants, pred_df, df_links = variant_tables(uniprot_id)
 
     df_variants["begin"] = pd.to_numeric(df_variants["begin"], errors="coerce")
     protein_length = df_variants['begin'].max() + 10
-    
-    ### disease-associated variants table
-    df_disease_table = df_variants.copy()
-    df_disease_table['Disease'] = df_disease_table['association'].apply(extract_diseases)
+    has_disease = df_variants['DiseaseList'].notna()
 
-    df_disease_table = df_disease_table[df_disease_table['Disease'].notnull()]
-
-    df_disease_table = df_disease_table[[
+    ### disease-associated variants table
+    df_disease_table = df_variants.loc[has_disease, [
         'variant_id',
         'external_url',
         'begin',
@@ -400,76 +561,40 @@ def disease_associated_variants(uniprot_id):
         'consequence',
         'wild_type',
         'mutatedType',
-        'Disease',
+        'DiseaseList',
         'PolyPhen_prediction'
-    ]]
+    ]].rename(columns={'DiseaseList': 'Disease'})
 
     df_disease_table = df_disease_table.sort_values('begin').reset_index(drop=True)
 
     ### disease plotting
-    df_hotspot = df_variants[
-    (df_variants["DiseaseList"].notna()) &
-    (df_variants["begin"].notna())].copy()
-
     bin_size = 20
-    bins = list(range(0, int(protein_length) + bin_size, bin_size))
-
-    df_hotspot["position_bin"] = pd.cut(
-        df_hotspot["begin"],
-        bins=bins,
-        include_lowest=True
-    )
-
-    hotspot_counts = (
-        df_hotspot
-        .groupby("position_bin")
-        .size()
-        .reset_index(name="DiseaseVariantCount")
-    )
+    disease_counts_pos = hotspot.PositionCounts(df_variants.loc[has_disease, "begin"], length=int(protein_length))
+    _position_counts[(uniprot_id.strip().upper(), "disease")] = disease_counts_pos
+    bin_starts, binned = disease_counts_pos.binned(bin_size)
 
-    hotspot_counts["bin_center"] = hotspot_counts["position_bin"].apply(
-        lambda x: int((x.left + x.right) / 2)
-    )
+    hotspot_counts = pd.DataFrame({
+        "bin_center": bin_starts + bin_size // 2,
+        "DiseaseVariantCount": binned[0],
+    })
 
-    df_variants["IsDamaging"] = (
+    is_damaging = (
         (df_variants["PolyPhen_prediction"] == "probably damaging") &
         (df_variants["PolyPhen_score"] >= 0.85)
     )
-
-    df_priority = df_variants[
-        (df_variants["IsDamaging"]) &
-        (df_variants["DiseaseList"].notna())
-    ].copy()
+    priority = is_damaging & has_disease
 
     total = len(df_variants)
-    damaging = df_variants["IsDamaging"].sum()
-    disease = df_variants["DiseaseList"].notna().sum()
-    high_risk = len(df_priority)
-
-    top_variants = (
-        df_priority
-        .sort_values("PolyPhen_score", ascending=False)
-        .head(10)
-    )
-
-    top_variants[[
-        "begin",
-        "wild_type",
-        "alt_seq",
-        "PolyPhen_score",
-        "DiseaseList"
-    ]]
-
-    df_diseases = df_priority.copy()
+    damaging = int(is_damaging.sum())
+    disease = int(has_disease.sum())
+    high_risk = int(priority.sum())
 
+    # diseases of the high-risk variants, from the variant-disease link table
     disease_counts = (
-        df_diseases["DiseaseList"]
-        .str.split("; ")
-        .explode()
+        df_links.loc[df_links["row"].isin(np.flatnonzero(priority.to_numpy())), "disease"]
         .value_counts()
         .head(10)
     )
-    
 
     summary = pd.DataFrame({
         "Group": ["All variants", "Disease-associated", "Damaging", "High-risk"],
@@ -499,100 +624,147 @@ def disease_associated_variants(uniprot_id):
     {disease_counts}
     """.strip()
 
-    
-    #--------Plotting---------
-    sns.set_style("whitegrid")
-
-    fig2 = plt.figure(figsize=(16, 10))
-
-    gs = fig2.add_gridspec(
-        2, 2,
-        height_ratios=[1.1, 1],
-        width_ratios=[0.7, 1.3],  # more space for C
-        hspace=0.5,
-        wspace=0.9
-    )
-
-    sns.set_style("whitegrid")
-
-    #fig = plt.figure(figsize=(16, 10))
-
-    # ------A. Disease variant distribution along sequence ----------------
-    ax1 = fig2.add_subplot(gs[0, :])
+    return {
+        "df_variants": df_variants,
+        "table": df_disease_table,
+        "summary": summary,
+        "text": text2,
+        "counts": disease_counts_pos,
+        "hotspot_counts": hotspot_counts,
+        "disease_counts": disease_counts,
+    }
 
-    sns.barplot(
-        data=hotspot_counts,
-        x="bin_center",
-        y="DiseaseVariantCount",
-        color="#6baed6",
-        edgecolor="black",
-        ax=ax1
-    )
+def disease_context_text(uniprot_id, data):
+    """Hotspot regions, structure coverage and domain enrichment of the
+    disease-associated variants (domains / structures are fetched)"""
+    df_variants = data["df_variants"]
+    text2 = ""
+    calls = data["counts"].hotspots(width=15)
+    if len(calls):
+        text2 += "\n\n    Disease-variant hotspots (15-aa windows vs. uniform spread):"
+        for row in calls.itertuples():
+            text2 += (f"\n    {row.start}-{row.end}: {row.count} variants, "
+                      f"{row.expected:.1f} expected, p = {row.p_value:.2g}")
+
+    # domains and structure coverage from the shared interval index
+    # expected counts need the real sequence length, not the last variant position
+    try:
+        length = len(g1_structure.fetch_uniprot_fasta(uniprot_id))
+    except Exception as e:
+        print(f"[INFO] No UniProt sequence length for {uniprot_id}: {e}")
+        length = None
+    idx = interval_index.protein_index(uniprot_id, df_variants, length)
+    disease_pos = df_variants.loc[df_variants["DiseaseList"].notna(), "begin"].dropna().to_numpy()
+    if len(idx.coverage):
+        text2 += (f"\n\n    • Disease-associated variants inside an experimental structure:\n"
+                  f"    └─ {idx.covered_fraction(disease_pos) * 100:.1f}%")
+    if len(idx.domains) and len(disease_pos):
+        enriched = idx.domain_enrichment(disease_pos).head(5)
+        text2 += "\n\n    Domains ranked by disease-variant enrichment (vs. uniform spread):"
+        for row in enriched.itertuples():
+            text2 += (f"\n    {row.accession} {row.name} ({row.start}-{row.end}): "
+                      f"{row.variants} observed, {row.expected:.1f} expected, p = {row.p_value:.2g}")
+    return text2
+
+def draw_disease_panel(panel, data, ax):
+    """Draw one of DISEASE_PANELS onto ax"""
+    title = f"{panel}. {DISEASE_PANELS[panel]}"
+
+    if panel == "A":
+        # ------A. Disease variant distribution along sequence ----------------
+        sns.barplot(
+            data=data["hotspot_counts"],
+            x="bin_center",
+            y="DiseaseVariantCount",
+            color="#6baed6",
+            edgecolor="black",
+            ax=ax
+        )
 
-    ax1.set_title("A. Distribution of Disease-Associated Variants Along Protein Sequence", fontsize=12)
-    ax1.set_xlabel("Protein Position (amino acid, bin centers)")
-    ax1.set_ylabel("Number of Disease-Associated Variants")
-    ax1.tick_params(axis='x', rotation=45)
-    ax1.grid(True, alpha=0.3)
+        ax.set_title(title, fontsize=12)
+        ax.set_xlabel("Protein Position (amino acid, bin centers)")
+        ax.set_ylabel("Number of Disease-Associated Variants")
+        ax.tick_params(axis='x', rotation=45)
+        ax.grid(True, alpha=0.3)
+
+    elif panel == "B":
+        # ---------------- B. Variant filtering summary  ----------------
+        summary = data["summary"]
+        colors_b = sns.color_palette("PuBu", n_colors=len(summary))
+
+        wedges, texts, autotexts = ax.pie(
+            summary["Count"],
+            labels=None,                      
+            autopct=lambda p: f"{p:.1f}%" if p > 4 else "",
+            startangle=90,
+            colors=colors_b,
+            pctdistance=0.7,
+            wedgeprops=dict(edgecolor="white")
+        )
 
-    # ---------------- B. Variant filtering summary  ----------------
-    ax2 = fig2.add_subplot(gs[1,0])
+        ax.legend(
+            wedges,
+            summary["Group"],
+            title="Variant category",
+            bbox_to_anchor=(1.05, 0.5), 
+            loc="upper center",
+            frameon=False,
+            fontsize=6,
+            title_fontsize=8
+        )
+        for autotext in autotexts:
+            autotext.set_fontsize(7)
+
+        ax.set_title(title, fontsize=11, pad=10)
+        ax.axis("equal")
+
+    elif panel == "C":
+        # ---------------- C. Disease frequency ----------------
+        disease_counts = data["disease_counts"]
+        wrapped_labels = [
+            "\n".join(textwrap.wrap(d, 35))
+            for d in disease_counts.index
+        ]
 
-    colors_b = sns.color_palette("PuBu", n_colors=len(summary))
+        sns.barplot(
+            x=disease_counts.values,
+            y=wrapped_labels,
+            palette=sns.color_palette("Blues_d", len(wrapped_labels)),
+            edgecolor="black",
+            ax=ax
+        )
 
+        ax.yaxis.set_label_coords(-0.18, 0.5)
+        ax.tick_params(axis='y', labelsize=7)
+        ax.tick_params(axis='x', labelsize=8)
+        ax.set_title(title, fontsize=10)
+        ax.set_xlabel("Number of High-Risk Variants")
 
-    wedges, texts, autotexts = ax2.pie(
-        summary["Count"],
-        labels=None,                      
-        autopct=lambda p: f"{p:.1f}%" if p > 4 else "",
-        startangle=90,
-        colors=colors_b,
-        pctdistance=0.7,
-        wedgeprops=dict(edgecolor="white")
-    )
+def disease_associated_variants(uniprot_id):
+    data = disease_variant_data(uniprot_id)
+    text2 = data["text"] + disease_context_text(uniprot_id, data)
 
-    ax2.legend(
-        wedges,
-        summary["Group"],
-        title="Variant category",
-        bbox_to_anchor=(1.05, 0.5), 
-        loc="upper center",
-        frameon=False,
-        fontsize=6,
-        title_fontsize=8
-    )
-    for autotext in autotexts:
-        autotext.set_fontsize(7)
-
-    ax2.set_title("B. Variant Filtering and Prioritization Summary",fontsize=11,pad=10)
-    ax2.axis("equal")
-    # ---------------- C. Disease frequency ----------------
-    ax3 = fig2.add_subplot(gs[1,1])
-
-    wrapped_labels = [
-        "\n".join(textwrap.wrap(d, 35))
-        for d in disease_counts.index
-    ]
-
-    sns.barplot(
-        x=disease_counts.values,
-        y=wrapped_labels,
-        palette=sns.color_palette("Blues_d", len(wrapped_labels)),
-        edgecolor="black",
-        ax=ax3
-    )
+    #--------Plotting---------
+    cancel.check()
+    with tracing.span("matplotlib render", "render", panel="disease_associated_variants"):
+        fig2 = figures.new_figure((16, 10))
+
+        gs = fig2.add_gridspec(
+            2, 2,
+            height_ratios=[1.1, 1],
+            width_ratios=[0.7, 1.3],  # more space for C
+            hspace=0.5,
+            wspace=0.9
+        )
 
-    ax3.yaxis.set_label_coords(-0.18, 0.5)
-    ax3.tick_params(axis='y', labelsize=7)
-    ax3.tick_params(axis='x', labelsize=8)
-    ax3.set_title("C. Most Frequent Diseases Associated with\nDamaging Variants",fontsize=10)
-    ax3.set_xlabel("Number of High-Risk Variants")
-    #ax3.yaxis.set_label_coords(-0.12, 0.5)
+        draw_disease_panel("A", data, fig2.add_subplot(gs[0, :]))
+        draw_disease_panel("B", data, fig2.add_subplot(gs[1, 0]))
+        draw_disease_panel("C", data, fig2.add_subplot(gs[1, 1]))
 
-    plt.tight_layout()
+        fig2.tight_layout()
 
     #print("\nDisease-associated Variants Table:")
-    return df_disease_table, summary, text2, fig2
+    return data["table"], data["summary"], text2, fig2
 
 
 #disease_associated_variants('Q9Y243')
@@ -0,0 +1,99 @@
+"""
+Positional histograms and hotspot calls from integer position arrays.
+
+Per-residue counts are built once with np.bincount; any bin size, range
+sum or sliding window is then read off the cumulative sum in O(L), so
+changing the bin size does not touch the variant table again.
+
+    pc = PositionCounts(df_variants["begin"], length=393)
+    starts, counts = pc.binned(20)
+    pc.hotspots(width=15)
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+
+class PositionCounts:
+    """Counts per residue position (index 0..length), optionally split
+    into groups given as integer codes (e.g. from pd.factorize)"""
+
+    def __init__(self, positions, length=None, groups=None, n_groups=None):
+        pos = np.asarray(positions, dtype=float)
+        codes = np.zeros(len(pos), dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+        ok = ~np.isnan(pos) & (pos >= 0) & (codes >= 0)
+        pos, codes = pos[ok].astype(np.int64), codes[ok]
+
+        self.length = int(max(length or 0, pos.max(initial=0)))
+        self.n_groups = int(n_groups or (codes.max(initial=0) + 1))
+        width = self.length + 1
+        pos = np.minimum(pos, self.length)
+        self.counts = np.bincount(codes * width + pos, minlength=self.n_groups * width).reshape(self.n_groups, width)
+        # _cum[:, i] = number of positions < i
+        self._cum = np.zeros((self.n_groups, width + 1), dtype=np.int64)
+        np.cumsum(self.counts, axis=1, out=self._cum[:, 1:])
+
+    def total(self):
+        """Counts summed over groups"""
+        return self.counts.sum(axis=0)
+
+    def range_sum(self, start, end):
+        """Positions with start <= p <= end, per group"""
+        start = max(int(start), 0)
+        end = min(int(end), self.length)
+        return self._cum[:, end + 1] - self._cum[:, start]
+
+    def binned(self, bin_size):
+        """(bin starts, counts per group and bin) for bins [s, s + bin_size)"""
+        bin_size = max(int(bin_size), 1)
+        starts = np.arange(0, self.length + 1, bin_size)
+        ends = np.minimum(starts + bin_size, self.length + 1)
+        return starts, self._cum[:, ends] - self._cum[:, starts]
+
+    def window(self, width):
+        """Centred sliding-window sums of all groups at positions 1..length"""
+        width = max(int(width), 1)
+        cum = self._cum.sum(axis=0)
+        p = np.arange(1, self.length + 1)
+        lo = np.clip(p - width // 2, 1, self.length)
+        hi = np.clip(lo + width, 1, self.length + 1)
+        return p, cum[hi] - cum[lo]
+
+    def hotspots(self, width=15, alpha=0.01):
+        """Regions where a window of `width` residues holds significantly
+        more positions than a uniform spread over 1..length would give
+        (binomial tail, Bonferroni over length / width windows). Overlapping
+        significant windows are merged into one region."""
+        from scipy.stats import binom
+
+        cols = ["start", "end", "count", "expected", "p_value"]
+        width = max(int(width), 1)
+        cum = self._cum.sum(axis=0)
+        n = int(cum[-1] - cum[1])
+        if n == 0 or self.length < width:
+            return pd.DataFrame(columns=cols)
+
+        frac = width / self.length
+        starts = np.arange(1, self.length - width + 2)
+        sums = cum[starts + width] - cum[starts]
+        pvals = binom.sf(sums - 1, n, frac)
+        sig = pvals < alpha / math.ceil(self.length / width)
+        if not sig.any():
+            return pd.DataFrame(columns=cols)
+
+        s = starts[sig]
+        new = np.r_[True, s[1:] > s[:-1] + width]
+        first = np.flatnonzero(new)
+        last = np.r_[first[1:] - 1, len(s) - 1]
+        region_start = s[first]
+        region_end = s[last] + width - 1
+        counts = cum[region_end + 1] - cum[region_start]
+        min_p = np.minimum.reduceat(pvals[sig], first)
+        return pd.DataFrame({
+            "start": region_start,
+            "end": region_end,
+            "count": counts,
+            "expected": n * (region_end - region_start + 1) / self.length,
+            "p_value": min_p,
+        })
@@ -0,0 +1,181 @@
+"""
+Sorted-array interval index over one protein's variants, domains and
+structure coverage.
+
+Everything positional is kept as sorted integer arrays, so range counts,
+"which domain / is it covered?" lookups and per-domain counts are a few
+np.searchsorted calls (O(log n) per query) instead of pandas scans:
+
+    idx = protein_index("P04637")
+    idx.count_in_range(100, 200)
+    idx.covered([175, 248, 390])
+    idx.domain_enrichment()
+"""
+import numpy as np
+import pandas as pd
+
+from backend import tracing
+from backend.lru import LRUCache
+
+INDEX_CACHE = 64
+
+_indexes = LRUCache(INDEX_CACHE)
+
+
+def clear_caches():
+    """Drop the cached protein indexes"""
+    _indexes.clear()
+
+
+def set_cache_size(entries):
+    """Keep this many protein indexes"""
+    _indexes.resize(entries)
+
+
+class IntervalSet:
+    """Closed intervals [start, end] with labels, sorted by start"""
+
+    def __init__(self, starts, ends, labels=None):
+        starts = np.asarray(starts, dtype=np.int64)
+        ends = np.asarray(ends, dtype=np.int64)
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.labels = [labels[i] for i in order] if labels is not None else [None] * len(order)
+        self._sorted_ends = np.sort(self.ends)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def count_containing(self, positions):
+        """Number of intervals containing each position (start <= p <= end)"""
+        p = np.asarray(positions)
+        return (np.searchsorted(self.starts, p, side="right")
+                - np.searchsorted(self._sorted_ends, p, side="left"))
+
+    def containing(self, position):
+        """Labels of the intervals that contain one position"""
+        n = np.searchsorted(self.starts, position, side="right")
+        hit = np.flatnonzero(self.ends[:n] >= position)
+        return [self.labels[i] for i in hit]
+
+    def merged(self):
+        """Non-overlapping union of the intervals (touching ones joined)"""
+        if not len(self):
+            return IntervalSet([], [])
+        run_end = np.maximum.accumulate(self.ends)
+        new = np.r_[True, self.starts[1:] > run_end[:-1] + 1]
+        first = np.flatnonzero(new)
+        last = np.r_[first[1:] - 1, len(self.starts) - 1]
+        return IntervalSet(self.starts[first], run_end[last])
+
+    def total_length(self):
+        m = self.merged()
+        return int((m.ends - m.starts + 1).sum())
+
+
+class ProteinIndex:
+    """Variant positions plus domain and structure-coverage intervals of one protein"""
+
+    def __init__(self, positions, length=None, domains=None, coverage=None):
+        positions = np.asarray(positions, dtype=float)
+        rows = np.flatnonzero(~np.isnan(positions))
+        pos = positions[rows].astype(np.int64)
+        order = np.argsort(pos, kind="stable")
+        self.positions = pos[order]      # sorted variant positions
+        self.rows = rows[order]          # matching row numbers in the source table
+        self.length = int(length or (self.positions[-1] if len(self.positions) else 0))
+
+        domains = domains or []
+        self.domains = IntervalSet([d["start"] for d in domains], [d["end"] for d in domains], domains)
+        coverage = coverage or []
+        self.coverage = IntervalSet([s for s, _ in coverage], [e for _, e in coverage]).merged()
+
+    def count_in_range(self, start, end):
+        lo = np.searchsorted(self.positions, start, side="left")
+        hi = np.searchsorted(self.positions, end, side="right")
+        return int(hi - lo)
+
+    def variants_in_range(self, start, end):
+        """Source-table row numbers of the variants with start <= position <= end"""
+        lo = np.searchsorted(self.positions, start, side="left")
+        hi = np.searchsorted(self.positions, end, side="right")
+        return self.rows[lo:hi]
+
+    def variants_per_domain(self):
+        """Variant count for each domain (in self.domains order)"""
+        return (np.searchsorted(self.positions, self.domains.ends, side="right")
+                - np.searchsorted(self.positions, self.domains.starts, side="left"))
+
+    def covered(self, positions):
+        """Boolean array: is each position inside the structure coverage?"""
+        p = np.atleast_1d(np.asarray(positions, dtype=np.int64))
+        cov = self.coverage
+        i = np.searchsorted(cov.starts, p, side="right") - 1
+        inside = i >= 0
+        inside[inside] = p[inside] <= cov.ends[i[inside]]
+        return inside
+
+    def covered_fraction(self, subset=None):
+        """Share of the (given) variants that fall inside the structure coverage"""
+        pos = self.positions if subset is None else np.asarray(subset)
+        return float(self.covered(pos).mean()) if len(pos) else 0.0
+
+    def domain_enrichment(self, positions=None):
+        """One row per domain: observed variants versus the count expected if
+        the variants were spread uniformly along the sequence, with a one-sided
+        Poisson p-value for enrichment. Positions default to all variants."""
+        from scipy.stats import poisson
+
+        if positions is None:
+            sub = self.positions
+        else:
+            sub = np.sort(np.asarray(positions, dtype=np.int64))
+        doms = self.domains
+        observed = (np.searchsorted(sub, doms.ends, side="right")
+                    - np.searchsorted(sub, doms.starts, side="left"))
+        lengths = doms.ends - doms.starts + 1
+        expected = len(sub) * lengths / max(self.length, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fold = np.where(expected > 0, observed / expected, np.nan)
+        return pd.DataFrame({
+            "accession": [d.get("accession") for d in doms.labels],
+            "name": [d.get("name") for d in doms.labels],
+            "start": doms.starts,
+            "end": doms.ends,
+            "variants": observed,
+            "expected": expected,
+            "fold": fold,
+            "p_value": poisson.sf(observed - 1, expected),
+        }).sort_values("p_value", kind="stable").reset_index(drop=True)
+
+
+def protein_index(uniprot_id, df_variants=None, length=None):
+    """Cached ProteinIndex for a protein; variants, InterPro domains and PDBe
+    structure coverage are fetched on first use (df_variants avoids a refetch).
+    length is the UniProt sequence length (expected counts of domain_enrichment);
+    without it the highest variant position stands in. Cached per (protein, length), for the last INDEX_CACHE."""
+    from backend import g1_protein, g1_structure, g3_variant
+
+    uniprot_id = uniprot_id.strip().upper()
+    key = (uniprot_id, length)
+    idx = _indexes.get(key)
+    if idx is not None:
+        return idx
+    if df_variants is None:
+        df_variants, _ = g3_variant.variant_dataframe(uniprot_id)
+    try:
+        domains = g1_protein.fetch_domains(uniprot_id)
+    except Exception as e:
+        print(f"[INFO] No domains for {uniprot_id}: {e}")
+        domains = []
+    try:
+        coverage = g1_structure.structure_coverage(uniprot_id)
+    except Exception as e:
+        print(f"[INFO] No structure coverage for {uniprot_id}: {e}")
+        coverage = []
+    with tracing.span("interval index", "numpy", variants=len(df_variants)):
+        idx = ProteinIndex(pd.to_numeric(df_variants["begin"], errors="coerce").to_numpy(dtype=float),
+                           length=length, domains=domains, coverage=coverage)
+    _indexes[key] = idx
+    return idx
@@ -0,0 +1,62 @@
+"""
+Size-limited, thread-safe LRU mapping for the per-protein caches
+(hotspot counts, substitution scores, interval indexes, network metrics,
+residue maps), so a long-running process (serve, batch jobs, a GUI left
+open all day) keeps the most recently used proteins instead of every
+protein it has ever seen:
+
+    _metrics = LRUCache(METRICS_CACHE)
+    hit = _metrics.get(key)
+    if hit is None:
+        hit = _metrics[key] = compute()
+"""
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def __getitem__(self, key):
+        with self._lock:
+            value = self._data[key]
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def resize(self, maxsize):
+        """Keep at most maxsize entries from now on, dropping the oldest at once"""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def _evict(self):
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,283 @@
+"""
+HTTP helpers shared by the backend modules.
+
+Endpoints are built with url(service, path) so every public service can be
+redirected, e.g. to the local replay server (backend/replay_server.py):
+
+    PROVARNET_BASE_URL=http://127.0.0.1:8765      all services -> <base>/<service>/...
+    PROVARNET_UNIPROT_URL=http://mirror.local     one service only
+
+Every request is recorded as a tracing span named after the host.
+Responses can be recorded to / replayed from a fixture directory
+(see backend.recording) for offline runs and benchmarks; fixtures are
+always keyed by the public URL, whatever base URL was used.
+
+Successful responses are cached per public URL (in memory, LRU by size,
+plus on disk under PROVARNET_CACHE_DIR when set). Bulk fetchers
+(backend.bulk) put per-protein entries into the same cache, so the
+single-protein functions find them without another round trip.
+Concurrent requests for one URL share a single download (threads via
+backend.singleflight; processes sharing PROVARNET_CACHE_DIR via lock
+files under <cache dir>/locks).
+"""
+import os
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import requests
+
+from backend import cancel, tracing
+from backend.recording import FixtureStore, make_response
+from backend.singleflight import SingleFlight, file_lock, key_lock_path
+
+DEFAULT_BASE_URLS = {
+    "uniprot": "https://rest.uniprot.org",
+    "ebi": "https://www.ebi.ac.uk",
+    "alphafold": "https://alphafold.ebi.ac.uk",
+    "string": "https://string-db.org",
+    "rcsb": "https://files.rcsb.org",
+}
+
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+STREAM_CHUNK = 64 * 1024
+
+_base_urls = {}
+_record_store = None
+_replay_store = None
+_cache = OrderedDict()        # public URL -> (status, body, content type)
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_flights = SingleFlight()
+_disk_cache = FixtureStore(os.environ["PROVARNET_CACHE_DIR"]) if os.environ.get("PROVARNET_CACHE_DIR") else None
+
+
+def base_url(service):
+    if service in _base_urls:
+        return _base_urls[service]
+    env = os.environ.get(f"PROVARNET_{service.upper()}_URL")
+    if env:
+        return env.rstrip("/")
+    shared = os.environ.get("PROVARNET_BASE_URL")
+    if shared:
+        return f"{shared.rstrip('/')}/{service}"
+    return DEFAULT_BASE_URLS[service]
+
+
+def set_base_url(service, url):
+    """Override one service's base URL (None restores the default / environment)"""
+    if url is None:
+        _base_urls.pop(service, None)
+    else:
+        _base_urls[service] = url.rstrip("/")
+
+
+def use_server(base):
+    """Route every service through one server as <base>/<service>/... (None to reset)"""
+    for service in DEFAULT_BASE_URLS:
+        set_base_url(service, f"{base.rstrip('/')}/{service}" if base else None)
+
+
+def url(service, path):
+    return base_url(service) + path
+
+
+def localize(full_url):
+    """Redirect a public URL (e.g. a link inside an API response) to the configured base"""
+    for service, default in DEFAULT_BASE_URLS.items():
+        if full_url.startswith(default + "/"):
+            return base_url(service) + full_url[len(default):]
+    return full_url
+
+
+def canonical(full_url):
+    """Public URL for a possibly redirected one"""
+    for service, default in DEFAULT_BASE_URLS.items():
+        base = base_url(service)
+        if base != default and full_url.startswith(base + "/"):
+            return default + full_url[len(base):]
+    return full_url
+
+
+def record_to(path):
+    """Save every live response under path (None to stop recording)"""
+    global _record_store
+    _record_store = FixtureStore(path) if path else None
+
+
+def replay_from(path):
+    """Serve responses from recordings under path instead of the network (None to stop)"""
+    global _replay_store
+    _replay_store = FixtureStore(path) if path else None
+
+
+def set_cache_dir(path):
+    """Also keep cached responses on disk under path (None for memory only)"""
+    global _disk_cache
+    _disk_cache = FixtureStore(path) if path else None
+
+
+def clear_cache():
+    """Drop the in-memory response cache (the disk cache is kept)"""
+    global _cache_bytes
+    with _cache_lock:
+        _cache.clear()
+        _cache_bytes = 0
+
+
+def set_cache_size(max_bytes):
+    """Limit the in-memory response cache to max_bytes, dropping the oldest entries at once"""
+    global CACHE_MAX_BYTES, _cache_bytes
+    with _cache_lock:
+        CACHE_MAX_BYTES = max_bytes
+        while _cache_bytes > CACHE_MAX_BYTES and _cache:
+            _, (_, body, _) = _cache.popitem(last=False)
+            _cache_bytes -= len(body)
+
+
+def cache_stats():
+    """Entries and bytes held in the in-memory response cache"""
+    with _cache_lock:
+        return {"entries": len(_cache), "bytes": _cache_bytes, "max_bytes": CACHE_MAX_BYTES}
+
+
+def cache_put(url, content, status=200, content_type="application/json", persist=True):
+    """Store a response body under its public URL"""
+    global _cache_bytes
+    key = canonical(localize(url))
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    with _cache_lock:
+        old = _cache.pop(key, None)
+        if old is not None:
+            _cache_bytes -= len(old[1])
+        _cache[key] = (status, content, content_type)
+        _cache_bytes += len(content)
+        while _cache_bytes > CACHE_MAX_BYTES and len(_cache) > 1:
+            _, (_, body, _) = _cache.popitem(last=False)
+            _cache_bytes -= len(body)
+    if persist and _disk_cache is not None and key not in _disk_cache:
+        _disk_cache.save(key, status, content, content_type)
+
+
+def cached(url):
+    """(status, body, content type) for a cached public URL, or None"""
+    key = canonical(localize(url))
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            return hit
+    if _disk_cache is not None:
+        hit = _disk_cache.load(key)
+        if hit is not None:
+            cache_put(key, hit[1], hit[0], hit[2], persist=False)
+        return hit
+    return None
+
+
+def _cached_response(key):
+    hit = cached(key)
+    if hit is None:
+        return None
+    r = make_response(key, *hit)
+    if _record_store is not None and key not in _record_store:
+        _record_store.record(key, r)
+    return r
+
+
+def _request(target, **kwargs):
+    token = cancel.current()
+    if token is None:
+        return requests.get(target, **kwargs)
+    # cancellable: stream the body, checking the token between chunks; cancel()
+    # closes the response, which releases the connection at once
+    token.check()
+    r = requests.get(target, stream=True, **kwargs)
+    remove = token.on_cancel(r.close)
+    try:
+        chunks = []
+        for chunk in r.iter_content(STREAM_CHUNK):
+            token.check()
+            chunks.append(chunk)
+    except BaseException:
+        r.close()
+        if token.cancelled:
+            raise cancel.Cancelled() from None
+        raise
+    finally:
+        remove()
+    # a close() from cancel() can end the loop early without an error
+    token.check()
+    r._content = b"".join(chunks)
+    r._content_consumed = True
+    return r
+
+
+def _download(target, host, **kwargs):
+    with tracing.span(f"GET {host}", "http", url=target) as sp:
+        if _replay_store is not None:
+            r = _replay_store.response(canonical(target))
+            if r is None:
+                raise requests.exceptions.ConnectionError(f"No recorded response for {target}")
+        else:
+            r = _request(target, **kwargs)
+            if _record_store is not None and _complete(r):
+                _record_store.record(canonical(target), r)
+        sp["args"]["status"] = r.status_code
+        sp["args"]["bytes"] = len(r.content)
+    return r
+
+
+def _fetch_and_cache(target, host, key, **kwargs):
+    disk = _disk_cache
+    if disk is None:
+        return _cache_ok(key, _download(target, host, **kwargs))
+    # other processes sharing the disk cache wait here, then find the result
+    with file_lock(key_lock_path(disk.root, key), check=cancel.check):
+        r = _cached_response(key)
+        if r is not None:
+            return r
+        return _cache_ok(key, _download(target, host, **kwargs))
+
+
+def _complete(r):
+    """False when the body is shorter than the Content-Length the server sent"""
+    length = r.headers.get("Content-Length")
+    if not length or not length.isdigit() or r.headers.get("Content-Encoding"):
+        return True    # length unknown, or of the encoded body
+    return len(r.content) >= int(length)
+
+
+def _cache_ok(key, r):
+    if r.status_code == 200 and _complete(r):
+        cache_put(key, r.content, r.status_code, r.headers.get("Content-Type"))
+    return r
+
+
+def get(url, cache=True, **kwargs):
+    """requests.get through the cache / replay / record layers;
+    cache=False for one-off requests (e.g. bulk pages) not worth keeping.
+    Concurrent requests for the same URL share one download."""
+    cancel.check()
+    target = localize(url)
+    host = urlsplit(target).netloc
+    if not cache:
+        return _download(target, host, **kwargs)
+    key = canonical(target)
+    r = _cached_response(key)
+    if r is not None:
+        with tracing.span(f"cache {host}", "cache", url=key, bytes=len(r.content)):
+            return r
+    while True:
+        try:
+            r, _ = _flights.do(key, lambda: _fetch_and_cache(target, host, key, **kwargs), check=cancel.check)
+            return r
+        except cancel.Cancelled:
+            # ours: stop; another caller's shared download: fetch again
+            cancel.check()
+
+
+def parse_json(response):
+    with tracing.span("JSON parse", "parse", bytes=len(response.content)):
+        return response.json()
@@ -0,0 +1,88 @@
+"""
+Recorded HTTP responses (fixtures) for offline runs.
+
+A fixture directory holds one file per URL, <sha1 of the URL>.entry: a
+gzip stream of one JSON header line ({"url", "status", "content_type"})
+followed by the body. Each is written to a temporary file and renamed
+into place, so processes sharing a directory (a disk cache, a batch run)
+add entries independently, without a common index to lock and rewrite,
+and readers never see a partial file.
+
+backend.net records into a store when net.record_to(path) is active and
+serves from it when net.replay_from(path) is active.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+
+def make_response(url, status, body, content_type=None):
+    """A requests.Response around stored bytes"""
+    r = requests.Response()
+    r.status_code = status
+    r._content = body
+    r.url = url
+    r.encoding = "utf-8"
+    r.headers = CaseInsensitiveDict({"Content-Type": content_type or "application/octet-stream"})
+    return r
+
+
+ENTRY_SUFFIX = ".entry"
+
+
+def has_fixtures(root):
+    """Whether a directory holds any recorded responses"""
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return False
+    return any(n.endswith(ENTRY_SUFFIX) for n in names)
+
+
+class FixtureStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.root, hashlib.sha1(url.encode()).hexdigest() + ENTRY_SUFFIX)
+
+    def __contains__(self, url):
+        return os.path.exists(self._path(url))
+
+    def save(self, url, status, content, content_type=None):
+        path = self._path(url)
+        header = json.dumps({"url": url, "status": status, "content_type": content_type})
+        # write-then-rename, so readers in other processes never see a partial file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(tmp, "wb") as fh:
+            fh.write(header.encode("utf-8") + b"\n")
+            fh.write(content)
+        os.replace(tmp, path)
+
+    def load(self, url):
+        """(status, body bytes, content type) for a recorded URL, or None"""
+        try:
+            with gzip.open(self._path(url), "rb") as fh:
+                header = json.loads(fh.readline())
+                body = fh.read()
+        except FileNotFoundError:
+            return None
+        if header.get("url") != url:
+            return None
+        return header["status"], body, header.get("content_type")
+
+    def response(self, url):
+        """A requests.Response rebuilt from the recording, or None"""
+        stored = self.load(url)
+        if stored is None:
+            return None
+        return make_response(url, *stored)
+
+    def record(self, url, response):
+        self.save(url, response.status_code, response.content, response.headers.get("Content-Type"))
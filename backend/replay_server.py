@@ -0,0 +1,150 @@
+"""
+Local stand-in for the public APIs: records real responses once and replays them.
+
+    python -m backend.replay_server --fixtures recordings --record      # proxy + record
+    python -m backend.replay_server --fixtures recordings --latency-ms 80 --error-rate 0.02
+
+Point the app or a batch run at it with PROVARNET_BASE_URL=http://127.0.0.1:8765
+(or net.use_server(...)). Requests arrive as /<service>/<path>, e.g.
+/uniprot/uniprotkb/P04637.json, and are looked up by their public URL in
+the same fixture format the benchmarks use (backend/recording.py).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from backend.net import DEFAULT_BASE_URLS
+from backend.recording import FixtureStore
+
+CHUNK = 64 * 1024
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server_version = "ProVarNetReplay/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status, body, content_type="application/json", extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type or "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra_headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        bandwidth = self.server.bandwidth_bps
+        for i in range(0, len(body), CHUNK):
+            chunk = body[i:i + CHUNK]
+            self.wfile.write(chunk)
+            if bandwidth:
+                time.sleep(len(chunk) / bandwidth)
+
+    def do_GET(self):
+        srv = self.server
+        if self.path == "/_replay/stats":
+            with srv.lock:
+                body = json.dumps(srv.stats).encode()
+            return self._send(200, body)
+
+        service, _, rest = self.path.lstrip("/").partition("/")
+        if service not in DEFAULT_BASE_URLS:
+            return self._send(404, b'{"error": "unknown service"}')
+        upstream = f"{DEFAULT_BASE_URLS[service]}/{rest}"
+
+        delay = srv.latency + random.uniform(0, srv.jitter)
+        if delay:
+            time.sleep(delay)
+        if srv.error_rate and random.random() < srv.error_rate:
+            srv.count("injected_errors")
+            return self._send(503, b'{"error": "injected failure"}')
+
+        stored = srv.store.load(upstream)
+        if stored is None and srv.record:
+            try:
+                r = requests.get(upstream, timeout=60)
+            except requests.RequestException as e:
+                srv.count("upstream_errors")
+                return self._send(502, json.dumps({"error": str(e)}).encode())
+            srv.store.record(upstream, r)
+            stored = (r.status_code, r.content, r.headers.get("Content-Type"))
+            srv.count("recorded")
+        elif stored is None:
+            srv.count("misses")
+            # 502, not 404: the backend treats 404 as "no data for this protein"
+            return self._send(502, json.dumps({"error": f"not recorded: {upstream}"}).encode(),
+                              extra_headers={"X-Replay-Miss": "1"})
+        else:
+            srv.count("hits")
+
+        status, body, content_type = stored
+        self._send(status, body, content_type)
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fixtures, record=False, latency_ms=0, jitter_ms=0,
+                 error_rate=0.0, bandwidth_kbps=0, verbose=False):
+        super().__init__(address, ReplayHandler)
+        self.store = FixtureStore(fixtures)
+        self.record = record
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.error_rate = error_rate
+        self.bandwidth_bps = bandwidth_kbps * 1024 / 8 if bandwidth_kbps else 0
+        self.verbose = verbose
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "injected_errors": 0, "upstream_errors": 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(fixtures, host="127.0.0.1", port=0, **options):
+    """Start a replay server in a daemon thread; port=0 picks a free port"""
+    server = ReplayServer((host, port), fixtures, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record/replay stand-in for the ProVarNet web APIs")
+    parser.add_argument("--fixtures", required=True, help="recording directory")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--record", action="store_true", help="fetch and store responses that are not recorded yet")
+    parser.add_argument("--latency-ms", type=float, default=0, help="added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="extra random delay, uniform in [0, jitter]")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--bandwidth-kbps", type=float, default=0, help="throttle response bodies (0 = unlimited)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    server = ReplayServer((args.host, args.port), args.fixtures, record=args.record,
+                          latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          error_rate=args.error_rate, bandwidth_kbps=args.bandwidth_kbps,
+                          verbose=args.verbose)
+    print(f"[INFO] Replay server on {server.base_url} ({'recording' if args.record else 'replay only'})")
+    print(f"[INFO] export PROVARNET_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
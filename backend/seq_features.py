@@ -0,0 +1,201 @@
+"""
+Amino-acid composition and physicochemical features for many sequences.
+
+All sequences are concatenated into one byte array and encoded to 0..19
+(20 for anything else) with a 256-entry lookup table; every feature is
+then a bincount or a table lookup over that array, so a whole proteome
+FASTA takes seconds rather than a ProteinAnalysis object per protein:
+
+    length, nonstandard     residues, and those outside the 20 standard ones
+    molecular_weight        average mass in Da (residue masses minus water per bond)
+    isoelectric_point       Bjellqvist pK values, bisection as in Biopython
+    gravy                   mean Kyte-Doolittle hydropathy
+    instability_index       Guruprasad et al. (1990) dipeptide weights
+    A ... Y                 composition, fraction of the sequence length
+
+    table = fasta_features("UP000005640_9606.fasta.gz")
+    features(["MEEPQSDPSV...", "MTAYSK..."], ids=["P04637", "P61073"])
+
+The tables are Biopython's (Bio.SeqUtils.ProtParamData / IsoelectricPoint),
+so for sequences of standard residues the values are those of
+ProteinAnalysis (check_against_biopython() compares a sample). Residues
+outside the standard 20 (X, U, B, ...), which ProteinAnalysis rejects, are
+left out of the weight, GRAVY and instability sums.
+"""
+import gzip
+
+import numpy as np
+import pandas as pd
+
+from backend import tracing
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+PROPERTY_COLUMNS = ["length", "nonstandard", "molecular_weight", "isoelectric_point", "gravy", "instability_index"]
+COLUMNS = PROPERTY_COLUMNS + list(AMINO_ACIDS)
+OTHER = len(AMINO_ACIDS)
+
+WATER = 18.0153
+PI_START, PI_MIN, PI_MAX, PI_TOLERANCE = 7.775, 4.05, 12.0, 0.0001
+
+_LUT = np.full(256, OTHER, dtype=np.uint8)
+for _i, _aa in enumerate(AMINO_ACIDS):
+    _LUT[ord(_aa)] = _LUT[ord(_aa.lower())] = _i
+
+_tables = None
+
+
+def _build_tables():
+    from Bio.Data.IUPACData import protein_weights
+    from Bio.SeqUtils import IsoelectricPoint as iep
+    from Bio.SeqUtils.ProtParamData import DIWV, kd
+
+    def per_residue(values, default):
+        # indexed by code, the last entry for non-standard residues
+        return np.array([values.get(aa, default) for aa in AMINO_ACIDS] + [default], dtype=float)
+
+    return {
+        "weight": per_residue(protein_weights, 0.0),
+        "kd": per_residue(kd, 0.0),
+        "diwv": np.array([[DIWV[a][b] for b in AMINO_ACIDS] for a in AMINO_ACIDS], dtype=float),
+        # charged groups in Biopython's summation order; termini depend on the end residues
+        "positive": [aa for aa in iep.positive_pKs if aa != "Nterm"],
+        "negative": [aa for aa in iep.negative_pKs if aa != "Cterm"],
+        "positive_pK": np.array([iep.positive_pKs[aa] for aa in iep.positive_pKs if aa != "Nterm"]),
+        "negative_pK": np.array([iep.negative_pKs[aa] for aa in iep.negative_pKs if aa != "Cterm"]),
+        "nterm_pK": per_residue(iep.pKnterminal, iep.positive_pKs["Nterm"]),
+        "cterm_pK": per_residue(iep.pKcterminal, iep.negative_pKs["Cterm"]),
+    }
+
+
+def tables():
+    """Per-residue lookup tables, indexed by code (AMINO_ACIDS order, then non-standard)"""
+    global _tables
+    if _tables is None:
+        _tables = _build_tables()
+    return _tables
+
+
+def encode(sequences):
+    """(codes uint8 0..20 of all sequences back to back, lengths int64)"""
+    lengths = np.fromiter((len(s) for s in sequences), dtype=np.int64, count=len(sequences))
+    raw = np.frombuffer("".join(sequences).encode("ascii", "replace"), dtype=np.uint8)
+    return _LUT[raw], lengths
+
+
+def isoelectric_points(counts, nterm, cterm):
+    """pI per sequence from residue counts (n x 21) and end-residue codes,
+    bisecting all sequences at once"""
+    t = tables()
+    n = len(counts)
+    pos_counts = np.column_stack([np.ones(n)] + [counts[:, AMINO_ACIDS.index(aa)] for aa in t["positive"]])
+    neg_counts = np.column_stack([np.ones(n)] + [counts[:, AMINO_ACIDS.index(aa)] for aa in t["negative"]])
+    pos_pK = np.column_stack([t["nterm_pK"][nterm], np.broadcast_to(t["positive_pK"], (n, len(t["positive"])))])
+    neg_pK = np.column_stack([t["cterm_pK"][cterm], np.broadcast_to(t["negative_pK"], (n, len(t["negative"])))])
+
+    ph = np.full(n, PI_START)
+    lo, hi = np.full(n, PI_MIN), np.full(n, PI_MAX)
+    active = hi - lo > PI_TOLERANCE
+    while active.any():
+        p = ph[:, None]
+        charge = (pos_counts / (10 ** (p - pos_pK) + 1)).sum(axis=1) - (neg_counts / (10 ** (neg_pK - p) + 1)).sum(axis=1)
+        up = active & (charge > 0)
+        down = active & ~(charge > 0)
+        lo[up] = ph[up]
+        hi[down] = ph[down]
+        ph[active] = (lo[active] + hi[active]) / 2
+        active = hi - lo > PI_TOLERANCE
+    return ph
+
+
+def feature_matrix(sequences):
+    """float64 matrix, one row per sequence, one column per COLUMNS entry"""
+    t = tables()
+    n = len(sequences)
+    codes, lengths = encode(sequences)
+    seq_of = np.repeat(np.arange(n, dtype=np.int32), lengths)
+
+    counts = np.bincount(seq_of * (OTHER + 1) + codes, minlength=n * (OTHER + 1)).reshape(n, OTHER + 1).astype(float)
+    standard = lengths - counts[:, OTHER]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = counts @ t["weight"] - np.maximum(standard - 1, 0) * WATER
+        gravy = (counts @ t["kd"]) / standard
+
+        # dipeptides within one sequence, both residues standard
+        pair = (codes[:-1] < OTHER) & (codes[1:] < OTHER) & (seq_of[:-1] == seq_of[1:])
+        dipeptide = t["diwv"][codes[:-1][pair], codes[1:][pair]]
+        instability = 10.0 * np.bincount(seq_of[:-1][pair], weights=dipeptide, minlength=n) / standard
+
+        # pK of the termini depends on the first and last residue
+        starts = np.cumsum(lengths) - lengths
+        nonempty = lengths > 0
+        nterm = np.full(n, OTHER, dtype=np.int64)
+        cterm = np.full(n, OTHER, dtype=np.int64)
+        nterm[nonempty] = codes[starts[nonempty]]
+        cterm[nonempty] = codes[starts[nonempty] + lengths[nonempty] - 1]
+        pi = np.where(nonempty, isoelectric_points(counts, nterm, cterm), np.nan)
+        composition = counts[:, :OTHER] / lengths[:, None]
+
+    weight[standard == 0] = np.nan
+    return np.column_stack([lengths, counts[:, OTHER], weight, pi, gravy, instability, composition])
+
+
+def features(sequences, ids=None):
+    """DataFrame of feature_matrix(), indexed by ids"""
+    sequences = list(sequences)
+    with tracing.span("sequence features", "numpy", sequences=len(sequences)):
+        matrix = feature_matrix(sequences)
+    table = pd.DataFrame(matrix, columns=COLUMNS, index=pd.Index(ids, name="id") if ids is not None else None)
+    return table.astype({"length": np.int64, "nonstandard": np.int64})
+
+
+def sequence_features(sequence):
+    """{column: value} for one sequence"""
+    return dict(zip(COLUMNS, feature_matrix([sequence])[0].tolist()))
+
+
+def parse_fasta(text):
+    """(ids, sequences) of FASTA text; UniProt headers (sp|P04637|P53_HUMAN ...)
+    give the accession, others their first word"""
+    ids, sequences = [], []
+    for block in text.split(">")[1:]:
+        header, _, body = block.partition("\n")
+        fields = header.split("|")
+        ids.append(fields[1] if len(fields) > 2 else header.split()[0] if header.strip() else "")
+        sequences.append("".join(body.split()))
+    return ids, sequences
+
+
+def read_fasta(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as fh:
+        return parse_fasta(fh.read())
+
+
+def fasta_features(path):
+    ids, sequences = read_fasta(path)
+    return features(sequences, ids)
+
+
+def check_against_biopython(sequences, sample=200, seed=0):
+    """Largest absolute difference per property between features() and
+    ProteinAnalysis, on up to `sample` sequences of standard residues"""
+    from Bio.SeqUtils.ProtParam import ProteinAnalysis
+
+    usable = [s for s in sequences if s and set(s.upper()) <= set(AMINO_ACIDS)]
+    rng = np.random.default_rng(seed)
+    if len(usable) > sample:
+        usable = [usable[i] for i in rng.choice(len(usable), sample, replace=False)]
+    ours = features(usable)
+    reference = []
+    for s in usable:
+        pa = ProteinAnalysis(s)
+        # fractions from get_amino_acids_percent (older Biopython), percentages from amino_acids_percent
+        if hasattr(pa, "get_amino_acids_percent"):
+            fraction = pa.get_amino_acids_percent()
+        else:
+            fraction = {aa: value / 100 for aa, value in pa.amino_acids_percent.items()}
+        reference.append([pa.molecular_weight(), pa.isoelectric_point(), pa.gravy(), pa.instability_index()]
+                         + [fraction[aa] for aa in AMINO_ACIDS])
+    columns = ["molecular_weight", "isoelectric_point", "gravy", "instability_index"] + list(AMINO_ACIDS)
+    reference = pd.DataFrame(reference, columns=columns, index=ours.index)
+    return (ours[columns] - reference).abs().max()
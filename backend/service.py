@@ -0,0 +1,451 @@
+"""
+HTTP service mode: the analyses as a JSON / PNG API for many clients.
+
+    python provarnet.py serve --port 8080 --workers 4 --queue 32
+
+    GET /protein/<id>/summary                  protein_summary text
+    GET /protein/<id>/features                 sequence features (mass, pI, GRAVY, ...)
+    GET /protein/<id>/variants[?limit=N]       summary, variant rows, panel links
+    GET /protein/<id>/variants/<A-F>.png
+    GET /protein/<id>/disease[?limit=N]        summary, hotspots/domains, groups, variant rows
+    GET /protein/<id>/disease/<A-C>.png
+    GET /protein/<id>/ppi[?hops=1&min_score=400]   ranked partners and network summary
+    GET /protein/<id>/ppi.png
+    GET /protein/<id>/structure                experimental vs AlphaFold verification and RMSD
+    GET /protein/<id>/structure/<rmsd|hist|diffmap|segments>.png
+    GET /health, /metrics
+
+Connections are handled by a thread each; the analyses run on a fixed
+pool of worker threads. At most workers + queue analyses are admitted
+at once, further requests get 503 with Retry-After instead of piling up.
+Identical requests in flight share one run (backend.singleflight), and
+so do the JSON and PNG requests of one analysis: its tables are computed
+once and kept for the next DATA_CACHE requests. Downloads go through the
+shared response cache (backend.net; PROVARNET_CACHE_DIR to keep it on
+disk). A request still running after --timeout seconds answers 504 and
+its analysis is cancelled (backend.cancel).
+
+/metrics reports per endpoint the request count, errors, rejections,
+timeouts, coalesced requests and latency percentiles over the last
+LATENCY_WINDOW requests.
+"""
+import json
+import math
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+from requests import HTTPError
+
+from backend import cancel, figures, g1_protein, g1_structure, g3_variant, net, network_metrics, seq_features, tracing
+from backend.lru import LRUCache
+from backend.singleflight import SingleFlight
+
+DATA_CACHE = 32
+LATENCY_WINDOW = 1000
+DEFAULT_LIMIT = 1000
+
+ACCESSION = r"(?P<id>[A-Za-z0-9][A-Za-z0-9_.-]{1,30})"
+
+def disease_data(uniprot_id):
+    """disease_variant_data plus its context text (hotspots, domains, coverage),
+    which needs further downloads and so is kept with the tables"""
+    data = g3_variant.disease_variant_data(uniprot_id)
+    return dict(data, context=g3_variant.disease_context_text(uniprot_id, data))
+
+
+STAGES = {
+    "variants": g3_variant.variant_analysis_data,
+    "disease": disease_data,
+    "structure": g1_structure.structure_comparison_data,
+}
+# analyses whose ValueError means no variant data for the accession (fetch_variant_data)
+VARIANT_STAGES = ("variants", "disease")
+
+# analysis -> (panel titles, draw function, panels drawn wide)
+PANELS = {
+    "variants": (g3_variant.VARIANT_PANELS, g3_variant.draw_variant_panel, ()),
+    "disease": (g3_variant.DISEASE_PANELS, g3_variant.draw_disease_panel, ("A",)),
+    "structure": (g1_structure.COMPARISON_PANELS, g1_structure.draw_comparison_panel, ()),
+}
+
+
+class ServiceError(Exception):
+    """An answer other than 200, with its HTTP status"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# ---------- ANALYSIS DATA ----------
+# Tables behind the JSON and PNG endpoints of one analysis, LRU by protein
+
+_data = LRUCache(DATA_CACHE)
+_stages = SingleFlight()
+
+
+def analysis_data(kind, uniprot_id):
+    """STAGES[kind](uniprot_id), computed once for concurrent and recent requests"""
+    key = (kind, uniprot_id)
+    value = _data.get(key)
+    if value is not None:
+        return value
+    while True:
+        try:
+            value, _ = _stages.do(key, lambda: _run_stage(kind, uniprot_id), check=cancel.check)
+            break
+        except cancel.Cancelled:
+            # ours: stop; a cancelled request we were waiting on: compute it ourselves
+            cancel.check()
+    _data[key] = value
+    return value
+
+
+def _run_stage(kind, uniprot_id):
+    try:
+        return STAGES[kind](uniprot_id)
+    except ValueError as e:
+        if kind in VARIANT_STAGES:
+            raise ServiceError(404, str(e)) from None
+        raise
+
+
+def clear_data():
+    _data.clear()
+
+
+def _records(df, limit=None):
+    """JSON-ready rows of a DataFrame (NaN as null)"""
+    if limit is not None:
+        df = df.head(limit)
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+def _panel_links(uniprot_id, kind):
+    titles = PANELS[kind][0]
+    return {key: {"title": title.replace("\n", " "), "url": f"/protein/{uniprot_id}/{kind}/{key}.png"}
+            for key, title in titles.items()}
+
+
+def _limit(params):
+    return _int_param(params, "limit", DEFAULT_LIMIT)
+
+
+def _int_param(params, name, default):
+    try:
+        return int(params.get(name, default))
+    except ValueError:
+        raise ServiceError(400, f"{name} must be an integer") from None
+
+
+# ---------- ENDPOINTS ----------
+# Each takes (uniprot_id, query parameters) and returns a JSON-ready dict or PNG bytes
+
+def summary(uniprot_id, params):
+    text = g1_protein.protein_summary(uniprot_id)
+    if text is None:
+        raise ServiceError(404, f"no UniProt entry for {uniprot_id}")
+    return {"id": uniprot_id, "summary": text}
+
+
+def features(uniprot_id, params):
+    sequence = g1_structure.fetch_uniprot_fasta(uniprot_id)
+    return {"id": uniprot_id, "length": len(sequence), "features": seq_features.sequence_features(sequence)}
+
+
+def variants(uniprot_id, params):
+    data = analysis_data("variants", uniprot_id)
+    df = data["df_variants"]
+    return {
+        "id": uniprot_id,
+        "summary": g3_variant.variant_summary_text(data),
+        "explain": g3_variant.VARIANT_EXPLAIN.strip(),
+        "total": len(df),
+        "variants": _records(df, _limit(params)),
+        "panels": _panel_links(uniprot_id, "variants"),
+    }
+
+
+def disease(uniprot_id, params):
+    data = analysis_data("disease", uniprot_id)
+    return {
+        "id": uniprot_id,
+        "summary": data["text"] + data["context"],
+        "groups": _records(data["summary"]),
+        "diseases": {name: int(n) for name, n in data["disease_counts"].items()},
+        "total": len(data["table"]),
+        "variants": _records(data["table"], _limit(params)),
+        "panels": _panel_links(uniprot_id, "disease") if len(data["table"]) else {},
+    }
+
+
+def ppi(uniprot_id, params):
+    hops = _int_param(params, "hops", 1)
+    min_score = _int_param(params, "min_score", 400)
+    try:
+        table, network = network_metrics.partner_table(uniprot_id, hops, min_score)
+    except KeyError as e:
+        raise ServiceError(404, str(e).strip("'\"")) from None
+    return {"id": uniprot_id, "hops": hops, "min_score": min_score, "network": network,
+            "partners": _records(table, _limit(params)), "image": f"/protein/{uniprot_id}/ppi.png"}
+
+
+def ppi_png(uniprot_id, params):
+    result = g1_protein.ppi_network(uniprot_id)
+    if result is KeyError:
+        raise ServiceError(502, "STRING request failed")
+    if isinstance(result, str):
+        raise ServiceError(404, result)
+    fig = result[0]
+    try:
+        return figures.to_png(fig)
+    finally:
+        figures.release(fig)
+
+
+def structure(uniprot_id, params):
+    data, verification, rmsd = analysis_data("structure", uniprot_id)
+    return {
+        "id": uniprot_id,
+        "available": data is not None,
+        "verification": verification.strip(),
+        "rmsd": rmsd,
+        "segments": data["segments"] if data is not None else None,
+        "panels": _panel_links(uniprot_id, "structure") if data is not None else {},
+    }
+
+
+def panel(kind):
+    titles, draw, wide = PANELS[kind]
+
+    def render(uniprot_id, params):
+        key = params["panel"]
+        if key not in titles:
+            raise ServiceError(404, f"no panel {key!r}; one of {', '.join(titles)}")
+        data = analysis_data(kind, uniprot_id)
+        if kind == "structure":
+            data = data[0]
+        if data is None or (kind == "disease" and not len(data["table"])):
+            raise ServiceError(404, f"no {kind} data for {uniprot_id}")
+        return figures.panel_png(draw, key, data, (16, 5) if key in wide else (8, 5))
+    return render
+
+
+# (endpoint name, path pattern, function)
+ROUTES = [
+    ("summary", r"/protein/{id}/summary", summary),
+    ("features", r"/protein/{id}/features", features),
+    ("variants", r"/protein/{id}/variants", variants),
+    ("variants.png", r"/protein/{id}/variants/(?P<panel>\w+)\.png", panel("variants")),
+    ("disease", r"/protein/{id}/disease", disease),
+    ("disease.png", r"/protein/{id}/disease/(?P<panel>\w+)\.png", panel("disease")),
+    ("ppi", r"/protein/{id}/ppi", ppi),
+    ("ppi.png", r"/protein/{id}/ppi\.png", ppi_png),
+    ("structure", r"/protein/{id}/structure", structure),
+    ("structure.png", r"/protein/{id}/structure/(?P<panel>\w+)\.png", panel("structure")),
+]
+_routes = [(name, re.compile(pattern.replace("{id}", ACCESSION) + "/?$"), fn) for name, pattern, fn in ROUTES]
+
+
+def route(path):
+    """(endpoint name, function, accession, path parameters) for a request path, or None"""
+    for name, pattern, fn in _routes:
+        m = pattern.match(path)
+        if m:
+            params = m.groupdict()
+            return name, fn, params.pop("id").upper(), params
+    return None
+
+
+def _json_safe(value):
+    """value with NumPy scalars / arrays as Python values and NaN / inf as None"""
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _json_safe(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def _json_default(value):
+    return str(value)
+
+
+def to_json(value):
+    """Strict JSON (NaN and inf as null) as UTF-8 bytes"""
+    return json.dumps(_json_safe(value), default=_json_default, allow_nan=False).encode("utf-8")
+
+
+# ---------- METRICS ----------
+
+class Metrics:
+    """Per-endpoint counters and a window of recent latencies"""
+
+    COUNTERS = ("requests", "errors", "rejected", "timeouts", "coalesced")
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.counts = defaultdict(lambda: dict.fromkeys(self.COUNTERS, 0))
+        self.latencies = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, endpoint, seconds, status, coalesced=False):
+        with self.lock:
+            c = self.counts[endpoint]
+            c["requests"] += 1
+            c["errors"] += status >= 500 and status not in (503, 504)
+            c["rejected"] += status == 503
+            c["timeouts"] += status == 504
+            c["coalesced"] += coalesced
+            self.latencies[endpoint].append(seconds)
+
+    def snapshot(self):
+        with self.lock:
+            out = {}
+            for endpoint, c in sorted(self.counts.items()):
+                ms = np.array(self.latencies[endpoint]) * 1000
+                p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0.0, 0.0, 0.0)
+                out[endpoint] = dict(c, p50_ms=round(p50, 1), p95_ms=round(p95, 1), p99_ms=round(p99, 1),
+                                     max_ms=round(float(ms.max()), 1) if len(ms) else 0.0)
+            return out
+
+
+# ---------- SERVER ----------
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    server_version = "ProVarNet/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status, body, content_type="application/json", extra_headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (extra_headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        srv = self.server
+        parts = urlsplit(self.path)
+        if parts.path == "/health":
+            return self._send(200, to_json(srv.health()))
+        if parts.path == "/metrics":
+            return self._send(200, to_json(srv.metrics_snapshot()))
+
+        match = route(parts.path)
+        if match is None:
+            return self._send(404, to_json({"error": "unknown endpoint", "path": parts.path}))
+        endpoint, fn, uniprot_id, params = match
+        params.update((k, v[-1]) for k, v in parse_qs(parts.query).items())
+
+        t0 = time.perf_counter()
+        coalesced = False
+        headers = {}
+        try:
+            with tracing.span(f"serve {endpoint}", "service", protein=uniprot_id):
+                result, coalesced = srv.run(endpoint, fn, uniprot_id, params)
+            if isinstance(result, bytes):
+                status, body, content_type = 200, result, "image/png"
+            else:
+                status, body, content_type = 200, to_json(result), "application/json"
+        except ServiceError as e:
+            status, body, content_type, headers = e.status, to_json({"error": str(e)}), "application/json", e.headers
+        except HTTPError as e:
+            code = e.response.status_code if e.response is not None else 502
+            status = 404 if code in (400, 404) else 502
+            body, content_type = to_json({"error": f"upstream: {e}"}), "application/json"
+        except Exception as e:
+            status, body, content_type = 500, to_json({"error": f"{type(e).__name__}: {e}"}), "application/json"
+        srv.metrics.record(endpoint, time.perf_counter() - t0, status, coalesced)
+        self._send(status, body, content_type, headers)
+
+
+class AnalysisServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, workers=4, queue=32, timeout=300, verbose=False):
+        super().__init__(address, ServiceHandler)
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self.verbose = verbose
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="provarnet-worker")
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.flights = SingleFlight()
+        self.metrics = Metrics()
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.admitted = 0
+
+    def run(self, endpoint, fn, uniprot_id, params):
+        """(result, coalesced) of fn on the worker pool; identical requests share one run"""
+        key = (endpoint, uniprot_id, tuple(sorted(params.items())))
+        return self.flights.do(key, lambda: self._submit(fn, uniprot_id, params))
+
+    def _submit(self, fn, uniprot_id, params):
+        if not self.slots.acquire(blocking=False):
+            raise ServiceError(503, f"busy: {self.workers} running, {self.queue} queued", {"Retry-After": "1"})
+        with self.lock:
+            self.admitted += 1
+        token = cancel.CancelToken()
+        future = self.pool.submit(self._job, token, fn, uniprot_id, params)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            token.cancel()
+            raise ServiceError(504, f"no result after {self.timeout:g}s") from None
+        except cancel.Cancelled:
+            raise ServiceError(504, "cancelled") from None
+
+    def _job(self, token, fn, uniprot_id, params):
+        try:
+            with cancel.scope(token):
+                return fn(uniprot_id, params)
+        finally:
+            with self.lock:
+                self.admitted -= 1
+            self.slots.release()
+
+    def health(self):
+        with self.lock:
+            admitted = self.admitted
+        return {"status": "ok", "workers": self.workers, "running": min(admitted, self.workers),
+                "queued": max(admitted - self.workers, 0), "queue": self.queue}
+
+    def metrics_snapshot(self):
+        return dict(self.health(),
+                    uptime_s=round(time.time() - self.started, 1),
+                    cache=net.cache_stats(),
+                    analysis_cache=len(_data),
+                    endpoints=self.metrics.snapshot())
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_in_thread(host="127.0.0.1", port=0, **options):
+    """Start the service in a daemon thread; port=0 picks a free port"""
+    server = AnalysisServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
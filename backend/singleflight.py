@@ -0,0 +1,97 @@
+"""
+Single-flight: concurrent calls for the same key share one execution.
+
+Within a process, the first caller of do(key, fn) runs fn; callers that
+arrive while it is running wait for it and get the same result (or
+exception). Across processes, file_lock() serializes work on a key
+through an flock'd lock file, so a batch of processes sharing a disk
+cache downloads each resource once: the first holds the lock while
+fetching, the others then find the result in the cache.
+
+    flights = SingleFlight()
+    flights.do(url, lambda: download(url))
+"""
+import contextlib
+import hashlib
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: in-process coalescing only
+    fcntl = None
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key, fn, check=None):
+        """fn() once per key at a time; returns (result, shared) where shared
+        is True when the result came from another caller's run. While waiting,
+        check() is called periodically and may raise to stop waiting."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            while not flight.done.wait(0.1):
+                if check is not None:
+                    check()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._flights)
+
+
+@contextlib.contextmanager
+def file_lock(path, check=None):
+    """Exclusive lock on path across processes (no-op without fcntl).
+    With check, the lock is polled and check() may raise to stop waiting."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as fh:
+        if check is None:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    check()
+                    time.sleep(0.05)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def key_lock_path(root, key):
+    """Lock file for one key under root/locks"""
+    return os.path.join(root, "locks", hashlib.sha1(key.encode()).hexdigest() + ".lock")
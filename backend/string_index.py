@@ -0,0 +1,276 @@
+"""
+Local STRING interaction index for offline PPI queries.
+
+A STRING protein.links file ("protein1 protein2 combined_score", plain
+or .gz, e.g. 9606.protein.links.v12.0.txt.gz) is imported once into a
+compressed-sparse-row adjacency stored as .npy arrays:
+
+    nodes.npy     sorted STRING ids (fixed-width bytes); node id = position
+    indptr.npy    int64, row offsets (n_nodes + 1)
+    indices.npy   int32, neighbour node ids, each row sorted by score, best first
+    scores.npy    uint16, combined scores 0..1000
+    names.npy     preferred names per node (from protein.info, optional)
+    alias_keys.npy / alias_nodes.npy   sorted aliases (e.g. UniProt accessions,
+                  from protein.aliases, optional) and their node ids
+
+Everything is opened with mmap_mode="r", so opening is instant, only the
+pages a query touches are read, and lookups are np.searchsorted calls:
+
+    python provarnet.py string-index build 9606.protein.links.v12.0.txt.gz \\
+        --info 9606.protein.info.v12.0.txt.gz --aliases 9606.protein.aliases.v12.0.txt.gz -o string9606
+    idx = StringIndex("string9606")
+    idx.partners("P04637", limit=10)          # same records as the STRING API
+    idx.k_hop("P04637", hops=2, min_score=700)
+
+Set PROVARNET_STRING_INDEX=<dir> and ppi_network uses the index instead
+of the STRING API.
+"""
+import gzip
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from backend import tracing
+
+CHUNK_LINES = 2_000_000
+ALIAS_SOURCES = ("UniProt_AC", "UniProt_ID", "Ensembl_gene")
+
+_default = {}
+
+
+def _read_columns(path, usecols, names, chunk_lines=CHUNK_LINES):
+    # STRING flat files: one header line, then space- (links) or
+    # tab- (info, aliases) separated columns
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as fh:
+        sep = "\t" if "\t" in fh.readline() else " "
+    return pd.read_csv(path, sep=sep, header=None, skiprows=1, usecols=usecols, names=names,
+                       dtype=str, chunksize=chunk_lines, compression="infer", quoting=3)
+
+
+def _save(out_dir, name, array):
+    np.save(os.path.join(out_dir, name), array, allow_pickle=False)
+
+
+def build(links_path, out_dir, info_path=None, aliases_path=None, alias_sources=ALIAS_SOURCES,
+          chunk_lines=CHUNK_LINES):
+    """Import a protein.links file (plus optional protein.info / protein.aliases)
+    into out_dir; returns the opened StringIndex"""
+    os.makedirs(out_dir, exist_ok=True)
+    t0 = time.perf_counter()
+
+    # one pass over the links; ids get provisional codes in order of appearance,
+    # only the distinct ids of each chunk go through the dict
+    codes_of, ids = {}, []
+    src_parts, dst_parts, score_parts = [], [], []
+    with tracing.span("STRING links import", "pandas"):
+        for chunk in _read_columns(links_path, [0, 1, 2], ["a", "b", "score"], chunk_lines):
+            local, uniques = pd.factorize(pd.concat([chunk["a"], chunk["b"]], ignore_index=True))
+            lut = np.empty(len(uniques), dtype=np.int32)
+            for i, u in enumerate(uniques):
+                code = codes_of.get(u)
+                if code is None:
+                    code = codes_of[u] = len(ids)
+                    ids.append(u)
+                lut[i] = code
+            codes = lut[local]
+            src_parts.append(codes[:len(chunk)])
+            dst_parts.append(codes[len(chunk):])
+            score_parts.append(pd.to_numeric(chunk["score"]).to_numpy(dtype=np.uint16))
+
+    with tracing.span("STRING CSR build", "numpy"):
+        # renumber so node id == rank of the STRING id (lookups are a searchsorted)
+        ids = np.array(ids, dtype="S")
+        order = np.argsort(ids, kind="stable")
+        rank = np.empty(len(ids), dtype=np.int32)
+        rank[order] = np.arange(len(ids), dtype=np.int32)
+        nodes = ids[order]
+        del ids, codes_of
+
+        src = rank[np.concatenate(src_parts)] if src_parts else np.empty(0, np.int32)
+        dst = rank[np.concatenate(dst_parts)] if dst_parts else np.empty(0, np.int32)
+        scores = np.concatenate(score_parts) if score_parts else np.empty(0, np.uint16)
+        del src_parts, dst_parts, score_parts
+
+        # rows by source, best score first within a row
+        edge_order = np.lexsort((-scores.astype(np.int32), src))
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(nodes)), out=indptr[1:])
+        _save(out_dir, "nodes.npy", nodes)
+        _save(out_dir, "indptr.npy", indptr)
+        _save(out_dir, "indices.npy", dst[edge_order])
+        _save(out_dir, "scores.npy", scores[edge_order])
+        del src, dst, scores, edge_order
+
+    if info_path:
+        with tracing.span("STRING names import", "pandas"):
+            names = np.full(len(nodes), b"", dtype=object)
+            for chunk in _read_columns(info_path, [0, 1], ["id", "name"], chunk_lines):
+                node = _positions(nodes, chunk["id"].to_numpy(dtype="S"))
+                ok = node >= 0
+                names[node[ok]] = chunk["name"].to_numpy(dtype="S")[ok]
+            _save(out_dir, "names.npy", names.astype("S"))
+
+    if aliases_path:
+        with tracing.span("STRING aliases import", "pandas"):
+            keys, alias_nodes = [], []
+            for chunk in _read_columns(aliases_path, [0, 1, 2], ["id", "alias", "source"], chunk_lines):
+                chunk = chunk[chunk["source"].str.contains("|".join(alias_sources), na=False)]
+                node = _positions(nodes, chunk["id"].to_numpy(dtype="S"))
+                ok = node >= 0
+                keys.append(chunk["alias"].str.upper().to_numpy(dtype="S")[ok])
+                alias_nodes.append(node[ok])
+            keys = np.concatenate(keys) if keys else np.empty(0, dtype="S1")
+            alias_nodes = np.concatenate(alias_nodes) if alias_nodes else np.empty(0, np.int32)
+            keys, first = np.unique(keys, return_index=True)
+            _save(out_dir, "alias_keys.npy", keys)
+            _save(out_dir, "alias_nodes.npy", alias_nodes[first].astype(np.int32))
+
+    meta = {
+        "links": os.path.basename(links_path),
+        "nodes": int(len(nodes)),
+        "edges": int(indptr[-1]),
+        "build_seconds": round(time.perf_counter() - t0, 1),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as fh:
+        json.dump(meta, fh, indent=2)
+    print(f"[INFO] STRING index: {meta['nodes']} proteins, {meta['edges']} links ({meta['build_seconds']} s)")
+    return StringIndex(out_dir)
+
+
+def _positions(sorted_keys, keys):
+    """Positions of keys in a sorted array, -1 where absent"""
+    keys = np.asarray(keys, dtype="S")
+    if not len(sorted_keys):
+        return np.full(len(keys), -1, dtype=np.int32)
+    pos = np.searchsorted(sorted_keys, keys)
+    pos = np.minimum(pos, len(sorted_keys) - 1)
+    found = sorted_keys[pos] == keys
+    return np.where(found, pos, -1).astype(np.int32)
+
+
+class StringIndex:
+    def __init__(self, path):
+        self.path = path
+
+        def load(name, required=True):
+            file = os.path.join(path, name)
+            if not required and not os.path.exists(file):
+                return None
+            return np.load(file, mmap_mode="r")
+
+        self.nodes = load("nodes.npy")
+        self.indptr = load("indptr.npy")
+        self.indices = load("indices.npy")
+        self.scores = load("scores.npy")
+        self.names = load("names.npy", required=False)
+        self.alias_keys = load("alias_keys.npy", required=False)
+        self.alias_nodes = load("alias_nodes.npy", required=False)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def n_edges(self):
+        return int(self.indptr[-1])
+
+    def node(self, identifier, species=None):
+        """Node id of a STRING id ("9606.ENSP..."), UniProt accession or other
+        imported alias; KeyError if unknown"""
+        identifier = str(identifier).strip()
+        candidates = [identifier] if species is None else [f"{species}.{identifier}", identifier]
+        for key in candidates:
+            pos = _positions(self.nodes, [key.encode()])[0]
+            if pos >= 0:
+                return int(pos)
+        if self.alias_keys is not None:
+            pos = _positions(self.alias_keys, [identifier.upper().encode()])[0]
+            if pos >= 0:
+                return int(self.alias_nodes[pos])
+        raise KeyError(f"{identifier} is not in the STRING index")
+
+    def string_id(self, node):
+        return self.nodes[node].decode()
+
+    def name(self, node):
+        if self.names is not None and self.names[node]:
+            return self.names[node].decode()
+        return self.string_id(node).split(".", 1)[-1]
+
+    def degree(self, min_score=0):
+        """Links per node (at least min_score)"""
+        if min_score <= 0:
+            return np.diff(self.indptr)
+        row = np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.indptr))
+        return np.bincount(row[np.asarray(self.scores) >= min_score], minlength=len(self))
+
+    def neighbors(self, node, min_score=0, limit=None):
+        """(neighbour node ids, scores) of one node, best first"""
+        start, end = int(self.indptr[node]), int(self.indptr[node + 1])
+        scores = self.scores[start:end]
+        # rows are sorted by descending score: the threshold cuts a prefix
+        n = int(np.searchsorted(-scores.astype(np.int32), -min_score, side="right")) if min_score > 0 else end - start
+        if limit is not None:
+            n = min(n, limit)
+        return np.asarray(self.indices[start:start + n]), np.asarray(scores[:n])
+
+    def partners(self, identifier, limit=10, min_score=400, species=None):
+        """Interaction partners as the STRING API interaction_partners records
+        (stringId_A/B, preferredName_A/B, score in 0..1)"""
+        a = self.node(identifier, species)
+        name_a = self.name(a)
+        nbrs, scores = self.neighbors(a, min_score, limit)
+        return [{
+            "stringId_A": self.string_id(a),
+            "stringId_B": self.string_id(b),
+            "preferredName_A": name_a,
+            "preferredName_B": self.name(b),
+            "ncbiTaxonId": self.string_id(a).split(".", 1)[0],
+            "score": s / 1000,
+        } for b, s in zip(nbrs.tolist(), scores.tolist())]
+
+    def k_hop(self, identifier, hops=2, min_score=400, species=None):
+        """{node id: hop distance} for everything within `hops` links"""
+        start = self.node(identifier, species) if not isinstance(identifier, (int, np.integer)) else int(identifier)
+        seen = np.full(len(self), -1, dtype=np.int16)
+        seen[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        for hop in range(1, hops + 1):
+            if not len(frontier):
+                break
+            nbrs = np.concatenate([self.neighbors(n, min_score)[0] for n in frontier])
+            nbrs = np.unique(nbrs)
+            frontier = nbrs[seen[nbrs] < 0]
+            seen[frontier] = hop
+        hit = np.flatnonzero(seen >= 0)
+        return dict(zip(hit.tolist(), seen[hit].tolist()))
+
+    def subgraph(self, nodes, min_score=400):
+        """Links among a set of node ids: (source, target, score) arrays, each
+        undirected link once"""
+        nodes = np.unique(np.asarray(list(nodes), dtype=np.int64))
+        member = np.zeros(len(self), dtype=bool)
+        member[nodes] = True
+        src, dst, sc = [], [], []
+        for n in nodes:
+            nbrs, scores = self.neighbors(n, min_score)
+            keep = member[nbrs] & (nbrs > n)
+            src.append(np.full(int(keep.sum()), n, dtype=np.int32))
+            dst.append(nbrs[keep])
+            sc.append(scores[keep])
+        if not src:
+            return np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.uint16)
+        return np.concatenate(src), np.concatenate(dst), np.concatenate(sc)
+
+
+def default_index():
+    """StringIndex at $PROVARNET_STRING_INDEX, or None when unset"""
+    path = os.environ.get("PROVARNET_STRING_INDEX")
+    if not path:
+        return None
+    if path not in _default:
+        _default[path] = StringIndex(path)
+    return _default[path]
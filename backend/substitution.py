@@ -0,0 +1,124 @@
+"""
+Physicochemical scoring of amino-acid substitutions.
+
+Residues are encoded to integers 0..19 (only the distinct values are
+looked up, via pd.factorize) and every score is a 20x20 table indexed by
+(wild type, mutant), so a whole variant table is scored with a few
+fancy-indexing operations:
+
+    BLOSUM62              substitution log-odds (Biopython)
+    Grantham              Grantham's (1974) published distance matrix
+    hydrophobicity change Kyte-Doolittle, mutant minus wild type
+    charge change         side-chain charge at neutral pH, mutant minus wild type
+
+Anything that is not a single standard residue on both sides (stop,
+deletion, multi-residue change) scores NaN.
+"""
+import numpy as np
+import pandas as pd
+
+AMINO_ACIDS = "ARNDCQEGHILKMFPSTWYV"
+
+# Grantham (1974), Science 185:862, Table 2: the published distances (upper
+# triangle, the paper's residue order). Rounding in the paper means they differ
+# from the composition / polarity / volume formula by up to 1, and D-W by 10.
+_GRANTHAM_ORDER = "SRLPTAVGIFYCHQNKDEMW"
+_GRANTHAM_TABLE = """
+110 145  74  58  99 124  56 142 155 144 112  89  68  46 121  65  80 135 177
+    102 103  71 112  96 125  97  97  77 180  29  43  86  26  96  54  91 101
+         98  92  96  32 138   5  22  36 198  99 113 153 107 172 138  15  61
+             38  27  68  42  95 114 110 169  77  76  91 103 108  93  87 147
+                 58  69  59  89 103  92 149  47  42  65  78  85  65  81 128
+                     64  60  94 113 112 195  86  91 111 106 126 107  84 148
+                        109  29  50  55 192  84  96 133  97 152 121  21  88
+                            135 153 147 159  98  87  80 127  94  98 127 184
+                                 21  33 198  94 109 149 102 168 134  10  61
+                                     22 205 100 116 158 102 177 140  28  40
+                                        194  83  99 143  85 160 122  36  37
+                                            174 154 139 202 154 170 196 215
+                                                 24  68  32  81  40  87 115
+                                                     46  53  61  29 101 130
+                                                         94  23  42 142 174
+                                                            101  56  95 110
+                                                                 45 160 181
+                                                                    126 152
+                                                                         67
+"""
+_CHARGE = {"K": 1, "R": 1, "D": -1, "E": -1}
+
+SCORE_COLUMNS = ["BLOSUM62", "Grantham", "hydrophobicity_change", "charge_change"]
+
+_tables = None
+
+
+def grantham_matrix():
+    """Symmetric 20x20 Grantham distances in AMINO_ACIDS order (0 on the diagonal)"""
+    published = np.zeros((20, 20))
+    for i, row in enumerate(_GRANTHAM_TABLE.strip().splitlines()):
+        values = [float(v) for v in row.split()]
+        published[i, i + 1:] = values
+        published[i + 1:, i] = values
+    order = [_GRANTHAM_ORDER.index(aa) for aa in AMINO_ACIDS]
+    return published[np.ix_(order, order)]
+
+
+def _build_tables():
+    from Bio.Align import substitution_matrices
+    from Bio.SeqUtils.ProtParamData import kd
+
+    blosum = substitution_matrices.load("BLOSUM62")
+    blosum62 = np.array([[blosum[a, b] for b in AMINO_ACIDS] for a in AMINO_ACIDS], dtype=float)
+
+    grantham = grantham_matrix()
+
+    hyd = np.array([kd[a] for a in AMINO_ACIDS])
+    charge = np.array([_CHARGE.get(a, 0) for a in AMINO_ACIDS], dtype=float)
+    return {
+        "BLOSUM62": blosum62,
+        "Grantham": grantham,
+        "hydrophobicity_change": np.subtract.outer(hyd, hyd).T,   # [wt, mut] = mut - wt
+        "charge_change": np.subtract.outer(charge, charge).T,
+    }
+
+
+def tables():
+    """The 20x20 score tables, indexed [wild type, mutant] in AMINO_ACIDS order"""
+    global _tables
+    if _tables is None:
+        _tables = _build_tables()
+    return _tables
+
+
+_INDEX = {aa: i for i, aa in enumerate(AMINO_ACIDS)}
+_INDEX.update({aa.lower(): i for aa, i in list(_INDEX.items())})
+
+
+def encode(residues):
+    """Integer codes 0..19 for one-letter residues; -1 for anything else
+    (missing, stop, non-standard or longer than one letter)"""
+    codes, uniques = pd.factorize(pd.Series(residues, dtype=object))
+    # only the distinct values go through Python; -1 (missing) hits the sentinel
+    lut = np.array([_INDEX.get(u, -1) if isinstance(u, str) else -1 for u in uniques] + [-1], dtype=np.int64)
+    return lut[codes]
+
+
+def score(wild_type, mutant):
+    """Dict of score arrays (NaN where either side is not a single residue)"""
+    wt, mt = encode(wild_type), encode(mutant)
+    ok = (wt >= 0) & (mt >= 0)
+    out = {}
+    for name, table in tables().items():
+        col = np.full(len(wt), np.nan)
+        col[ok] = table[wt[ok], mt[ok]]
+        out[name] = col
+    return out
+
+
+def add_substitution_scores(df, wt_col="wild_type", mut_col="mutatedType", alt_col="alt_seq"):
+    """Add the SCORE_COLUMNS to a variant table in place and return it"""
+    mutant = df[mut_col] if mut_col in df else df[alt_col]
+    if mut_col in df and alt_col in df:
+        mutant = mutant.fillna(df[alt_col])
+    for name, values in score(df[wt_col], mutant).items():
+        df[name] = values
+    return df
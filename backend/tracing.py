@@ -0,0 +1,136 @@
+"""
+Lightweight tracing: nested, timed spans for fetches, parsing, analysis and rendering.
+
+    with tracing.span("DataFrame build", "pandas", rows=len(df)) as sp:
+        ...
+        sp["args"]["bytes"] = nbytes
+
+Finished spans are kept in memory (bounded), summarised for the GUI
+"Performance" panel and exportable as Chrome-trace JSON (chrome://tracing,
+Perfetto). Set PROVARNET_TRACE=<file.json> to export automatically at exit.
+"""
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+MAX_SPANS = 50_000
+
+_local = threading.local()
+_spans = deque(maxlen=MAX_SPANS)
+_lock = threading.Lock()
+_t0 = time.perf_counter()
+enabled = True
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+@contextlib.contextmanager
+def span(name, category="app", **args):
+    """Time a block. Yields the span record so callers can attach args (e.g. bytes)."""
+    if not enabled:
+        yield {"args": {}}
+        return
+    stack = _stack()
+    record = {
+        "name": name,
+        "cat": category,
+        "start": time.perf_counter() - _t0,
+        "dur": 0.0,
+        "depth": len(stack),
+        "parent": stack[-1]["name"] if stack else None,
+        "tid": threading.get_ident(),
+        "args": dict(args),
+    }
+    stack.append(record)
+    try:
+        yield record
+    except BaseException as e:
+        record["args"]["error"] = type(e).__name__
+        raise
+    finally:
+        stack.pop()
+        record["dur"] = time.perf_counter() - _t0 - record["start"]
+        with _lock:
+            _spans.append(record)
+
+
+def traced(name=None, category="app"):
+    """Decorator form of span()"""
+    def wrap(func):
+        label = name or func.__name__
+
+        def inner(*a, **kw):
+            with span(label, category):
+                return func(*a, **kw)
+        inner.__name__ = func.__name__
+        inner.__doc__ = func.__doc__
+        inner.__wrapped__ = func
+        return inner
+    return wrap
+
+
+def records():
+    with _lock:
+        return list(_spans)
+
+
+def clear():
+    with _lock:
+        _spans.clear()
+
+
+def summary(limit=30):
+    """Per-span-name totals as rows of (name, category, count, total_s, max_s, bytes)"""
+    totals = {}
+    for r in records():
+        key = (r["name"], r["cat"])
+        row = totals.setdefault(key, [0, 0.0, 0.0, 0])
+        row[0] += 1
+        row[1] += r["dur"]
+        row[2] = max(row[2], r["dur"])
+        row[3] += int(r["args"].get("bytes", 0) or 0)
+    rows = [(n, c, cnt, tot, mx, b) for (n, c), (cnt, tot, mx, b) in totals.items()]
+    rows.sort(key=lambda x: x[3], reverse=True)
+    return rows[:limit]
+
+
+def summary_text(limit=30):
+    rows = summary(limit)
+    if not rows:
+        return "No timings recorded yet."
+    lines = [f"{'Stage':<42}{'Calls':>6}{'Total ms':>11}{'Max ms':>10}{'KB':>10}"]
+    for name, cat, cnt, tot, mx, b in rows:
+        label = f"[{cat}] {name}"[:41]
+        lines.append(f"{label:<42}{cnt:>6}{tot * 1000:>11.1f}{mx * 1000:>10.1f}{b / 1024:>10.1f}")
+    return "\n".join(lines)
+
+
+def export_chrome_trace(path):
+    """Write recorded spans in Chrome trace-event format"""
+    pid = os.getpid()
+    events = [{
+        "name": r["name"],
+        "cat": r["cat"],
+        "ph": "X",
+        "ts": r["start"] * 1e6,
+        "dur": r["dur"] * 1e6,
+        "pid": pid,
+        "tid": r["tid"],
+        "args": {k: (v if isinstance(v, (int, float, str, bool)) or v is None else str(v))
+                 for k, v in r["args"].items()},
+    } for r in records()]
+    with open(path, "w") as fh:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fh)
+    return path
+
+
+if os.environ.get("PROVARNET_TRACE"):
+    atexit.register(export_chrome_trace, os.environ["PROVARNET_TRACE"])
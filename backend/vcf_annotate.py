@@ -0,0 +1,133 @@
+"""
+Annotate VCF records with the protein-level EBI variant data.
+
+The genomicLocation HGVS strings of a set of proteins (e.g.
+NC_000017.11:g.7676154G>C) are parsed once into a hash index keyed by
+"chrom:pos:ref:alt"; the VCF is then read in fixed-size chunks and each
+chunk is hash-joined against the index, so memory stays bounded by the
+chunk size however long the file is. Coordinates are GRCh38, as in the
+EBI Proteins API.
+
+    python provarnet.py annotate cohort.vcf.gz --proteins P04637,Q8WZ42 -o hits.tsv
+"""
+import os
+import sys
+
+import pandas as pd
+
+from backend import bulk, g3_variant, tracing
+
+CHUNK_LINES = 200_000
+HGVS_SNV = r"^NC_0+(?P<acc>\d+)\.(?P<version>\d+):g\.(?P<pos>\d+)(?P<ref>[ACGT])>(?P<alt>[ACGT])$"
+_CHROM_NAMES = {"23": "X", "24": "Y", "12920": "MT"}
+# RefSeq accession versions of the GRCh38 chromosomes; EBI also lists GRCh37 (older versions)
+GRCH38_VERSIONS = {
+    "1": "11", "2": "12", "3": "12", "4": "12", "5": "10", "6": "12", "7": "14", "8": "11",
+    "9": "12", "10": "11", "11": "10", "12": "12", "13": "11", "14": "9", "15": "10", "16": "10",
+    "17": "11", "18": "10", "19": "10", "20": "11", "21": "9", "22": "11", "23": "11", "24": "10",
+    "12920": "1",
+}
+
+ANNOTATION_COLUMNS = [
+    "uniprot", "position", "wild_type", "mutant", "consequence",
+    "PolyPhen_score", "PolyPhen_prediction", "SIFT_score", "SIFT_prediction",
+    "disease", "variant_id",
+]
+
+
+def normalize_chrom(chrom):
+    """'chr17' / '17' -> '17', 'chrM' -> 'MT' (vectorized over a Series)"""
+    chrom = chrom.astype(str).str.replace(r"^chr", "", regex=True, case=False)
+    return chrom.where(chrom != "M", "MT")
+
+
+def parse_genomic_locations(locations):
+    """DataFrame (chrom, pos, ref, alt) for GRCh38 HGVS g. SNV strings; others are NaN"""
+    parts = locations.str.extract(HGVS_SNV)
+    parts = parts.where(parts["version"] == parts["acc"].map(GRCH38_VERSIONS), axis=0)
+    parts["chrom"] = parts["acc"].replace(_CHROM_NAMES)
+    return parts[["chrom", "pos", "ref", "alt"]]
+
+
+def build_index(uniprot_ids):
+    """Annotations indexed by 'chrom:pos:ref:alt' for all variants of the proteins"""
+    bulk.prefetch(uniprot_ids, services=("variation",))
+    frames = []
+    for uniprot_id in uniprot_ids:
+        try:
+            df_variants, _ = g3_variant.variant_dataframe(uniprot_id)
+        except Exception as e:
+            print(f"[INFO] Skipping {uniprot_id}: {e}", file=sys.stderr)
+            continue
+        df = df_variants.assign(
+            uniprot=uniprot_id,
+            mutant=df_variants["mutatedType"].fillna(df_variants["alt_seq"]),
+            location=df_variants["genomicLocation"].str.split("; "),
+        ).explode("location")
+        frames.append(df)
+    if not frames:
+        return pd.DataFrame(columns=ANNOTATION_COLUMNS, index=pd.Index([], name="key"))
+
+    with tracing.span("genomic index", "pandas"):
+        df = pd.concat(frames, ignore_index=True)
+        loc = parse_genomic_locations(df["location"].astype("string"))
+        ok = loc["pos"].notna().to_numpy()
+        df, loc = df[ok], loc[ok]
+        index = pd.DataFrame({
+            "key": loc["chrom"] + ":" + loc["pos"] + ":" + loc["ref"] + ":" + loc["alt"],
+            "uniprot": df["uniprot"],
+            "position": pd.to_numeric(df["begin"], errors="coerce").astype("Int64"),
+            "wild_type": df["wild_type"],
+            "mutant": df["mutant"],
+            "consequence": df["consequence"],
+            "PolyPhen_score": df["PolyPhen_score"],
+            "PolyPhen_prediction": df["PolyPhen_prediction"],
+            "SIFT_score": df["SIFT_score"],
+            "SIFT_prediction": df["SIFT_prediction"],
+            "disease": df["DiseaseList"],
+            "variant_id": df["variant_id"],
+        })
+        return index.drop_duplicates().set_index("key")
+
+
+def load_or_build_index(uniprot_ids, path=None):
+    """build_index(), kept as a pickle at path so a protein set is parsed once"""
+    if path and os.path.exists(path):
+        index = pd.read_pickle(path)
+        if set(index.attrs.get("proteins", [])) == set(uniprot_ids):
+            return index
+    index = build_index(uniprot_ids)
+    index.attrs["proteins"] = sorted(uniprot_ids)
+    if path:
+        index.to_pickle(path)
+    return index
+
+
+def read_vcf_chunks(path, chunk_lines=CHUNK_LINES):
+    """(CHROM, POS, REF, ALT) chunks; header lines are skipped, nothing else is parsed"""
+    return pd.read_csv(
+        path, sep="\t", comment="#", header=None, usecols=[0, 1, 3, 4],
+        names=["CHROM", "POS", "REF", "ALT"], dtype=str, chunksize=chunk_lines,
+        compression="infer",
+    )
+
+
+def annotate_vcf(vcf_path, index, out, chunk_lines=CHUNK_LINES):
+    """Stream the VCF against the index, writing matched rows to `out` as TSV.
+    Returns (records read, annotations written)."""
+    n_records = n_hits = 0
+    header = True
+    for chunk in read_vcf_chunks(vcf_path, chunk_lines):
+        n_records += len(chunk)
+        with tracing.span("VCF chunk", "pandas", rows=len(chunk)):
+            chunk = chunk.assign(ALT=chunk["ALT"].str.split(",")).explode("ALT")
+            chunk["key"] = (normalize_chrom(chunk["CHROM"]) + ":" + chunk["POS"] + ":"
+                            + chunk["REF"].str.upper() + ":" + chunk["ALT"].str.upper())
+            hits = chunk.join(index, on="key", how="inner").drop(columns="key")
+        if len(hits):
+            hits.to_csv(out, sep="\t", index=False, header=header)
+            header = False
+            n_hits += len(hits)
+    if header:
+        out.write("\t".join(["CHROM", "POS", "REF", "ALT"] + ANNOTATION_COLUMNS) + "\n")
+    return n_records, n_hits
@@ -0,0 +1,188 @@
+"""
+Cross-protein variant warehouse on partitioned Parquet (pyarrow).
+
+Each table is a directory partitioned by protein,
+
+    <root>/variants/uniprot=P04637/part-0.parquet
+    <root>/predictions/uniprot=P04637/part-0.parquet
+    <root>/disease_links/...    <root>/domains/...
+
+with low-cardinality text columns dictionary-encoded (categoricals in
+pandas). Storing a protein again replaces its partition. Queries go
+through pyarrow.dataset, so protein filters prune whole partitions and
+column filters are pushed down to the Parquet row groups:
+
+    wh = Warehouse("warehouse")
+    wh.query("variants", where={"PolyPhen_prediction": "probably damaging"},
+             columns=["uniprot", "begin", "DiseaseList"])
+    wh.variants_in_domains("kinase")
+
+Set PROVARNET_WAREHOUSE=<dir> to add every protein the app analyses.
+"""
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from backend.singleflight import file_lock, key_lock_path
+
+TABLES = ("variants", "predictions", "disease_links", "domains")
+CATEGORICAL = {
+    "type", "consequence", "wild_type", "mutatedType", "PolyPhen_prediction", "SIFT_prediction",
+    "algorithm", "prediction", "impact_class", "Map_pred", "source", "domain_type",
+}
+INTEGER = {"begin", "end", "position", "row", "start"}
+
+
+def _arrow_table(df):
+    """pyarrow Table with stable column types, whatever pandas inferred"""
+    import pyarrow as pa
+
+    arrays, names = [], []
+    for col in df.columns:
+        s = df[col]
+        if col in CATEGORICAL:
+            arr = pa.array(s.astype("string"), type=pa.string()).dictionary_encode()
+        elif col in INTEGER:
+            arr = pa.array(pd.to_numeric(s, errors="coerce").astype("Int64"), type=pa.int64())
+        elif pd.api.types.is_bool_dtype(s):
+            arr = pa.array(s, type=pa.bool_())
+        elif pd.api.types.is_numeric_dtype(s):
+            arr = pa.array(s, type=pa.float64())
+        else:
+            arr = pa.array(s.astype("string"), type=pa.string())
+        arrays.append(arr)
+        names.append(str(col))
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+def _expression(where):
+    """pyarrow expression from {column: value or list of values}; expressions pass through"""
+    import pyarrow.dataset as ds
+
+    if where is None or not isinstance(where, dict):
+        return where
+    expr = None
+    for col, value in where.items():
+        if isinstance(value, (list, tuple, set)):
+            term = ds.field(col).isin(list(value))
+        else:
+            term = ds.field(col) == value
+        expr = term if expr is None else expr & term
+    return expr
+
+
+def domain_frame(domains):
+    """g1_protein.fetch_domains() records as a domains table"""
+    frame = pd.DataFrame(domains, columns=["accession", "name", "type", "start", "end"])
+    return frame.rename(columns={"type": "domain_type"})
+
+
+class Warehouse:
+    def __init__(self, root):
+        self.root = root
+
+    def _partition(self, table, uniprot_id):
+        return os.path.join(self.root, table, f"uniprot={uniprot_id}")
+
+    def write(self, table, uniprot_id, df):
+        """Replace one protein's partition of a table"""
+        import pyarrow.parquet as pq
+
+        if table not in TABLES:
+            raise ValueError(f"Unknown table: {table}")
+        part = self._partition(table, uniprot_id)
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        # unique and dot-prefixed: concurrent writers never share a temp dir, and
+        # dataset discovery never sees a half-written partition
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(part), prefix=".tmp-")
+        try:
+            pq.write_table(_arrow_table(df.drop(columns="uniprot", errors="ignore")),
+                           os.path.join(tmp, "part-0.parquet"), compression="zstd")
+            # one swap per partition at a time; the old partition is renamed aside
+            # rather than deleted first, so it is missing only between two renames
+            with file_lock(key_lock_path(self.root, f"{table}/{uniprot_id}")):
+                old = None
+                if os.path.exists(part):
+                    old = tempfile.mkdtemp(dir=os.path.dirname(part), prefix=".old-")
+                    os.replace(part, os.path.join(old, "partition"))
+                os.replace(tmp, part)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def store_protein(self, uniprot_id, df_variants, pred_df=None, df_links=None, domains=None):
+        uniprot_id = uniprot_id.strip().upper()
+        self.write("variants", uniprot_id, df_variants)
+        if pred_df is not None:
+            self.write("predictions", uniprot_id, pred_df)
+        if df_links is not None:
+            self.write("disease_links", uniprot_id, df_links)
+        if domains is not None:
+            self.write("domains", uniprot_id, domain_frame(domains))
+
+    def proteins(self, table="variants"):
+        path = os.path.join(self.root, table)
+        if not os.path.isdir(path):
+            return []
+        return sorted(d.split("=", 1)[1] for d in os.listdir(path)
+                      if d.startswith("uniprot="))
+
+    def dataset(self, table):
+        import pyarrow.dataset as ds
+
+        return ds.dataset(os.path.join(self.root, table), format="parquet", partitioning="hive",
+                          exclude_invalid_files=True)
+
+    def query(self, table, where=None, columns=None, proteins=None):
+        """DataFrame of the matching rows; only the needed partitions,
+        row groups and columns are read"""
+        import pyarrow.dataset as ds
+
+        if not os.path.isdir(os.path.join(self.root, table)):
+            return pd.DataFrame(columns=columns)
+        expr = _expression(where)
+        if proteins is not None:
+            by_protein = ds.field("uniprot").isin([p.strip().upper() for p in proteins])
+            expr = by_protein if expr is None else expr & by_protein
+        return self.dataset(table).to_table(columns=columns, filter=expr).to_pandas()
+
+    def variants_in_domains(self, name_pattern, where=None, proteins=None,
+                            columns=("uniprot", "variant_id", "begin", "wild_type", "mutatedType",
+                                     "PolyPhen_prediction", "PolyPhen_score", "DiseaseList")):
+        """Variants (default: probably damaging) inside domains whose name
+        matches name_pattern (case-insensitive regex), across proteins"""
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        if where is None:
+            where = {"PolyPhen_prediction": "probably damaging"}
+        name_match = pc.match_substring_regex(ds.field("name"), name_pattern, ignore_case=True)
+        doms = self.query("domains", where=name_match, proteins=proteins)
+        if doms.empty:
+            return pd.DataFrame(columns=list(columns) + ["domain", "domain_name"])
+        variants = self.query("variants", where=where, proteins=sorted(doms["uniprot"].unique()),
+                              columns=list(dict.fromkeys(list(columns) + ["uniprot", "begin"])))
+
+        # a handful of domains per protein: one vectorized mask each
+        hits = []
+        for uniprot_id, vs in variants.groupby("uniprot", observed=True):
+            d = doms[doms["uniprot"] == uniprot_id]
+            pos = vs["begin"].to_numpy(dtype=float)
+            starts, ends = d["start"].to_numpy(dtype=float), d["end"].to_numpy(dtype=float)
+            for i in range(len(d)):
+                inside = (pos >= starts[i]) & (pos <= ends[i])
+                if inside.any():
+                    hits.append(vs[inside].assign(domain=d["accession"].iloc[i], domain_name=d["name"].iloc[i]))
+        if not hits:
+            return pd.DataFrame(columns=list(columns) + ["domain", "domain_name"])
+        return pd.concat(hits, ignore_index=True)
+
+
+def default_warehouse():
+    """Warehouse at $PROVARNET_WAREHOUSE, or None when unset"""
+    root = os.environ.get("PROVARNET_WAREHOUSE")
+    return Warehouse(root) if root else None
@@ -0,0 +1,251 @@
+"""
+Offline benchmark suite for the ProVarNet analyses.
+
+Runs each analysis stage against recorded UniProt / EBI / STRING / PDBe /
+RCSB / AlphaFold responses for a small, a medium and a very large protein,
+and reports wall time and peak (traced) memory per stage. The fixtures
+and baseline of a synthetic protein are committed, so the gate always
+measures something; the real proteins need --record once.
+
+    python benchmarks/run_benchmarks.py --record           # once, needs network
+    python benchmarks/run_benchmarks.py                    # replay + compare to baseline
+    python benchmarks/run_benchmarks.py --update-baseline  # accept current numbers
+    python benchmarks/run_benchmarks.py --via-server --latency-ms 80
+                                    # full HTTP path through the local replay server
+
+Exits with status 1 when a stage is slower / bigger than the stored
+baseline by more than the given tolerance, or starts failing, and also
+when a selected size has no fixtures or there is no baseline at all.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from Bio.PDB import PDBParser
+
+from backend import net, g1_protein, g1_structure, g3_variant, interval_index, network_metrics, replay_server
+from backend.recording import has_fixtures
+
+PROTEINS = {
+    "synthetic": "SYNTH1",  # 400 aa, 2000 variants; fixtures committed (synthetic_fixtures.py)
+    "small": "P61073",    # CXCR4, 352 aa
+    "medium": "P04637",   # TP53, 393 aa, many variants
+    "large": "Q8WZ42",    # Titin, ~35,000 aa
+}
+FIXTURES = os.path.join(HERE, "fixtures")
+BASELINE = os.path.join(HERE, "baseline.json")
+
+# Minimum absolute slow-down (s) before a relative regression counts,
+# so sub-millisecond stages do not flap.
+MIN_TIME_DELTA = 0.05
+
+
+def _af_chain_and_ref(uniprot_id):
+    af_handle = g1_structure.fetch_alphafold_pdb(uniprot_id)
+    model = next(PDBParser(QUIET=True).get_structure("af", af_handle).get_models())
+    chain = next(model.get_chains())
+    return chain, g1_structure.fetch_uniprot_fasta(uniprot_id)
+
+
+# (name, setup(uniprot_id) -> args, run(*args)); only run() is measured
+STAGES = [
+    ("variant_dataframe", lambda p: (p,), g3_variant.variant_dataframe),
+    ("Variant_analysis", lambda p: (p,), g3_variant.Variant_analysis),
+    ("disease_associated_variants", lambda p: (p,), g3_variant.disease_associated_variants),
+    ("ppi_network", lambda p: (p,), g1_protein.ppi_network),
+    ("verify_protein_identity", _af_chain_and_ref, g1_structure.verify_protein_identity),
+    ("structural_comparison", lambda p: (p,), g1_structure.structural_comparison),
+]
+
+
+def clear_caches():
+    """Empty every cache, so each measured run starts cold"""
+    net.clear_cache()
+    for module in (g1_structure, g3_variant, interval_index, network_metrics):
+        module.clear_caches()
+
+
+def _run_once(run, args):
+    try:
+        return run(*args)
+    finally:
+        plt.close("all")
+        clear_caches()
+
+
+def measure(run, args, repeat):
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        t0 = time.perf_counter()
+        _run_once(run, args)
+        times.append(time.perf_counter() - t0)
+
+    # memory in a separate pass: tracemalloc slows the code it watches
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _run_once(run, args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # the fastest run: scheduling noise only ever adds time, so the minimum is
+    # the steadiest estimate on a busy machine (as timeit reports)
+    return {"time_s": min(times), "peak_mb": peak / 1e6}
+
+
+def run_suite(sizes, stages, repeat, record=False, via_server=False, latency_ms=0):
+    results = {}
+    for size in sizes:
+        uniprot_id = PROTEINS[size]
+        fixture_dir = os.path.join(FIXTURES, size)
+        server = None
+        if record:
+            net.record_to(fixture_dir)
+        else:
+            if via_server:
+                server = replay_server.start_in_thread(fixture_dir, latency_ms=latency_ms)
+                net.use_server(server.base_url)
+            else:
+                net.replay_from(fixture_dir)
+        try:
+            for name, setup, run in stages:
+                key = f"{size}/{name}"
+                try:
+                    args = setup(uniprot_id)
+                    if record:
+                        _run_once(run, args)
+                        results[key] = {"recorded": True}
+                    else:
+                        results[key] = measure(run, args, repeat)
+                except Exception as e:
+                    results[key] = {"error": f"{type(e).__name__}: {e}"[:200]}
+                print(f"{key:<45} {_fmt(results[key])}", flush=True)
+        finally:
+            net.record_to(None)
+            net.replay_from(None)
+            if server is not None:
+                net.use_server(None)
+                server.shutdown()
+                server.server_close()
+    return results
+
+
+def _fmt(r):
+    if "error" in r:
+        return f"ERROR {r['error']}"
+    if "recorded" in r:
+        return "recorded"
+    return f"{r['time_s'] * 1000:10.1f} ms {r['peak_mb']:10.1f} MB"
+
+
+def compare(results, baseline, time_tol, mem_tol, selected=None):
+    """List of regression messages versus the baseline; a baseline entry
+    with no current result (crashed, renamed, fixtures gone) is one too,
+    unless selected(key) says it was left out of this run"""
+    problems = []
+    for key, base in baseline.items():
+        if "error" in base or (selected is not None and not selected(key)):
+            continue
+        cur = results.get(key)
+        if cur is None:
+            problems.append(f"{key}: missing from this run")
+            continue
+        if "error" in cur:
+            problems.append(f"{key}: now fails ({cur['error']})")
+            continue
+        slow = cur["time_s"] - base["time_s"]
+        if cur["time_s"] > base["time_s"] * (1 + time_tol) and slow > MIN_TIME_DELTA:
+            problems.append(f"{key}: time {base['time_s']:.3f}s -> {cur['time_s']:.3f}s")
+        if cur["peak_mb"] > base["peak_mb"] * (1 + mem_tol) and cur["peak_mb"] - base["peak_mb"] > 1.0:
+            problems.append(f"{key}: peak memory {base['peak_mb']:.1f}MB -> {cur['peak_mb']:.1f}MB")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", action="store_true", help="fetch live responses into benchmarks/fixtures")
+    parser.add_argument("--update-baseline", action="store_true", help="store the current results as baseline")
+    parser.add_argument("--sizes", help="comma-separated subset of: " + ", ".join(PROTEINS)
+                        + " (default: every size with fixtures; every size with --record)")
+    parser.add_argument("--stages", default=None, help="comma-separated subset of stage names")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed relative slow-down")
+    parser.add_argument("--mem-tolerance", type=float, default=0.20, help="allowed relative memory growth")
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--via-server", action="store_true", help="replay over HTTP through backend.replay_server")
+    parser.add_argument("--latency-ms", type=float, default=0, help="latency injected by the replay server")
+    args = parser.parse_args(argv)
+
+    if args.sizes:
+        sizes = [s for s in args.sizes.split(",") if s]
+    elif args.record:
+        sizes = [s for s in PROTEINS if s != "synthetic"]
+    else:
+        sizes = [s for s in PROTEINS if has_fixtures(os.path.join(FIXTURES, s))]
+    if not sizes:
+        print("[ERROR] no fixtures at all; run benchmarks/synthetic_fixtures.py or --record first")
+        return 1
+    if args.record and "synthetic" in sizes:
+        parser.error("the synthetic fixtures are generated by benchmarks/synthetic_fixtures.py, not recorded")
+    missing = [s for s in sizes if not args.record and not has_fixtures(os.path.join(FIXTURES, s))]
+    if missing:
+        # nothing measured is not a pass
+        print(f"[ERROR] no fixtures for {', '.join(missing)}; run with --record first, or leave them out with --sizes")
+        return 1
+    stages = STAGES
+    wanted = None
+    if args.stages:
+        wanted = set(args.stages.split(","))
+        stages = [s for s in STAGES if s[0] in wanted]
+
+    results = run_suite(sizes, stages, args.repeat, record=args.record,
+                        via_server=args.via_server, latency_ms=args.latency_ms)
+    if args.record:
+        return 0
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=1, sort_keys=True)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(BASELINE):
+            with open(BASELINE) as fh:
+                baseline = json.load(fh)
+        baseline.update(results)
+        with open(BASELINE, "w") as fh:
+            json.dump(baseline, fh, indent=1, sort_keys=True)
+        print(f"Baseline written to {BASELINE}")
+        return 0
+
+    if not os.path.exists(BASELINE):
+        print(f"[ERROR] no baseline at {BASELINE}; run with --update-baseline to create one")
+        return 1
+    with open(BASELINE) as fh:
+        baseline = json.load(fh)
+    def selected(key):
+        # a renamed stage still counts unless --stages narrowed the run
+        size, _, name = key.partition("/")
+        return size in sizes and (wanted is None or name in wanted)
+
+    problems = compare(results, baseline, args.time_tolerance, args.mem_tolerance, selected)
+    for p in problems:
+        print(f"[REGRESSION] {p}")
+    if not problems:
+        print("No regressions versus baseline.")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
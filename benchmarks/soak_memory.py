@@ -0,0 +1,221 @@
+"""
+Memory soak test: opens the analyses for many proteins in a row and checks
+that the process does not keep growing.
+
+For every protein the dialog analyses (variant analysis, disease-associated
+variants, PPI network, structure comparison) are run and their figures
+rasterized and released as the dialogs do; with --gui the real dialogs are
+opened offscreen, filled in and closed instead. Resident memory (RSS) is
+sampled after each protein; once --warmup proteins have run (imports, font
+and style caches, ...) it must stay within --max-growth-mb.
+
+    python benchmarks/soak_memory.py --proteins ids.txt        # live, one accession per line
+    python benchmarks/soak_memory.py --replay --count 200      # cycles the benchmark fixtures
+    python benchmarks/soak_memory.py --replay --count 200 --gui
+
+The caches are left in place, as in a long-running app or server, but
+shrunk (--cache-size entries per per-protein cache, --response-cache-mb for
+the response cache) so that even the three recorded proteins of --replay
+keep evicting entries: RSS must level off once the caches are full. Exits
+with status 1 when RSS grows by more than the allowed amount.
+"""
+import argparse
+import ctypes
+import gc
+import itertools
+import os
+import statistics
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+
+from backend import figures, g1_protein, g1_structure, g3_variant, interval_index, net, network_metrics
+from backend.recording import has_fixtures
+from run_benchmarks import FIXTURES, PROTEINS
+
+ANALYSES = [
+    ("Variant_analysis", g3_variant.Variant_analysis),
+    ("disease_associated_variants", g3_variant.disease_associated_variants),
+    ("ppi_network", g1_protein.ppi_network),
+    ("structural_comparison", g1_structure.structural_comparison),
+]
+
+
+def rss_mb():
+    """Current resident set size; the peak where /proc is not available"""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def settle():
+    """Collect garbage and hand freed heap back to the OS, so RSS reflects live memory"""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def limit_caches(entries, response_mb):
+    """Shrink the bounded caches so the soak run keeps evicting from them"""
+    for module in (g1_structure, g3_variant, interval_index, network_metrics):
+        module.set_cache_size(entries)
+    net.set_cache_size(int(response_mb * 1024 * 1024))
+
+
+def open_analyses(uniprot_id):
+    """Run each analysis and rasterize its figure; returns the failures"""
+    errors = []
+    for name, run in ANALYSES:
+        try:
+            result = run(uniprot_id)
+        except Exception as e:
+            errors.append(f"{name}: {type(e).__name__}: {e}"[:200])
+            continue
+        for fig in (result if isinstance(result, tuple) else ()):
+            if isinstance(fig, Figure):
+                figures.to_png(fig)
+                figures.release(fig)
+    return errors
+
+
+class DialogSoak:
+    """Opens the analysis dialogs offscreen, waits for their content, closes them"""
+
+    def __init__(self, timeout=120):
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+
+        self.qapp = QApplication.instance() or QApplication(sys.argv[:1])
+        import app
+        self.app = app
+        self.timeout = timeout
+
+    def _wait(self, busy):
+        from PyQt5.QtWidgets import QApplication
+
+        deadline = time.monotonic() + self.timeout
+        while busy() and time.monotonic() < deadline:
+            QApplication.processEvents()
+            time.sleep(0.01)
+        return not busy()
+
+    def _close(self, dialog):
+        from PyQt5.QtCore import QEvent
+        from PyQt5.QtWidgets import QApplication
+
+        dialog.close()
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        QApplication.processEvents()
+
+    def __call__(self, uniprot_id):
+        app = self.app
+        errors = []
+        for dialog_class in (app.VariantDialog, app.DiseaseVariantDialog, app.ComparisonDialog):
+            dialog = dialog_class(uniprot_id)
+            dialog.show()
+            if not self._wait(lambda: dialog._workers or dialog._render_queue):
+                errors.append(f"{dialog_class.__name__}: still loading after {self.timeout}s")
+            self._close(dialog)
+
+        try:
+            result = g1_protein.ppi_network(uniprot_id)
+        except Exception as e:
+            result = f"{type(e).__name__}: {e}"
+        if isinstance(result, tuple) and result[0] is not None:
+            fig, explain = result
+            dialog = app.PPIDialog("Protein–Protein Interaction Network", explain, fig, protein_code=uniprot_id)
+            dialog.show()
+            worker = dialog._metrics_worker
+            self._wait(lambda: not worker.isFinished())
+            self._close(dialog)
+        else:
+            errors.append(f"ppi_network: {result}"[:200])
+        return errors
+
+
+def soak(proteins, count, step, warmup=10, replay=False):
+    """RSS (MB) after each of `count` proteins, cycling through `proteins`"""
+    samples = []
+    t0 = time.perf_counter()
+    for i, (label, uniprot_id) in enumerate(itertools.islice(itertools.cycle(proteins), count), 1):
+        if replay:
+            net.replay_from(os.path.join(FIXTURES, label))
+        try:
+            errors = step(uniprot_id)
+        finally:
+            net.replay_from(None)
+        settle()
+        samples.append(rss_mb())
+        if errors and i <= len(proteins):
+            for error in errors:
+                print(f"[WARN] {uniprot_id} {error}")
+        if i == warmup or i % 10 == 0 or i == count:
+            print(f"{i:5d} proteins  {samples[-1]:8.1f} MB  {time.perf_counter() - t0:7.1f} s", flush=True)
+    return samples
+
+
+def positive_int(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--proteins", help="file with one UniProt accession per line (live requests)")
+    parser.add_argument("--replay", action="store_true", help="cycle the recorded benchmark proteins offline")
+    parser.add_argument("--count", type=int, default=200, help="number of proteins to open")
+    parser.add_argument("--gui", action="store_true", help="open the real dialogs (offscreen)")
+    parser.add_argument("--warmup", type=positive_int, default=10, help="proteins before the RSS reference is taken (at least 1)")
+    parser.add_argument("--max-growth-mb", type=float, default=64.0, help="allowed RSS growth after warm-up")
+    parser.add_argument("--cache-size", type=int, default=2, help="entries kept per per-protein cache")
+    parser.add_argument("--response-cache-mb", type=float, default=32.0, help="size of the in-memory response cache")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        proteins = [(size, uniprot_id) for size, uniprot_id in PROTEINS.items()
+                    if has_fixtures(os.path.join(FIXTURES, size))]
+        if not proteins:
+            print("[SKIP] no benchmark fixtures; run benchmarks/run_benchmarks.py --record first")
+            return 0
+    elif args.proteins:
+        with open(args.proteins) as fh:
+            proteins = [(line.strip(), line.strip()) for line in fh if line.strip() and not line.startswith("#")]
+    else:
+        proteins = [(uniprot_id, uniprot_id) for uniprot_id in PROTEINS.values()]
+    if args.count <= args.warmup:
+        parser.error("--count must be larger than --warmup")
+
+    limit_caches(args.cache_size, args.response_cache_mb)
+    step = DialogSoak() if args.gui else open_analyses
+    samples = soak(proteins, args.count, step, warmup=args.warmup, replay=args.replay)
+
+    reference = samples[args.warmup - 1]
+    tail = samples[-min(10, len(samples) - args.warmup):]
+    growth = statistics.median(tail) - reference
+    print(f"RSS after warm-up {reference:.1f} MB, at the end {statistics.median(tail):.1f} MB "
+          f"(growth {growth:+.1f} MB, peak {max(samples):.1f} MB)")
+    if growth > args.max_growth_mb:
+        print(f"[LEAK] RSS grew by {growth:.1f} MB over {args.count - args.warmup} proteins "
+              f"(allowed {args.max_growth_mb:.0f} MB)")
+        return 1
+    print("RSS flat.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""
+Generate the committed benchmark fixtures for a synthetic protein.
+
+The real proteins (small / medium / large in run_benchmarks.PROTEINS) are
+recorded from the live APIs with --record; their fixtures are large and
+need network access. This script writes a small, deterministic stand-in
+instead, so the benchmark gate always has something to measure: every
+response the benchmark stages request (EBI variation, InterPro, PDBe
+best structures and SIFTS, UniProt FASTA, STRING partners, AlphaFold
+API and model, RCSB mmCIF), in the format of the real API, for a made-up
+accession.
+
+    python benchmarks/synthetic_fixtures.py      # rewrites benchmarks/fixtures/synthetic
+"""
+import io
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from Bio.PDB import MMCIFIO, PDBParser
+from Bio.PDB.Polypeptide import index_to_three, one_to_index
+
+from backend import bulk, net
+from backend.recording import FixtureStore
+
+ACCESSION = "SYNTH1"
+PDB_ID = "9zzz"
+LENGTH = 400
+VARIANTS = 2000
+STRUCTURE = (31, 290)           # UniProt range of the experimental chain
+AUTHOR_OFFSET = 1000            # experimental residue number = UniProt position + offset
+UNRESOLVED = range(120, 128)    # a loop missing from the experimental model
+DOMAINS = [("IPR900001", "Synthetic kinase domain", "domain", 40, 210),
+           ("IPR900002", "Synthetic zinc finger", "domain", 240, 280)]
+SEED = 7
+
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+
+
+def sequence(rng):
+    return "".join(rng.choice(list(AMINO_ACIDS), LENGTH))
+
+
+def variation(rng, seq):
+    """EBI proteins API variation entry"""
+    features = []
+    positions = np.concatenate([rng.integers(1, LENGTH + 1, VARIANTS - VARIANTS // 5),
+                                rng.integers(150, 180, VARIANTS // 5)])    # one hotspot
+    for i, pos in enumerate(positions):
+        pos = int(pos)
+        wild = seq[pos - 1]
+        alt = rng.choice([a for a in AMINO_ACIDS if a != wild])
+        damaging = rng.random() < (0.6 if 150 <= pos < 180 else 0.2)
+        feature = {
+            "type": "VARIANT",
+            "begin": str(pos),
+            "end": str(pos),
+            "wildType": wild,
+            "mutatedType": alt,
+            "alternativeSequence": alt,
+            "consequenceType": rng.choice(["missense", "missense", "missense", "stop gained", "frameshift"]),
+            "genomicLocation": [f"NC_000001.11:g.{1000000 + 3 * pos}{wild}>{alt}"],
+            "xrefs": [{"name": "dbSNP", "id": f"rs{900000 + i}",
+                       "url": f"https://www.ncbi.nlm.nih.gov/snp/rs{900000 + i}"}],
+            "predictions": [
+                {"predAlgorithmNameType": "PolyPhen", "sources": ["Ensembl"],
+                 "predictionValType": "probably damaging" if damaging else rng.choice(["benign", "possibly damaging"]),
+                 "score": round(float(rng.uniform(0.85, 1.0) if damaging else rng.uniform(0.0, 0.85)), 3)},
+                {"predAlgorithmNameType": "SIFT", "sources": ["Ensembl"],
+                 "predictionValType": "deleterious" if damaging else "tolerated",
+                 "score": round(float(rng.uniform(0.0, 0.05) if damaging else rng.uniform(0.05, 1.0)), 3)},
+            ],
+        }
+        if damaging and rng.random() < 0.5:
+            feature["association"] = [{"name": f"Synthetic disorder {1 + pos % 4}", "disease": True,
+                                       "description": "synthetic"}]
+        features.append(feature)
+    return {"accession": ACCESSION, "sequence": seq, "features": features}
+
+
+def interpro():
+    return {"count": len(DOMAINS), "next": None, "results": [
+        {"metadata": {"accession": acc, "name": name, "type": kind},
+         "proteins": [{"accession": ACCESSION.lower(),
+                       "entry_protein_locations": [{"fragments": [{"start": start, "end": end}]}]}]}
+        for acc, name, kind, start, end in DOMAINS]}
+
+
+def best_structures():
+    start, end = STRUCTURE
+    return {ACCESSION: [{"pdb_id": PDB_ID, "chain_id": "A", "unp_start": start, "unp_end": end,
+                         "start": start + AUTHOR_OFFSET, "end": end + AUTHOR_OFFSET,
+                         "resolution": 2.1, "experimental_method": "X-ray diffraction", "coverage": 0.65}]}
+
+
+def sifts():
+    start, end = STRUCTURE
+    return {PDB_ID: {"UniProt": {ACCESSION: {"identifier": "SYNTH1_HUMAN", "mappings": [
+        {"chain_id": "A", "struct_asym_id": "A", "unp_start": start, "unp_end": end,
+         "start": {"author_residue_number": start + AUTHOR_OFFSET, "residue_number": 1},
+         "end": {"author_residue_number": end + AUTHOR_OFFSET, "residue_number": end - start + 1}}]}}}}
+
+
+def backbone(rng, n, noise=0.0):
+    """N, CA, C coordinates along an alpha helix (3.6 residues per turn);
+    N and C lie on the CA-CA steps, so C(i)-N(i+1) is within peptide-bond
+    distance and the chain is read as one polypeptide"""
+    t = np.arange(n)
+    angle = np.deg2rad(100.0) * t
+    ca = np.stack([2.3 * np.cos(angle), 2.3 * np.sin(angle), 1.5 * t], axis=1)
+    ca += rng.normal(0.0, noise, ca.shape)
+    step = np.diff(ca, axis=0)
+    forward = np.vstack([step, step[-1:]])
+    backward = np.vstack([step[:1], step])
+    return ca - 0.38 * backward, ca, ca + 0.38 * forward
+
+
+def pdb_text(seq, first_number, coords, skip=()):
+    lines = []
+    serial = 1
+    for i, aa in enumerate(seq):
+        if first_number + i in skip:
+            continue
+        name3 = index_to_three(one_to_index(aa))
+        for atom, xyz in zip(("N", "CA", "C"), (c[i] for c in coords)):
+            lines.append("ATOM  %5d  %-3s %3s A%4d    %8.3f%8.3f%8.3f  1.00 %5.2f           %s"
+                         % (serial, atom, name3, first_number + i, *xyz, 90.0, atom[0]))
+            serial += 1
+    lines.append("END")
+    return "\n".join(lines) + "\n"
+
+
+def mmcif_text(pdb):
+    structure = PDBParser(QUIET=True).get_structure(PDB_ID, io.StringIO(pdb))
+    out = io.StringIO()
+    cif = MMCIFIO()
+    cif.set_structure(structure)
+    cif.save(out)
+    return out.getvalue()
+
+
+def string_partners(rng):
+    return [{"stringId_A": f"9606.ENSPSYN{ACCESSION}", "stringId_B": f"9606.ENSPSYN{i:05d}",
+             "preferredName_A": ACCESSION, "preferredName_B": f"SYNP{i}", "ncbiTaxonId": 9606,
+             "score": round(float(s), 3)}
+            for i, s in enumerate(sorted(rng.uniform(0.4, 0.999, bulk.STRING_PARTNERS), reverse=True), 1)]
+
+
+def responses():
+    """(public URL, status, body, content type) of every fixture"""
+    rng = np.random.default_rng(SEED)
+    seq = sequence(rng)
+    af_url = f"https://alphafold.ebi.ac.uk/files/AF-{ACCESSION}-F1-model_v4.pdb"
+    af_coords = backbone(rng, LENGTH)
+    start, end = STRUCTURE
+    exp_coords = [c[start - 1:end] for c in backbone(rng, LENGTH, noise=0.4)]
+    exp_pdb = pdb_text(seq[start - 1:end], start + AUTHOR_OFFSET, exp_coords,
+                       skip={p + AUTHOR_OFFSET for p in UNRESOLVED})
+    as_json = "application/json"
+    return [
+        (bulk.variation_url(ACCESSION), 200, json.dumps(variation(rng, seq)), as_json),
+        (net.url("ebi", f"/interpro/api/entry/interpro/protein/uniprot/{ACCESSION}/"), 200, json.dumps(interpro()), as_json),
+        (net.url("ebi", f"/pdbe/api/mappings/best_structures/{ACCESSION}"), 200, json.dumps(best_structures()), as_json),
+        (net.url("ebi", f"/pdbe/api/mappings/uniprot/{PDB_ID}"), 200, json.dumps(sifts()), as_json),
+        (bulk.uniprot_fasta_url(ACCESSION), 200,
+         f">sp|{ACCESSION}|SYNTH1_HUMAN Synthetic benchmark protein\n{seq}\n", "text/plain"),
+        (bulk.string_partners_url(ACCESSION), 200, json.dumps(string_partners(rng)), as_json),
+        (net.url("alphafold", f"/api/prediction/{ACCESSION}"), 200,
+         json.dumps([{"entryId": f"AF-{ACCESSION}-F1", "uniprotAccession": ACCESSION, "pdbUrl": af_url,
+                      "cifUrl": af_url[:-3] + "cif", "globalMetricValue": 88.5}]), as_json),
+        (af_url, 200, pdb_text(seq, 1, af_coords), "chemical/x-pdb"),
+        (net.url("rcsb", f"/download/{PDB_ID}.cif"), 200, mmcif_text(exp_pdb), "chemical/x-cif"),
+    ]
+
+
+def main(out=os.path.join(HERE, "fixtures", "synthetic")):
+    shutil.rmtree(out, ignore_errors=True)
+    store = FixtureStore(out)
+    for url, status, body, content_type in responses():
+        store.save(url, status, body.encode("utf-8"), content_type)
+    print(f"[INFO] {len(os.listdir(out))} fixtures written to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    # fixtures are keyed by the public URLs
+    for service in net.DEFAULT_BASE_URLS:
+        net.set_base_url(service, net.DEFAULT_BASE_URLS[service])
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Command-line entry point for batch work without the GUI.
+
+    python provarnet.py annotate input.vcf --proteins P04637,Q8WZ42 -o hits.tsv
+    python provarnet.py warehouse add --proteins-file my_proteins.txt
+    python provarnet.py warehouse query variants --where "PolyPhen_prediction=probably damaging"
+    python provarnet.py warehouse domains kinase
+    python provarnet.py string-index build 9606.protein.links.v12.0.txt.gz -o string9606
+    python provarnet.py features UP000005640_9606.fasta.gz -o features.tsv
+    python provarnet.py serve --port 8080 --workers 4
+"""
+import argparse
+import os
+import sys
+
+
+def _protein_list(args):
+    ids = [p.strip().upper() for p in (args.proteins or "").split(",") if p.strip()]
+    if args.proteins_file:
+        with open(args.proteins_file) as fh:
+            ids += [line.split()[0].upper() for line in fh if line.strip() and not line.startswith("#")]
+    return list(dict.fromkeys(ids))
+
+
+def cmd_annotate(args):
+    from backend import vcf_annotate
+
+    proteins = _protein_list(args)
+    if not proteins:
+        print("[ERROR] give --proteins and/or --proteins-file", file=sys.stderr)
+        return 2
+    index = vcf_annotate.load_or_build_index(proteins, args.index)
+    print(f"[INFO] {len(index)} genomic variants indexed for {len(proteins)} protein(s)", file=sys.stderr)
+
+    out = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        n_records, n_hits = vcf_annotate.annotate_vcf(args.vcf, index, out, args.chunk_lines)
+    finally:
+        if args.output:
+            out.close()
+    print(f"[INFO] {n_records} VCF records read, {n_hits} annotations written", file=sys.stderr)
+    return 0
+
+
+def _write_table(df, output):
+    df.to_csv(output or sys.stdout, sep="\t", index=False)
+    print(f"[INFO] {len(df)} rows", file=sys.stderr)
+
+
+def _where(items):
+    where = {}
+    for item in items or []:
+        col, _, value = item.partition("=")
+        values = value.split("|")
+        where[col] = values if len(values) > 1 else value
+    return where or None
+
+
+def cmd_warehouse(args):
+    from backend import warehouse
+
+    wh = warehouse.Warehouse(args.root)
+    if args.action == "add":
+        from backend import bulk, g1_protein, g3_variant
+
+        proteins = _protein_list(args)
+        bulk.prefetch(proteins, services=("variation",))
+        for i, uniprot_id in enumerate(proteins, 1):
+            try:
+                tables = g3_variant.build_variant_tables(g3_variant.fetch_variant_data(uniprot_id))
+                domains = g1_protein.fetch_domains(uniprot_id)
+            except Exception as e:
+                print(f"[INFO] Skipping {uniprot_id}: {e}", file=sys.stderr)
+                continue
+            wh.store_protein(uniprot_id, *tables, domains=domains)
+            print(f"[INFO] {i}/{len(proteins)} {uniprot_id}: {len(tables[0])} variants", file=sys.stderr)
+    elif args.action == "query":
+        columns = args.columns.split(",") if args.columns else None
+        proteins = _protein_list(args) or None
+        _write_table(wh.query(args.table, where=_where(args.where), columns=columns, proteins=proteins), args.output)
+    elif args.action == "domains":
+        _write_table(wh.variants_in_domains(args.pattern, where=_where(args.where), proteins=_protein_list(args) or None),
+                     args.output)
+    return 0
+
+
+def cmd_string_index(args):
+    import pandas as pd
+
+    from backend import string_index
+
+    if args.action == "build":
+        string_index.build(args.links, args.output, info_path=args.info, aliases_path=args.aliases)
+        return 0
+    index = string_index.StringIndex(args.index)
+    if args.action == "partners":
+        _write_table(pd.DataFrame(index.partners(args.protein, limit=args.limit, min_score=args.min_score)), args.output)
+    elif args.action == "neighborhood":
+        hops = index.k_hop(args.protein, hops=args.hops, min_score=args.min_score)
+        nodes = sorted(hops, key=lambda n: (hops[n], index.string_id(n)))
+        _write_table(pd.DataFrame({
+            "string_id": [index.string_id(n) for n in nodes],
+            "name": [index.name(n) for n in nodes],
+            "hops": [hops[n] for n in nodes],
+        }), args.output)
+    return 0
+
+
+def cmd_features(args):
+    from backend import seq_features
+
+    ids, sequences = [], []
+    for path in args.fasta:
+        more_ids, more = seq_features.read_fasta(path)
+        ids += more_ids
+        sequences += more
+    proteins = _protein_list(args)
+    if proteins:
+        from backend import bulk
+
+        records = bulk.fetch_uniprot_fasta(proteins)
+        for uniprot_id in proteins:
+            if uniprot_id not in records:
+                print(f"[INFO] Skipping {uniprot_id}: not in UniProt", file=sys.stderr)
+                continue
+            ids.append(uniprot_id)
+            sequences += seq_features.parse_fasta(records[uniprot_id])[1]
+    if not sequences:
+        print("[ERROR] give FASTA files and/or --proteins / --proteins-file", file=sys.stderr)
+        return 2
+
+    table = seq_features.features(sequences, ids)
+    if args.check:
+        diffs = seq_features.check_against_biopython(sequences, sample=args.check)
+        print("[INFO] largest difference from Biopython ProteinAnalysis: "
+              + ", ".join(f"{col} {diffs[col]:.2g}" for col in seq_features.PROPERTY_COLUMNS if col in diffs),
+              file=sys.stderr)
+    table = table.round(6).reset_index()
+    if args.no_composition:
+        table = table[["id"] + seq_features.PROPERTY_COLUMNS]
+    _write_table(table, args.output)
+    return 0
+
+
+def cmd_serve(args):
+    if args.cache_dir:
+        from backend import net
+
+        net.set_cache_dir(args.cache_dir)
+    from backend import service
+
+    server = service.AnalysisServer((args.host, args.port), workers=args.workers, queue=args.queue,
+                                    timeout=args.timeout, verbose=args.verbose)
+    print(f"[INFO] ProVarNet service on {server.base_url} "
+          f"({args.workers} workers, {args.queue} queued requests at most)", file=sys.stderr)
+    print(f"[INFO] try {server.base_url}/protein/P04637/summary, {server.base_url}/metrics", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="provarnet", description="ProVarNet batch tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("annotate", help="annotate VCF records (GRCh38) with protein-level variant data")
+    p.add_argument("vcf", help="VCF file, optionally .gz")
+    p.add_argument("--proteins", help="comma-separated UniProt accessions")
+    p.add_argument("--proteins-file", help="file with one UniProt accession per line")
+    p.add_argument("-o", "--output", help="TSV output (default: stdout)")
+    p.add_argument("--index", help="pickle file to reuse the parsed variant index between runs")
+    p.add_argument("--chunk-lines", type=int, default=200_000, help="VCF records per chunk")
+    p.set_defaults(func=cmd_annotate)
+
+    p = sub.add_parser("warehouse", help="store and query variant tables across proteins (Parquet)")
+    p.add_argument("--root", default=os.environ.get("PROVARNET_WAREHOUSE", "warehouse"),
+                   help="warehouse directory (default: $PROVARNET_WAREHOUSE or ./warehouse)")
+    wsub = p.add_subparsers(dest="action", required=True)
+    w = wsub.add_parser("add", help="fetch proteins and store their tables")
+    w.add_argument("--proteins")
+    w.add_argument("--proteins-file")
+    w = wsub.add_parser("query", help="rows of one table, filtered at read time")
+    w.add_argument("table", choices=["variants", "predictions", "disease_links", "domains"])
+    w.add_argument("--where", action="append", help="column=value (value|value for any of several); repeatable")
+    w.add_argument("--columns", help="comma-separated columns to read")
+    w.add_argument("--proteins")
+    w.add_argument("--proteins-file")
+    w.add_argument("-o", "--output")
+    w = wsub.add_parser("domains", help="variants inside domains whose name matches a pattern")
+    w.add_argument("pattern", help="case-insensitive regex on the InterPro entry name, e.g. kinase")
+    w.add_argument("--where", action="append", help="variant filter, default PolyPhen_prediction=probably damaging")
+    w.add_argument("--proteins")
+    w.add_argument("--proteins-file")
+    w.add_argument("-o", "--output")
+    p.set_defaults(func=cmd_warehouse)
+
+    p = sub.add_parser("string-index", help="local STRING interaction index for offline PPI queries")
+    isub = p.add_subparsers(dest="action", required=True)
+    w = isub.add_parser("build", help="import a STRING protein.links file")
+    w.add_argument("links", help="protein.links file, optionally .gz")
+    w.add_argument("--info", help="protein.info file (preferred names)")
+    w.add_argument("--aliases", help="protein.aliases file (UniProt accession lookup)")
+    w.add_argument("-o", "--output", required=True, help="index directory")
+    for action, help_text in (("partners", "interaction partners of a protein, best first"),
+                              ("neighborhood", "proteins within a number of links")):
+        w = isub.add_parser(action, help=help_text)
+        w.add_argument("protein", help="UniProt accession, STRING id or imported alias")
+        w.add_argument("--index", default=os.environ.get("PROVARNET_STRING_INDEX"),
+                       required="PROVARNET_STRING_INDEX" not in os.environ,
+                       help="index directory (default: $PROVARNET_STRING_INDEX)")
+        w.add_argument("--min-score", type=int, default=400, help="combined score threshold, 0..1000")
+        w.add_argument("-o", "--output")
+    isub.choices["partners"].add_argument("--limit", type=int, default=10)
+    isub.choices["neighborhood"].add_argument("--hops", type=int, default=2)
+    p.set_defaults(func=cmd_string_index)
+
+    p = sub.add_parser("features", help="composition, mass, pI, GRAVY and instability of protein sequences")
+    p.add_argument("fasta", nargs="*", help="FASTA files, optionally .gz (e.g. a UniProt proteome)")
+    p.add_argument("--proteins", help="comma-separated UniProt accessions, sequences fetched from UniProt")
+    p.add_argument("--proteins-file")
+    p.add_argument("--no-composition", action="store_true", help="leave out the 20 composition columns")
+    p.add_argument("--check", type=int, default=0, metavar="N",
+                   help="compare N sampled sequences against Biopython's ProteinAnalysis")
+    p.add_argument("-o", "--output", help="TSV output (default: stdout)")
+    p.set_defaults(func=cmd_features)
+
+    p = sub.add_parser("serve", help="serve the analyses as a JSON / PNG HTTP API")
+    p.add_argument("--host", default="127.0.0.1", help="address to listen on (0.0.0.0 for the whole network)")
+    p.add_argument("--port", type=int, default=8080)
+    p.add_argument("--workers", type=int, default=4, help="analyses running at once")
+    p.add_argument("--queue", type=int, default=32, help="analyses waiting for a worker before requests get 503")
+    p.add_argument("--timeout", type=float, default=300, help="seconds before a request gets 504 and is cancelled")
+    p.add_argument("--cache-dir", default=os.environ.get("PROVARNET_CACHE_DIR"),
+                   help="keep downloaded responses on disk (default: $PROVARNET_CACHE_DIR)")
+    p.add_argument("--verbose", action="store_true", help="log every request")
+    p.set_defaults(func=cmd_serve)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
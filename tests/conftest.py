@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the backend package is imported from the repository root, as app.py and provarnet.py do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
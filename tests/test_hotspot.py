@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy.stats import binom
+
+from backend.hotspot import PositionCounts
+
+
+def test_binned_matches_histogram():
+    rng = np.random.default_rng(0)
+    pos = rng.integers(1, 301, 500)
+    pc = PositionCounts(pos, length=300)
+    starts, counts = pc.binned(20)
+    expected, _ = np.histogram(pos, bins=np.r_[starts, 301])
+    assert (counts[0] == expected).all()
+    assert pc.range_sum(10, 19)[0] == ((pos >= 10) & (pos <= 19)).sum()
+
+
+def test_groups_and_missing_positions():
+    pc = PositionCounts([1, 2, 2, np.nan, 5], groups=[0, 1, 1, 0, 0], length=5)
+    assert pc.counts.shape == (2, 6)
+    assert pc.counts[1, 2] == 2
+    assert pc.total().sum() == 4
+
+
+def test_window_sums():
+    pc = PositionCounts([5, 5, 6, 20], length=30)
+    p, dens = pc.window(3)
+    assert dens[p == 5][0] == 3        # positions 4..6
+    assert dens[p == 20][0] == 1
+
+
+def test_uniform_spread_has_no_hotspots():
+    pc = PositionCounts(np.arange(1, 401), length=400)
+    assert pc.hotspots(width=15).empty
+
+
+def test_cluster_is_called_with_binomial_p_value():
+    rng = np.random.default_rng(1)
+    pos = np.r_[rng.integers(1, 401, 300), np.full(40, 170), np.full(40, 175)]
+    pc = PositionCounts(pos, length=400)
+    calls = pc.hotspots(width=15)
+    assert len(calls) == 1
+    row = calls.iloc[0]
+    assert row.start <= 170 and row.end >= 175
+    # the smallest p-value is the binomial tail of the best window
+    best = max(((pos >= s) & (pos < s + 15)).sum() for s in range(1, 387))
+    assert row.p_value == pytest.approx(binom.sf(best - 1, len(pos), 15 / 400))
+
+
+def test_bonferroni_over_windows():
+    # the busiest 10-residue window of 1000 holds 6 of 100 positions: p ~ 5e-4,
+    # below alpha but not below alpha / 100 windows
+    pos = np.r_[np.full(5, 500), np.linspace(1, 1000, 95).astype(int)]
+    pc = PositionCounts(pos, length=1000)
+    best = max(((pos >= s) & (pos < s + 10)).sum() for s in range(1, 992))
+    p = binom.sf(best - 1, 100, 10 / 1000)
+    assert 0.01 / 100 < p < 0.01
+    assert pc.hotspots(width=10, alpha=0.01).empty
+    assert not pc.hotspots(width=10, alpha=p * 100 * 1.01).empty
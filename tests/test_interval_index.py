@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+from scipy.stats import poisson
+
+from backend import interval_index
+from backend.interval_index import IntervalSet, ProteinIndex
+
+DOMAINS = [{"accession": "IPR1", "name": "kinase", "start": 50, "end": 149},
+           {"accession": "IPR2", "name": "zinc finger", "start": 120, "end": 180}]
+
+
+def brute_in(positions, start, end):
+    return int(((positions >= start) & (positions <= end)).sum())
+
+
+def test_interval_set_queries_match_brute_force():
+    rng = np.random.default_rng(0)
+    starts = rng.integers(1, 900, 60)
+    ends = starts + rng.integers(0, 80, 60)
+    ivs = IntervalSet(starts, ends, list(range(60)))
+    p = rng.integers(0, 1000, 500)
+    brute = ((starts[None, :] <= p[:, None]) & (ends[None, :] >= p[:, None])).sum(axis=1)
+    assert (ivs.count_containing(p) == brute).all()
+    assert sorted(ivs.containing(int(p[0]))) == sorted(np.flatnonzero((starts <= p[0]) & (ends >= p[0])).tolist())
+    covered = np.zeros(1100, dtype=bool)
+    for s, e in zip(starts, ends):
+        covered[s:e + 1] = True
+    assert ivs.total_length() == covered.sum()
+
+
+def test_merged_joins_touching_intervals():
+    m = IntervalSet([1, 11, 30], [10, 20, 40]).merged()
+    assert m.starts.tolist() == [1, 30] and m.ends.tolist() == [20, 40]
+
+
+def test_protein_index_ranges_and_coverage():
+    rng = np.random.default_rng(1)
+    positions = rng.integers(1, 400, 300).astype(float)
+    positions[::17] = np.nan
+    idx = ProteinIndex(positions, length=400, domains=DOMAINS, coverage=[(100, 200), (190, 250)])
+    valid = positions[~np.isnan(positions)]
+    assert idx.count_in_range(100, 150) == brute_in(valid, 100, 150)
+    rows = idx.variants_in_range(100, 150)
+    assert sorted(positions[rows].tolist()) == sorted(valid[(valid >= 100) & (valid <= 150)].tolist())
+    assert idx.variants_per_domain().tolist() == [brute_in(valid, 50, 149), brute_in(valid, 120, 180)]
+    assert idx.covered([99, 100, 250, 251]).tolist() == [False, True, True, False]
+    assert idx.covered_fraction() == pytest.approx(brute_in(valid, 100, 250) / len(valid))
+
+
+def test_domain_enrichment_uses_sequence_length():
+    positions = np.r_[np.full(30, 60), np.arange(1, 1001, 10)]
+    idx = ProteinIndex(positions, length=1000, domains=DOMAINS)
+    table = idx.domain_enrichment().set_index("accession")
+    observed = brute_in(positions, 50, 149)
+    expected = len(positions) * 100 / 1000
+    assert table.loc["IPR1", "variants"] == observed
+    assert table.loc["IPR1", "expected"] == pytest.approx(expected)
+    assert table.loc["IPR1", "p_value"] == pytest.approx(poisson.sf(observed - 1, expected))
+
+
+def test_protein_index_is_cached_per_length(monkeypatch):
+    from backend import g1_protein, g1_structure
+
+    monkeypatch.setattr(g1_protein, "fetch_domains", lambda uniprot_id: DOMAINS)
+    monkeypatch.setattr(g1_structure, "structure_coverage", lambda uniprot_id: [(100, 200)])
+    interval_index.clear_caches()
+    df = pd.DataFrame({"begin": ["60", "70", "300"]})
+    short = interval_index.protein_index("p00001", df)
+    assert interval_index.protein_index("P00001", df) is short
+    full = interval_index.protein_index("P00001", df, length=1000)
+    assert full is not short
+    assert short.length == 300 and full.length == 1000
+    interval_index.clear_caches()
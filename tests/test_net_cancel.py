@@ -0,0 +1,77 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend import cancel, net
+
+CHUNK = 64 * 1024
+CHUNKS = 32
+BODY = bytes(range(256)) * (CHUNK * CHUNKS // 256)
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Serves BODY in chunks, pausing after the first one so a cancel lands
+    while the client is blocked reading; /short stops halfway"""
+    started = threading.Event()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        chunks = CHUNKS // 2 if self.path == "/short" else CHUNKS
+        try:
+            for i in range(chunks):
+                self.wfile.write(BODY[i * CHUNK:(i + 1) * CHUNK])
+                self.wfile.flush()
+                if i == 0:
+                    SlowHandler.started.set()
+                    time.sleep(0.3)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    net.clear_cache()
+    previous_disk = net._disk_cache
+    net.set_cache_dir(None)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    net._disk_cache = previous_disk
+    net.clear_cache()
+
+
+def test_cancel_mid_stream_then_read_again(server):
+    url = server + "/body"
+    token = cancel.CancelToken()
+    SlowHandler.started.clear()
+    canceller = threading.Thread(target=lambda: SlowHandler.started.wait(5) and token.cancel())
+    canceller.start()
+    with cancel.scope(token), pytest.raises(cancel.Cancelled):
+        net.get(url, timeout=10)
+    canceller.join()
+    assert net.cached(url) is None
+
+    r = net.get(url, timeout=10)
+    assert r.content == BODY
+    assert net.cached(url)[1] == BODY
+
+
+def test_short_body_is_not_cached(server):
+    url = server + "/short"
+    with cancel.scope(cancel.CancelToken()):
+        with pytest.raises(requests.exceptions.RequestException):
+            net.get(url, timeout=10)
+    assert net.cached(url) is None
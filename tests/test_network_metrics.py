@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+nx = pytest.importorskip("networkx")
+
+from backend import network_metrics
+from backend.network_metrics import (Neighborhood, betweenness, hop_distances, label_propagation,
+                                     modularity, pagerank)
+
+
+def graph(seed=0):
+    """Karate club with random scores, a separate triangle and an isolated node"""
+    rng = np.random.default_rng(seed)
+    g = nx.karate_club_graph()
+    for a, b in g.edges:
+        g[a][b]["weight"] = float(rng.uniform(0.4, 1.0))
+    g.add_weighted_edges_from([(34, 35, 0.9), (35, 36, 0.8), (34, 36, 0.7)])
+    g.add_node(37)
+    return g
+
+
+def neighborhood(g):
+    edges = list(g.edges(data="weight"))
+    # each link once, in either direction, as a STRING subgraph gives them
+    src = [a if i % 2 else b for i, (a, b, _) in enumerate(edges)]
+    dst = [b if i % 2 else a for i, (a, b, _) in enumerate(edges)]
+    n = g.number_of_nodes()
+    return Neighborhood([f"9606.P{i}" for i in range(n)], [f"P{i}" for i in range(n)],
+                        src, dst, [w for _, _, w in edges])
+
+
+def as_array(values, n):
+    return np.array([values[i] for i in range(n)])
+
+
+def test_adjacency_is_symmetric():
+    g = graph()
+    nb = neighborhood(g)
+    assert len(nb) == 38 and nb.n_edges == g.number_of_edges()
+    assert (nb.adjacency != nb.adjacency.T).nnz == 0
+    assert np.diff(nb.adjacency.indptr).tolist() == [g.degree(i) for i in range(38)]
+
+
+def test_pagerank_matches_networkx():
+    g = graph()
+    expected = as_array(nx.pagerank(g, weight="weight", tol=1e-12), 38)
+    assert pagerank(neighborhood(g).adjacency) == pytest.approx(expected, abs=1e-8)
+
+
+def test_betweenness_matches_networkx():
+    g = graph()
+    a = neighborhood(g).adjacency
+    expected = as_array(nx.betweenness_centrality(g), 38)
+    assert betweenness(a, batch=7) == pytest.approx(expected, abs=1e-12)
+    # sampled: an unbiased estimate, close on average
+    assert betweenness(a, samples=30).mean() == pytest.approx(expected.mean(), rel=0.25)
+
+
+def test_hop_distances_match_networkx():
+    g = graph()
+    expected = nx.single_source_shortest_path_length(g, 0)
+    assert hop_distances(neighborhood(g).adjacency, 0).tolist() == [expected.get(i, -1) for i in range(38)]
+
+
+def test_communities_and_modularity():
+    g = graph()
+    a = neighborhood(g).adjacency
+    labels = label_propagation(a)
+    communities = [set(np.flatnonzero(labels == c).tolist()) for c in range(labels.max() + 1)]
+    sizes = [len(c) for c in communities]
+    assert sizes == sorted(sizes, reverse=True)
+    assert {34, 35, 36} in communities and {37} in communities
+    assert modularity(a, labels) == pytest.approx(nx.community.modularity(g, communities, weight="weight"))
+    assert modularity(a, labels) > 0.3
+
+
+def test_network_metrics_table_is_cached(monkeypatch):
+    calls = []
+
+    def fake_neighborhood(uniprot_id, hops, min_score):
+        calls.append((uniprot_id, hops, min_score))
+        return neighborhood(graph())
+
+    monkeypatch.setattr(network_metrics, "neighborhood", fake_neighborhood)
+    network_metrics.clear_caches()
+    table, summary = network_metrics.network_metrics(" p00001", hops=2, min_score=700)
+    again, _ = network_metrics.network_metrics("P00001", hops=2, min_score=700)
+    assert again is table and calls == [("P00001", 2, 700)]
+    assert table["pagerank"].is_monotonic_decreasing and table["rank"].tolist() == list(range(1, 39))
+    assert summary["nodes"] == 38 and summary["edges"] == graph().number_of_edges()
+    assert not summary["betweenness_sampled"]
+    partners, _ = network_metrics.partner_table("P00001", hops=2, min_score=700)
+    assert "P0" not in set(partners["name"]) and len(partners) == 37
+    network_metrics.clear_caches()
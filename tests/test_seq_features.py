@@ -0,0 +1,60 @@
+import gzip
+
+import numpy as np
+import pytest
+
+pytest.importorskip("Bio")
+
+from Bio.SeqUtils.ProtParam import ProteinAnalysis
+
+from backend import seq_features
+from backend.seq_features import AMINO_ACIDS
+
+P53 = "MEEPQSDPSVEPPLSQETFSDLWKLLPENNVLSPLPSQAMDDLMLSPDDIEQWFTEDPGPDEAPRMPEAAPPVAPAPAAPTPAAPAPAPSWPLSSSVPSQKTYQGSYGFRLGFLHSGTAKSVTCTYSPALNKMFCQLAKTCPVQLWVDSTPPPGTRVRAMAIYKQSQHMTEVVRRCPHHERCSDSDGLAPPQHLIRVEGNLRVEYLDDRNTFRHSVVVPYEPPEVGSDCTTIHYNYMCNSSCMGGMNRRPILTIITLEDSSGNLLGRNSFEVRVCACPGRDRRTEEENLRKKGEPHHELPPGSTKRALPNNT"
+
+
+def random_sequences(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return ["".join(rng.choice(list(AMINO_ACIDS), rng.integers(1, 300))) for _ in range(n)]
+
+
+def test_features_match_protein_analysis():
+    sequences = [P53, "K", "DE", "ACDEFGHIKLMNPQRSTVWY"] + random_sequences(40)
+    table = seq_features.features(sequences)
+    for s, row in zip(sequences, table.itertuples()):
+        pa = ProteinAnalysis(s)
+        assert row.length == len(s) and row.nonstandard == 0
+        assert row.molecular_weight == pytest.approx(pa.molecular_weight(), abs=1e-6)
+        assert row.isoelectric_point == pytest.approx(pa.isoelectric_point(), abs=1e-9)
+        assert row.gravy == pytest.approx(pa.gravy(), abs=1e-9)
+        if len(s) > 1:
+            assert row.instability_index == pytest.approx(pa.instability_index(), abs=1e-9)
+        counts = pa.count_amino_acids()
+        assert [getattr(row, aa) for aa in AMINO_ACIDS] == pytest.approx([counts[aa] / len(s) for aa in AMINO_ACIDS])
+
+
+def test_check_against_biopython_samples():
+    worst = seq_features.check_against_biopython(random_sequences(50, seed=1) + ["MXU", ""], sample=20)
+    assert (worst < 1e-6).all()
+
+
+def test_nonstandard_residues_are_left_out_of_the_sums():
+    mixed = seq_features.sequence_features("acdXXkU")
+    clean = seq_features.sequence_features("ACDK")
+    assert mixed["length"] == 7 and mixed["nonstandard"] == 3
+    assert mixed["molecular_weight"] == pytest.approx(clean["molecular_weight"])
+    assert mixed["gravy"] == pytest.approx(clean["gravy"])
+    assert mixed["A"] == pytest.approx(1 / 7)
+    empty = seq_features.features(["", "XXX"], ids=["e", "x"])
+    assert empty.loc["e", "length"] == 0 and np.isnan(empty.loc["e", "isoelectric_point"])
+    assert np.isnan(empty.loc["x", "molecular_weight"])
+
+
+def test_fasta_features(tmp_path):
+    path = tmp_path / "proteome.fasta.gz"
+    with gzip.open(path, "wt") as fh:
+        fh.write(f">sp|P04637|P53_HUMAN Cellular tumor antigen p53\n{P53[:60]}\n{P53[60:]}\n"
+                 ">custom_1 made up\nMKV\n")
+    table = seq_features.fasta_features(str(path))
+    assert table.index.tolist() == ["P04637", "custom_1"]
+    assert table["length"].tolist() == [len(P53), 3]
@@ -0,0 +1,12 @@
+import json
+
+import numpy as np
+
+from backend import service
+
+
+def test_to_json_writes_nan_as_null():
+    body = service.to_json({"score": float("nan"), "rmsd": np.float32("nan"), "rows": [{"pos": np.int64(3), "x": np.inf}],
+                            "values": np.array([1.5, np.nan])})
+    assert b"NaN" not in body and b"Infinity" not in body
+    assert json.loads(body) == {"score": None, "rmsd": None, "rows": [{"pos": 3, "x": None}], "values": [1.5, None]}
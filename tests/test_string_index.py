@@ -0,0 +1,104 @@
+import gzip
+from collections import deque
+
+import numpy as np
+import pytest
+
+from backend import string_index
+
+# undirected links; STRING files list every link in both directions
+LINKS = [("A", "B", 900), ("A", "C", 500), ("A", "D", 300), ("B", "C", 800),
+         ("C", "E", 450), ("E", "F", 999), ("F", "G", 150), ("H", "I", 700)]
+
+
+def sid(name):
+    return f"9606.ENSP{name}"
+
+
+@pytest.fixture(params=[1000, 3])
+def index(request, tmp_path):
+    links = tmp_path / "9606.protein.links.txt.gz"
+    with gzip.open(links, "wt") as fh:
+        fh.write("protein1 protein2 combined_score\n")
+        for a, b, score in LINKS:
+            fh.write(f"{sid(a)} {sid(b)} {score}\n{sid(b)} {sid(a)} {score}\n")
+    info = tmp_path / "9606.protein.info.txt"
+    info.write_text("#string_protein_id\tpreferred_name\tprotein_size\n"
+                    + "".join(f"{sid(n)}\tGENE{n}\t100\n" for n in "ABCDEFGHI"))
+    aliases = tmp_path / "9606.protein.aliases.txt"
+    aliases.write_text("#string_protein_id\talias\tsource\n"
+                       f"{sid('A')}\tP0000A\tUniProt_AC\n"
+                       f"{sid('B')}\tb_human\tUniProt_ID\n"
+                       f"{sid('C')}\tsomething\tBLAST_KEGG_NAME\n")
+    return string_index.build(str(links), str(tmp_path / "index"), info_path=str(info),
+                              aliases_path=str(aliases), chunk_lines=request.param)
+
+
+def adjacency(min_score):
+    adj = {}
+    for a, b, score in LINKS:
+        if score >= min_score:
+            adj.setdefault(a, set()).add(b)
+            adj.setdefault(b, set()).add(a)
+    return adj
+
+
+def bfs(start, hops, min_score):
+    adj, dist, queue = adjacency(min_score), {start: 0}, deque([start])
+    while queue:
+        n = queue.popleft()
+        if dist[n] == hops:
+            continue
+        for m in adj.get(n, ()):
+            if m not in dist:
+                dist[m] = dist[n] + 1
+                queue.append(m)
+    return dist
+
+
+def test_rows_are_sorted_by_score(index):
+    assert len(index) == 9 and index.n_edges == 2 * len(LINKS)
+    nbrs, scores = index.neighbors(index.node(sid("A")))
+    assert [index.name(n) for n in nbrs] == ["GENEB", "GENEC", "GENED"]
+    assert scores.tolist() == [900, 500, 300]
+    nbrs, scores = index.neighbors(index.node(sid("A")), min_score=500, limit=5)
+    assert scores.tolist() == [900, 500]
+    assert index.neighbors(index.node(sid("A")), limit=1)[1].tolist() == [900]
+
+
+def test_node_lookup_by_id_species_and_alias(index):
+    a = index.node(sid("A"))
+    assert index.node("ENSPA", species=9606) == a
+    assert index.node("p0000a") == a
+    assert index.node("B_HUMAN") == index.node(sid("B"))
+    with pytest.raises(KeyError):
+        index.node("SOMETHING")           # alias source not imported
+    with pytest.raises(KeyError):
+        index.node("P99999")
+
+
+def test_partners_match_the_string_api_records(index):
+    records = index.partners("P0000A", min_score=400)
+    assert [(r["preferredName_B"], r["score"]) for r in records] == [("GENEB", 0.9), ("GENEC", 0.5)]
+    assert records[0]["stringId_A"] == sid("A") and records[0]["ncbiTaxonId"] == "9606"
+
+
+@pytest.mark.parametrize("start, hops, min_score", [("A", 1, 0), ("A", 2, 400), ("A", 3, 400),
+                                                    ("D", 4, 0), ("H", 2, 400), ("G", 2, 400)])
+def test_k_hop_matches_bfs(index, start, hops, min_score):
+    got = index.k_hop(sid(start), hops=hops, min_score=min_score)
+    assert {index.string_id(n): d for n, d in got.items()} == {
+        sid(n): d for n, d in bfs(start, hops, min_score).items()}
+
+
+def test_subgraph_and_degree(index):
+    members = [index.node(sid(n)) for n in "ABCE"]
+    src, dst, sc = index.subgraph(members, min_score=450)
+    links = {frozenset((index.string_id(a), index.string_id(b))): s
+             for a, b, s in zip(src.tolist(), dst.tolist(), sc.tolist())}
+    assert links == {frozenset((sid(a), sid(b))): s for a, b, s in LINKS
+                     if a in "ABCE" and b in "ABCE" and s >= 450}
+    degree = dict(zip(index.nodes, index.degree(min_score=500).tolist()))
+    assert degree == {sid(n).encode(): len(adjacency(500).get(n, ())) for n in "ABCDEFGHI"}
+    assert index.degree().sum() == index.n_edges
+    assert np.all(index.degree(min_score=1001) == 0)
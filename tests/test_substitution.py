@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from backend import substitution
+
+# Grantham (1974), Table 2
+PUBLISHED = [
+    ("R", "S", 110), ("C", "W", 215), ("A", "R", 112), ("L", "I", 5), ("D", "W", 181),
+    ("S", "N", 46), ("F", "Y", 22), ("M", "W", 67), ("C", "F", 205), ("D", "E", 45),
+]
+
+
+@pytest.mark.parametrize("a, b, distance", PUBLISHED)
+def test_grantham_published_values(a, b, distance):
+    i, j = substitution.AMINO_ACIDS.index(a), substitution.AMINO_ACIDS.index(b)
+    grantham = substitution.tables()["Grantham"]
+    assert grantham[i, j] == distance
+    assert grantham[j, i] == distance
+
+
+def test_grantham_matrix_shape():
+    grantham = substitution.grantham_matrix()
+    assert grantham.shape == (20, 20)
+    assert (np.diag(grantham) == 0).all()
+    assert (grantham == grantham.T).all()
+    assert grantham.max() == 215
+
+
+def test_score_uses_published_distance():
+    scores = substitution.score(["R", "c", "A", "*"], ["S", "W", "AV", "G"])
+    assert scores["Grantham"][:2].tolist() == [110, 215]
+    assert np.isnan(scores["Grantham"][2:]).all()
@@ -0,0 +1,83 @@
+import gzip
+import io
+
+import pandas as pd
+import pytest
+
+from backend import bulk, g3_variant, vcf_annotate
+
+
+def variant(pos, wild, alt, locations, polyphen=None, disease=None):
+    feature = {"type": "VARIANT", "begin": str(pos), "end": str(pos), "wildType": wild,
+               "mutatedType": alt, "alternativeSequence": alt, "consequenceType": "missense",
+               "genomicLocation": locations, "xrefs": [{"id": f"rs{pos}"}], "predictions": []}
+    if polyphen is not None:
+        feature["predictions"].append({"predAlgorithmNameType": "PolyPhen", "score": polyphen,
+                                       "predictionValType": "probably damaging"})
+    if disease:
+        feature["association"] = [{"name": disease, "disease": True}]
+    return feature
+
+
+VARIANTS = [
+    variant(175, "R", "H", ["NC_000017.11:g.7675088C>T", "NC_000017.10:g.7578406C>T"], 0.99, "Li-Fraumeni syndrome"),
+    variant(248, "R", "Q", ["NC_000017.11:g.7674220C>T"], 0.98),
+    variant(72, "P", "R", ["NC_000017.11:g.7676154G>C"]),
+    variant(10, "E", "X", ["NC_000017.11:g.7676500_7676502del"]),    # not an SNV
+]
+
+VCF = """##fileformat=VCFv4.2
+#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO
+chr17\t7675088\t.\tC\tT\t.\tPASS\t.
+17\t7674220\t.\tc\tA,T\t.\tPASS\t.
+chr17\t7578406\t.\tC\tT\t.\tPASS\t.
+chr17\t7676154\t.\tG\tC\t.\tPASS\t.
+chr1\t1000\t.\tA\tG\t.\tPASS\t.
+"""
+
+
+@pytest.fixture
+def index(monkeypatch):
+    monkeypatch.setattr(bulk, "prefetch", lambda *args, **kwargs: None)
+    monkeypatch.setattr(g3_variant, "fetch_variant_data", lambda uniprot_id: VARIANTS)
+    return vcf_annotate.build_index(["P04637"])
+
+
+def test_parse_genomic_locations_keeps_grch38_snvs():
+    loc = vcf_annotate.parse_genomic_locations(pd.Series([
+        "NC_000017.11:g.7675088C>T", "NC_000017.10:g.7578406C>T", "NC_000023.11:g.100A>G",
+        "NC_000017.11:g.7676500_7676502del"], dtype="string"))
+    assert loc.iloc[0].tolist() == ["17", "7675088", "C", "T"]
+    assert loc.iloc[1].isna().all()                  # GRCh37 accession version
+    assert loc.iloc[2]["chrom"] == "X"
+    assert loc.iloc[3].isna().all()
+
+
+def test_index_keys(index):
+    assert sorted(index.index) == ["17:7674220:C:T", "17:7675088:C:T", "17:7676154:G:C"]
+    row = index.loc["17:7675088:C:T"]
+    assert (row["uniprot"], row["position"], row["wild_type"], row["mutant"]) == ("P04637", 175, "R", "H")
+    assert row["PolyPhen_score"] == pytest.approx(0.99)
+    assert row["disease"] == "Li-Fraumeni syndrome"
+
+
+@pytest.mark.parametrize("chunk_lines", [1, 2, 1000])
+def test_annotate_gzipped_vcf_in_chunks(index, tmp_path, chunk_lines):
+    path = tmp_path / "cohort.vcf.gz"
+    with gzip.open(path, "wt") as fh:
+        fh.write(VCF)
+    out = io.StringIO()
+    n_records, n_hits = vcf_annotate.annotate_vcf(str(path), index, out, chunk_lines=chunk_lines)
+    hits = pd.read_csv(io.StringIO(out.getvalue()), sep="\t", dtype=str)
+    assert (n_records, n_hits) == (5, 3)
+    assert hits[["POS", "ALT", "position"]].values.tolist() == [
+        ["7675088", "T", "175"], ["7674220", "T", "248"], ["7676154", "C", "72"]]
+    assert list(hits.columns) == ["CHROM", "POS", "REF", "ALT"] + vcf_annotate.ANNOTATION_COLUMNS
+
+
+def test_no_hits_still_writes_header(index, tmp_path):
+    path = tmp_path / "empty.vcf"
+    path.write_text("#CHROM\tPOS\tID\tREF\tALT\n1\t5\t.\tA\tG\n")
+    out = io.StringIO()
+    assert vcf_annotate.annotate_vcf(str(path), index, out) == (1, 0)
+    assert out.getvalue().split("\t")[:4] == ["CHROM", "POS", "REF", "ALT"]
@@ -0,0 +1,83 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from backend.warehouse import Warehouse
+
+
+def variants(n, offset=0, damaging_every=3):
+    return pd.DataFrame({
+        "variant_id": [f"rs{offset + i}" for i in range(n)],
+        "begin": [str(10 * (i + 1)) for i in range(n)],
+        "wild_type": ["A"] * n,
+        "mutatedType": ["V"] * n,
+        "PolyPhen_prediction": ["probably damaging" if i % damaging_every == 0 else "benign" for i in range(n)],
+        "PolyPhen_score": [0.9 if i % damaging_every == 0 else 0.1 for i in range(n)],
+        "DiseaseList": ["Syndrome" if i == 0 else None for i in range(n)],
+    })
+
+
+@pytest.fixture
+def wh(tmp_path):
+    w = Warehouse(str(tmp_path))
+    w.store_protein("p00001", variants(30), domains=[
+        {"accession": "IPR1", "name": "Protein kinase domain", "type": "domain", "start": 1, "end": 100}])
+    w.store_protein("P00002", variants(20, offset=100), domains=[
+        {"accession": "IPR2", "name": "Zinc finger", "type": "domain", "start": 1, "end": 200}])
+    return w
+
+
+def test_round_trip(wh):
+    assert wh.proteins() == ["P00001", "P00002"]
+    df = wh.query("variants", proteins=["P00001"]).sort_values("begin")
+    expected = variants(30)
+    assert len(df) == 30
+    assert set(df["variant_id"]) == set(expected["variant_id"])
+    assert df["begin"].tolist() == sorted(10 * (i + 1) for i in range(30))       # stored as integers
+    assert isinstance(df["PolyPhen_prediction"].dtype, pd.CategoricalDtype)
+    assert (df["uniprot"] == "P00001").all()
+
+
+def test_filters_are_pushed_down(wh):
+    df = wh.query("variants", where={"PolyPhen_prediction": "probably damaging"}, columns=["uniprot", "begin"])
+    assert list(df.columns) == ["uniprot", "begin"]
+    assert len(df) == 10 + 7
+    assert sorted(wh.query("variants", where={"variant_id": ["rs0", "rs100", "rs999"]})["variant_id"]) == ["rs0", "rs100"]
+
+
+def test_store_replaces_partition(wh, tmp_path):
+    wh.store_protein("P00001", variants(5))
+    assert len(wh.query("variants", proteins=["P00001"])) == 5
+    leftovers = [n for n in os.listdir(tmp_path / "variants") if n.startswith(".")]
+    assert leftovers == []
+
+
+def test_variants_in_domains(wh):
+    hits = wh.variants_in_domains("kinase")
+    # damaging variants of P00001 at positions 10..100
+    assert set(hits["uniprot"]) == {"P00001"}
+    assert sorted(hits["begin"]) == [10, 40, 70, 100]
+    assert set(hits["domain"]) == {"IPR1"}
+
+
+def test_concurrent_writers_of_one_protein(wh):
+    errors = []
+
+    def write(n):
+        try:
+            for _ in range(5):
+                wh.write("variants", "P00001", variants(n))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in (3, 4, 6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(wh.query("variants", proteins=["P00001"])) in (3, 4, 6)
@@ -0,0 +1,437 @@
+"""
+Shared 3D structure viewer.
+
+One QWebEngineView (and profile) is created once, pre-warmed in the
+background and re-parented into each AlphaFold dialog. The page and
+3Dmol.js are served from the local provarnet:// scheme, so the viewer
+works without network access; new models are pushed into the live page
+through JavaScript instead of reloading it.
+
+Large models are drawn with an automatic level of detail chosen from the
+residue count (full cartoon, CA trace, or CA spheres); clicking a residue
+shows full cartoon for its neighbourhood, and set_detail() forces a level.
+
+Per-residue data (e.g. variant density) is drawn by binning the values into
+a few colours with color_batches() and sending one selection per colour,
+so the cost does not grow with the number of variants.
+
+Structure files never go through HTML or JavaScript source: they are kept
+gzip-compressed in a small LRU store and the page downloads them from
+provarnet://structures/<key>, so there is no size limit and no extra
+escaped copies of large models (PDB, mmCIF or BinaryCIF).
+
+3Dmol.js is served from assets/3Dmol-min.js when that file exists; fetch
+the pinned build for offline use with
+
+    python viewer.py --bundle-assets
+
+Without it, provarnet://assets/3Dmol-min.js redirects to the same build
+on the jsDelivr CDN.
+"""
+import gzip
+import json
+import os
+import sys
+from collections import OrderedDict
+from urllib.parse import quote, unquote
+
+import numpy as np
+from PyQt5.QtCore import QBuffer, QIODevice, QObject
+
+SCHEME = b"provarnet"
+HERE = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIR = os.path.join(HERE, "assets")
+THREEDMOL_VERSION = "2.5.3"
+THREEDMOL_URL = f"https://cdn.jsdelivr.net/npm/3dmol@{THREEDMOL_VERSION}/build/3Dmol-min.js"
+
+STRUCTURE_CACHE_SIZE = 8      # structures kept for re-opened dialogs
+
+# Level of detail by residue count (tuned for interactive frame rates)
+LOD_FULL_MAX_RESIDUES = 1500   # full cartoon up to here
+LOD_TRACE_MAX_RESIDUES = 6000  # CA trace tube up to here, CA spheres beyond
+LOD_FOCUS_RADIUS = 12.0        # Å around a clicked residue drawn in full
+DETAIL_LEVELS = ("auto", "full", "trace", "coarse")
+
+VARIANT_COLOR_BINS = 8         # colour batches (one setStyle call each)
+VARIANT_BASE_COLOR = "#d9d9d9" # residues without a value
+
+MIME_TYPES = {
+    ".js": b"text/javascript",
+    ".html": b"text/html",
+    ".css": b"text/css",
+}
+
+VIEWER_HTML = """<!DOCTYPE html>
+<html><head><meta charset="utf-8">
+<style>
+  html, body { margin: 0; height: 100%; overflow: hidden; background: white; }
+  #viewer { width: 100%; height: 100%; position: relative; }
+  #status { font-family: 'Segoe UI', sans-serif; color: #555; padding: 12px; }
+</style>
+<script src="provarnet://assets/3Dmol-min.js"></script>
+</head>
+<body>
+<div id="viewer"></div>
+<script>
+var viewer = null;
+var pv = {
+  ready: false,
+  detail: 'auto',
+  fullMax: 1500,
+  traceMax: 6000,
+  focusRadius: 12.0,
+  nres: 0,
+  minResi: 1,
+  maxResi: 1,
+  tier: null,
+  batches: null,
+  baseColor: '#d9d9d9',
+
+  load: function(data, format, opts) {
+    Object.assign(pv, opts || {});
+    pv.batches = null;
+    viewer.clear();
+    var model = viewer.addModel(data, format);
+    var cas = model.selectedAtoms({atom: 'CA'});
+    pv.nres = cas.length;
+    pv.minResi = cas.reduce(function(m, a) { return Math.min(m, a.resi); }, Infinity);
+    pv.maxResi = cas.reduce(function(m, a) { return Math.max(m, a.resi); }, -Infinity);
+    if (!cas.length) { pv.minResi = 1; pv.maxResi = 1; }
+    viewer.setClickable({}, true, function(atom) { pv.focus(atom); });
+    pv.applyStyle();
+    viewer.zoomTo();
+    viewer.render();
+  },
+  colors: function() {
+    return {prop: 'resi', gradient: 'roygb', min: pv.minResi, max: pv.maxResi};
+  },
+  chooseTier: function() {
+    if (pv.detail !== 'auto') return pv.detail;
+    if (pv.nres <= pv.fullMax) return 'full';
+    return pv.nres <= pv.traceMax ? 'trace' : 'coarse';
+  },
+  // style for the current tier; color null means the default rainbow
+  styleFor: function(color, tier) {
+    var c = color ? {color: color} : {colorscheme: pv.colors()};
+    if (tier === 'full') return {cartoon: c};
+    if (tier === 'trace') return {cartoon: Object.assign({style: 'trace', thickness: 0.4}, c)};
+    return {sphere: Object.assign({radius: 1.0}, c)};
+  },
+  // one setStyle per colour batch, not per residue
+  paint: function(sel, tier) {
+    if (tier === 'coarse') sel = Object.assign({atom: 'CA'}, sel);
+    if (!pv.batches) { viewer.setStyle(sel, pv.styleFor(null, tier)); return; }
+    viewer.setStyle(sel, pv.styleFor(pv.baseColor, tier));
+    pv.batches.forEach(function(b) {
+      viewer.setStyle(Object.assign({resi: b.resi}, sel), pv.styleFor(b.color, tier));
+    });
+  },
+  applyStyle: function() {
+    pv.tier = pv.chooseTier();
+    viewer.setStyle({}, {});
+    pv.paint({}, pv.tier);
+    viewer.render();
+  },
+  colorResidues: function(batches, baseColor) {
+    pv.batches = batches && batches.length ? batches : null;
+    if (baseColor) pv.baseColor = baseColor;
+    pv.applyStyle();
+  },
+  setDetail: function(level) {
+    pv.detail = level;
+    pv.applyStyle();
+  },
+  // full cartoon only around the residue the user clicked
+  focus: function(atom) {
+    if (pv.tier === 'full') return;
+    pv.applyStyle();
+    pv.paint({within: {distance: pv.focusRadius, sel: {chain: atom.chain, resi: atom.resi}}, byres: true}, 'full');
+    viewer.render();
+  },
+  // structures arrive gzip-compressed unless the engine cannot inflate them
+  loadUrl: function(url, format, opts) {
+    var gz = typeof DecompressionStream !== 'undefined';
+    var binary = format === 'bcif' || format === 'mmtf';
+    var xhr = new XMLHttpRequest();
+    xhr.open('GET', gz ? url : url + '?raw=1');
+    xhr.responseType = 'arraybuffer';
+    xhr.onload = function() {
+      var body = new Response(xhr.response);
+      if (gz) body = new Response(new Blob([xhr.response]).stream().pipeThrough(new DecompressionStream('gzip')));
+      (binary ? body.arrayBuffer() : body.text()).then(function(data) {
+        pv.load(binary ? new Uint8Array(data) : data, format, opts);
+      });
+    };
+    xhr.send();
+  }
+};
+window.addEventListener('load', function() {
+  if (typeof $3Dmol === 'undefined') {
+    pv.failed = true;
+    document.body.innerHTML = '<p id="status">3Dmol.js could not be loaded: no local copy and the CDN is unreachable. ' +
+                              'Run "python viewer.py --bundle-assets" once with network access.</p>';
+    return;
+  }
+  viewer = $3Dmol.createViewer(document.getElementById('viewer'), {backgroundColor: 'white'});
+  pv.ready = true;
+});
+</script>
+</body></html>
+"""
+
+
+def register_scheme():
+    """Must run before the QApplication is created"""
+    from PyQt5.QtWebEngineCore import QWebEngineUrlScheme
+
+    scheme = QWebEngineUrlScheme(SCHEME)
+    scheme.setSyntax(QWebEngineUrlScheme.Syntax.Host)
+    scheme.setFlags(QWebEngineUrlScheme.SecureScheme
+                    | QWebEngineUrlScheme.LocalAccessAllowed
+                    | QWebEngineUrlScheme.CorsEnabled)
+    QWebEngineUrlScheme.registerScheme(scheme)
+
+
+def bundle_3dmol(dest=ASSET_DIR):
+    """Download the pinned 3Dmol.js build into the assets directory"""
+    import requests
+
+    r = requests.get(THREEDMOL_URL, timeout=60)
+    r.raise_for_status()
+    os.makedirs(dest, exist_ok=True)
+    path = os.path.join(dest, "3Dmol-min.js")
+    with open(path, "wb") as fh:
+        fh.write(r.content)
+    return path
+
+
+class StructureStore:
+    """gzip-compressed structure files by key, least recently used evicted first"""
+
+    def __init__(self, capacity=STRUCTURE_CACHE_SIZE):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def put(self, key, data, fmt):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._items[key] = (gzip.compress(data, compresslevel=5), fmt)
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def get(self, key, raw=False):
+        if key not in self._items:
+            return None
+        self._items.move_to_end(key)
+        data, _ = self._items[key]
+        return gzip.decompress(data) if raw else data
+
+
+def model_residues(pdb_text, chain=None):
+    """Residue numbers with a CA atom in a PDB file (first chain unless given)"""
+    resi = []
+    for line in pdb_text.splitlines():
+        if line.startswith("ATOM") and line[12:16].strip() == "CA":
+            if chain is None:
+                chain = line[21]
+            if line[21] == chain:
+                resi.append(int(line[22:26]))
+        elif line.startswith("ENDMDL"):
+            break
+    return np.asarray(resi, dtype=np.int64)
+
+
+def residue_index(positions, resi, size=None):
+    """Lookup array position -> structure residue number (-1 where unmodelled).
+    For AlphaFold models both are the same numbers; for experimental chains
+    pass the UniProt positions and residue numbers of a residue map."""
+    positions = np.asarray(positions, dtype=np.int64)
+    size = int(max(size or 0, positions.max(initial=0) + 1))
+    index = np.full(size, -1, dtype=np.int64)
+    index[positions] = resi
+    return index
+
+
+def _ranges(resi):
+    """Sorted residue numbers compressed to 3Dmol resi items: 5, '7-12', ..."""
+    if not len(resi):
+        return []
+    breaks = np.flatnonzero(np.diff(resi) != 1)
+    starts = resi[np.r_[0, breaks + 1]]
+    ends = resi[np.r_[breaks, len(resi) - 1]]
+    return [int(a) if a == b else f"{a}-{b}" for a, b in zip(starts.tolist(), ends.tolist())]
+
+
+def color_batches(values, index=None, n_bins=VARIANT_COLOR_BINS, cmap="YlOrRd", vmin=None, vmax=None):
+    """Group per-position values (NaN = no colour) into n_bins colour batches:
+    [{"color": "#rrggbb", "resi": [...]}, ...] for StructureView.color_residues"""
+    from matplotlib import colormaps
+    from matplotlib.colors import to_hex
+
+    values = np.asarray(values, dtype=float)
+    pos = np.flatnonzero(~np.isnan(values))
+    if index is None:
+        resi = pos
+    else:
+        index = np.asarray(index)
+        pos = pos[pos < len(index)]
+        resi = index[pos]
+        pos, resi = pos[resi >= 0], resi[resi >= 0]
+    if not len(pos):
+        return []
+
+    v = values[pos]
+    lo = v.min() if vmin is None else vmin
+    hi = v.max() if vmax is None else vmax
+    bins = np.clip(((v - lo) / max(hi - lo, 1e-12) * n_bins).astype(np.int64), 0, n_bins - 1)
+    palette = colormaps[cmap](np.linspace(0.2, 1.0, n_bins))
+
+    order = np.lexsort((resi, bins))
+    bins, resi = bins[order], resi[order]
+    cuts = np.flatnonzero(np.diff(bins)) + 1
+    return [{"color": to_hex(palette[b[0]]), "resi": _ranges(r)}
+            for b, r in zip(np.split(bins, cuts), np.split(resi, cuts))]
+
+
+def _make_handler_class():
+    from PyQt5.QtCore import QUrl
+    from PyQt5.QtWebEngineCore import QWebEngineUrlRequestJob, QWebEngineUrlSchemeHandler
+
+    class LocalSchemeHandler(QWebEngineUrlSchemeHandler):
+        """Serves provarnet://viewer/index.html, provarnet://assets/<file>
+        and provarnet://structures/<key> (gzip; ?raw=1 for plain bytes);
+        3Dmol.js comes from the CDN when there is no local copy"""
+
+        def __init__(self, structures, parent=None):
+            super().__init__(parent)
+            self.structures = structures
+            self._cache = {}
+
+        def _asset(self, name):
+            if name not in self._cache:
+                path = os.path.join(ASSET_DIR, os.path.basename(name))
+                if not os.path.isfile(path):
+                    return None
+                with open(path, "rb") as fh:
+                    self._cache[name] = fh.read()
+            return self._cache[name]
+
+        def requestStarted(self, job):
+            url = job.requestUrl()
+            host, path = url.host(), url.path().lstrip("/")
+            if host == "viewer":
+                data, mime = VIEWER_HTML.encode("utf-8"), b"text/html"
+            elif host == "assets":
+                data = self._asset(path)
+                if data is None and path == "3Dmol-min.js":
+                    print(f"[INFO] No local 3Dmol.js in {ASSET_DIR}; loading {THREEDMOL_URL}")
+                    job.redirect(QUrl(THREEDMOL_URL))
+                    return
+                mime = MIME_TYPES.get(os.path.splitext(path)[1], b"application/octet-stream")
+            elif host == "structures":
+                raw = url.query() == "raw=1"
+                data = self.structures.get(unquote(path), raw=raw)
+                mime = b"application/octet-stream" if raw else b"application/gzip"
+            else:
+                data = None
+            if data is None:
+                job.fail(QWebEngineUrlRequestJob.UrlNotFound)
+                return
+            buf = QBuffer(job)
+            buf.setData(data)
+            buf.open(QIODevice.ReadOnly)
+            job.reply(mime, buf)
+
+    return LocalSchemeHandler
+
+
+class StructureView(QObject):
+    """Owns the persistent web view; models are pushed via JavaScript"""
+
+    def __init__(self):
+        super().__init__()
+        from PyQt5.QtCore import QUrl
+        from PyQt5.QtWebEngineWidgets import QWebEnginePage, QWebEngineProfile, QWebEngineView
+
+        self.profile = QWebEngineProfile("provarnet", self)
+        self.structures = StructureStore()
+        self.handler = _make_handler_class()(self.structures, self)
+        self.profile.installUrlSchemeHandler(SCHEME, self.handler)
+
+        self.widget = QWebEngineView()
+        self.widget.setPage(QWebEnginePage(self.profile, self.widget))
+        self.widget.setMinimumSize(800, 600)
+        self._loaded = False
+        self._pending = []
+        self.widget.loadFinished.connect(self._on_load_finished)
+        self.widget.load(QUrl("provarnet://viewer/index.html"))
+
+    def _on_load_finished(self, ok):
+        self._loaded = ok
+        pending, self._pending = self._pending, []
+        for script in pending:
+            self._run(script)
+
+    def _run(self, script):
+        if not self._loaded:
+            self._pending.append(script)
+            return
+        # 3Dmol may still be initialising right after loadFinished
+        self.widget.page().runJavaScript(
+            "(function run(){ if (!window.pv || pv.failed) return; if (!pv.ready) { setTimeout(run, 20); return; } "
+            + script + " })();"
+        )
+
+    def show_structure(self, key, data=None, fmt="pdb", detail="auto"):
+        """Display a structure file (str or bytes; 'pdb', 'cif', 'bcif', ...).
+        data may be omitted when key is still in the store."""
+        if data is not None and key not in self.structures:
+            self.structures.put(key, data, fmt)
+        url = f"provarnet://structures/{quote(key, safe='')}"
+        opts = {
+            "detail": detail,
+            "fullMax": LOD_FULL_MAX_RESIDUES,
+            "traceMax": LOD_TRACE_MAX_RESIDUES,
+            "focusRadius": LOD_FOCUS_RADIUS,
+        }
+        self._run(f"pv.loadUrl({json.dumps(url)}, {json.dumps(fmt)}, {json.dumps(opts)});")
+
+    def set_detail(self, level):
+        """'auto' (by residue count), 'full', 'trace' or 'coarse'"""
+        if level not in DETAIL_LEVELS:
+            raise ValueError(f"Unknown detail level: {level}")
+        self._run(f"pv.setDetail({json.dumps(level)});")
+
+    def color_residues(self, batches, base_color=VARIANT_BASE_COLOR):
+        """Colour residues from color_batches(); an empty list restores the default colours"""
+        self._run(f"pv.colorResidues({json.dumps(batches)}, {json.dumps(base_color)});")
+
+    def attach(self, layout):
+        layout.addWidget(self.widget)
+        self.widget.show()
+
+    def detach(self, layout):
+        """Take the view back from a closing dialog so it is not destroyed with it"""
+        layout.removeWidget(self.widget)
+        self.widget.hide()
+        self.widget.setParent(None)
+
+
+_shared = None
+
+
+def shared_view():
+    """The application-wide StructureView, created (and warmed up) on first call"""
+    global _shared
+    if _shared is None:
+        _shared = StructureView()
+    return _shared
+
+
+if __name__ == "__main__":
+    if "--bundle-assets" in sys.argv:
+        print(f"[INFO] Saved {bundle_3dmol()}")